@@ -0,0 +1,57 @@
+"""
+Применение миграций схемы auth_service (alembic upgrade head)
+
+База, созданная до перехода на Alembic (Base.metadata.create_all при старте
+приложения), не имеет таблицы версий. Такая база сначала отмечается базовой
+ревизией 0001, затем доводится до head. Команда выполняется при каждом
+запуске контейнера перед uvicorn (Dockerfile, docker-compose.yml).
+
+Запуск из каталога auth_service:
+    python -m app.commands.migrate
+"""
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+from app.db.database import MIGRATIONS_VERSION_TABLE, engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+BASELINE_REVISION = "0001"
+
+
+def migrate(database_url: Optional[str] = None) -> bool:
+    """
+    Довести схему до последней ревизии
+
+    Возвращает True, если база была без таблицы версий и отмечена базовой ревизией.
+    """
+    config = Config(str(ALEMBIC_INI))
+    bind = engine
+    if database_url is not None:
+        config.set_main_option("sqlalchemy.url", database_url)
+        bind = create_engine(database_url)
+
+    try:
+        tables = set(inspect(bind).get_table_names())
+    finally:
+        if bind is not engine:
+            bind.dispose()
+
+    stamped = MIGRATIONS_VERSION_TABLE not in tables and "users" in tables
+    if stamped:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+    return stamped
+
+
+def main():
+    if migrate():
+        print(f"Схема без версии Alembic отмечена базовой ревизией {BASELINE_REVISION}")
+    print("Схема auth_service в последней ревизии")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1 @@
-from .database import Base, get_db, engine
-
+from .database import Base, get_db, get_read_db, engine, async_engine, AsyncSessionLocal, replica_router
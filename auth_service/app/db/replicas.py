@@ -0,0 +1,112 @@
+"""
+Маршрутизация чтения на реплики
+
+Читающие обработчики получают сессию через get_read_db: реплики выбираются
+по кругу, недоступная реплика исключается на DB_REPLICA_RETRY_SECONDS,
+а если живых реплик нет - используется основная база. Клиент, который
+только что писал, READ_YOUR_WRITES_SECONDS читает с основной базы, чтобы
+увидеть свои изменения несмотря на задержку репликации.
+"""
+import asyncio
+import itertools
+import time
+from typing import Iterable, List
+
+from fastapi import Request
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaRouter:
+    """Круговой выбор реплик с временным исключением недоступных"""
+
+    def __init__(self, engines: List[AsyncEngine], retry_seconds: float):
+        self.engines = engines
+        self.sessionmakers = [
+            async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+            for engine in engines
+        ]
+        self.retry_seconds = retry_seconds
+        self._unhealthy_until = [0.0] * len(engines)
+        self._turn = itertools.count()
+
+    def candidates(self) -> List[int]:
+        """Номера живых реплик, начиная со следующей по кругу"""
+        if not self.engines:
+            return []
+        start = next(self._turn)
+        now = time.monotonic()
+        count = len(self.engines)
+        return [
+            index for index in ((start + shift) % count for shift in range(count))
+            if self._unhealthy_until[index] <= now
+        ]
+
+    def mark_unhealthy(self, index: int) -> None:
+        self._unhealthy_until[index] = time.monotonic() + self.retry_seconds
+
+    async def open_session(self, request: Request):
+        """Сессия живой реплики с уже установленным соединением или None"""
+        if reads_own_writes(request):
+            return None
+
+        for index in self.candidates():
+            db = self.sessionmakers[index]()
+            try:
+                await db.connection()
+            except (OSError, asyncio.TimeoutError, SQLAlchemyError):
+                await db.close()
+                self.mark_unhealthy(index)
+                continue
+            return db
+        return None
+
+
+def reads_own_writes(request: Request) -> bool:
+    """Клиент недавно писал и должен читать с основной базы"""
+    until = request.cookies.get(READ_PRIMARY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """
+    После успешного изменяющего запроса выставляет cookie окна чтения с основной базы
+
+    read_only_paths - пути POST-запросов, которые ничего не пишут (например, пакетное чтение).
+    """
+
+    def __init__(self, app: ASGIApp, window_seconds: int, read_only_paths: Iterable[str] = ()):
+        self.app = app
+        self.window_seconds = window_seconds
+        self.read_only_paths = set(read_only_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or scope["path"] in self.read_only_paths
+            or self.window_seconds <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + self.window_seconds
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{READ_PRIMARY_COOKIE}={until}; Max-Age={self.window_seconds}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
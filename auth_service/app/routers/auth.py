@@ -1,19 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
 from app.schemas.user import UserCreate, UserResponse, UserLogin
-from app.schemas.token import Token, TokenPair
+from app.schemas.token import TokenPair
 from app.services.auth import AuthService
-from app.services.security import get_current_user
+from app.services.security import get_current_user_readonly
 from app.models.user import User
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Регистрация нового пользователя
     
@@ -22,19 +22,19 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     - **password**: пароль (минимум 6 символов)
     """
     auth_service = AuthService(db)
-    user = auth_service.create_user(user_data)
+    user = await auth_service.create_user(user_data)
     return user
 
 
 @router.post("/login", response_model=TokenPair)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Авторизация пользователя
     
     Возвращает пару токенов (access + refresh)
     """
     auth_service = AuthService(db)
-    user = auth_service.authenticate_user(user_data.email, user_data.password)
+    user = await auth_service.authenticate_user(user_data.email, user_data.password)
     
     if not user:
         raise HTTPException(
@@ -55,7 +55,7 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
 @router.post("/login/form", response_model=TokenPair)
 async def login_form(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Авторизация через форму (для OAuth2 совместимости)
@@ -63,7 +63,7 @@ async def login_form(
     Используется для интеграции с Swagger UI
     """
     auth_service = AuthService(db)
-    user = auth_service.authenticate_user(form_data.username, form_data.password)
+    user = await auth_service.authenticate_user(form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -82,18 +82,18 @@ async def login_form(
 
 
 @router.post("/refresh", response_model=TokenPair)
-async def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
+async def refresh_token(refresh_token: str, db: AsyncSession = Depends(get_db)):
     """
     Обновление токенов по refresh токену
     
     - **refresh_token**: действующий refresh токен
     """
     auth_service = AuthService(db)
-    return auth_service.refresh_tokens(refresh_token)
+    return await auth_service.refresh_tokens(refresh_token)
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user_readonly)):
     """
     Получение информации о текущем авторизованном пользователе
     """
@@ -101,7 +101,7 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(current_user: User = Depends(get_current_user_readonly)):
     """
     Выход из системы
     
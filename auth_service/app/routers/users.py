@@ -1,12 +1,13 @@
 from typing import List
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
 from app.schemas.user import UserResponse, UserUpdate, BalanceOperation, BalanceResponse
 from app.services.auth import AuthService
-from app.services.security import get_current_user, get_current_active_superuser
+from app.services.security import get_current_user, get_current_user_readonly, get_current_active_superuser
 from app.models.user import User
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -16,20 +17,20 @@ router = APIRouter(prefix="/users", tags=["Users"])
 async def get_all_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_superuser)
 ):
     """
     Получение списка всех пользователей (только для суперпользователей)
     """
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    result = await db.execute(select(User).offset(skip).limit(limit))
+    return result.scalars().all()
 
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -45,7 +46,7 @@ async def get_user(
         )
     
     auth_service = AuthService(db)
-    user = auth_service.get_user_by_id(user_id)
+    user = await auth_service.get_user_by_id(user_id)
     
     if not user:
         raise HTTPException(
@@ -60,7 +61,7 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -76,27 +77,27 @@ async def update_user(
         )
     
     auth_service = AuthService(db)
-    return auth_service.update_user(user_id, user_data)
+    return await auth_service.update_user(user_id, user_data)
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_superuser)
 ):
     """
     Удаление пользователя (только для суперпользователей)
     """
     auth_service = AuthService(db)
-    auth_service.delete_user(user_id)
+    await auth_service.delete_user(user_id)
     return None
 
 
 @router.post("/balance/deposit", response_model=BalanceResponse)
 async def deposit_balance(
     operation: BalanceOperation,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -104,8 +105,8 @@ async def deposit_balance(
     """
     new_balance = Decimal(str(current_user.balance)) + operation.amount
     current_user.balance = new_balance
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return BalanceResponse(
         balance=current_user.balance,
@@ -116,7 +117,7 @@ async def deposit_balance(
 @router.post("/balance/withdraw", response_model=BalanceResponse)
 async def withdraw_balance(
     operation: BalanceOperation,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -132,8 +133,8 @@ async def withdraw_balance(
     
     new_balance = current_balance - operation.amount
     current_user.balance = new_balance
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return BalanceResponse(
         balance=current_user.balance,
@@ -143,7 +144,7 @@ async def withdraw_balance(
 
 @router.get("/balance", response_model=BalanceResponse)
 async def get_balance(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_readonly)
 ):
     """
     Получение текущего баланса пользователя
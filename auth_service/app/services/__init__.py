@@ -1,3 +1,3 @@
 from .auth import AuthService
-from .security import SecurityService, get_current_user
+from .security import SecurityService, get_current_user, get_current_user_readonly
 
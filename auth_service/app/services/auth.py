@@ -1,6 +1,8 @@
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
@@ -11,36 +13,38 @@ from app.services.security import SecurityService
 class AuthService:
     """Сервис авторизации и управления пользователями"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def get_user_by_email(self, email: str) -> Optional[User]:
+    async def get_user_by_email(self, email: str) -> Optional[User]:
         """Получить пользователя по email"""
-        return self.db.query(User).filter(User.email == email).first()
+        result = await self.db.execute(select(User).where(User.email == email))
+        return result.scalar_one_or_none()
     
-    def get_user_by_username(self, username: str) -> Optional[User]:
+    async def get_user_by_username(self, username: str) -> Optional[User]:
         """Получить пользователя по username"""
-        return self.db.query(User).filter(User.username == username).first()
+        result = await self.db.execute(select(User).where(User.username == username))
+        return result.scalar_one_or_none()
     
-    def get_user_by_id(self, user_id: int) -> Optional[User]:
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Получить пользователя по ID"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        return await self.db.get(User, user_id)
     
-    def create_user(self, user_data: UserCreate) -> User:
+    async def create_user(self, user_data: UserCreate) -> User:
         """Регистрация нового пользователя"""
-        if self.get_user_by_email(user_data.email):
+        if await self.get_user_by_email(user_data.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
         
-        if self.get_user_by_username(user_data.username):
+        if await self.get_user_by_username(user_data.username):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already taken"
             )
         
-        hashed_password = SecurityService.hash_password(user_data.password)
+        hashed_password = await run_in_threadpool(SecurityService.hash_password, user_data.password)
         user = User(
             email=user_data.email,
             username=user_data.username,
@@ -48,17 +52,17 @@ class AuthService:
         )
         
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
         
         return user
     
-    def authenticate_user(self, email: str, password: str) -> Optional[User]:
+    async def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Аутентификация пользователя"""
-        user = self.get_user_by_email(email)
+        user = await self.get_user_by_email(email)
         if not user:
             return None
-        if not SecurityService.verify_password(password, user.hashed_password):
+        if not await run_in_threadpool(SecurityService.verify_password, password, user.hashed_password):
             return None
         return user
     
@@ -74,7 +78,7 @@ class AuthService:
             refresh_token=refresh_token
         )
     
-    def refresh_tokens(self, refresh_token: str) -> TokenPair:
+    async def refresh_tokens(self, refresh_token: str) -> TokenPair:
         """Обновление токенов по refresh токену"""
         if not SecurityService.verify_token_type(refresh_token, "refresh"):
             raise HTTPException(
@@ -89,7 +93,7 @@ class AuthService:
                 detail="Invalid refresh token"
             )
         
-        user = self.get_user_by_id(token_data.user_id)
+        user = await self.get_user_by_id(token_data.user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -104,9 +108,9 @@ class AuthService:
         
         return self.create_tokens(user)
     
-    def update_user(self, user_id: int, user_data: UserUpdate) -> User:
+    async def update_user(self, user_id: int, user_data: UserUpdate) -> User:
         """Обновление данных пользователя"""
-        user = self.get_user_by_id(user_id)
+        user = await self.get_user_by_id(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -114,7 +118,7 @@ class AuthService:
             )
         
         if user_data.email and user_data.email != user.email:
-            if self.get_user_by_email(user_data.email):
+            if await self.get_user_by_email(user_data.email):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Email already registered"
@@ -122,7 +126,7 @@ class AuthService:
             user.email = user_data.email
         
         if user_data.username and user_data.username != user.username:
-            if self.get_user_by_username(user_data.username):
+            if await self.get_user_by_username(user_data.username):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Username already taken"
@@ -130,29 +134,29 @@ class AuthService:
             user.username = user_data.username
         
         if user_data.password:
-            user.hashed_password = SecurityService.hash_password(user_data.password)
+            user.hashed_password = await run_in_threadpool(SecurityService.hash_password, user_data.password)
         
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
         
         return user
     
-    def delete_user(self, user_id: int) -> bool:
+    async def delete_user(self, user_id: int) -> bool:
         """Удаление пользователя"""
-        user = self.get_user_by_id(user_id)
+        user = await self.get_user_by_id(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        self.db.delete(user)
-        self.db.commit()
+        await self.db.delete(user)
+        await self.db.commit()
         return True
     
-    def deactivate_user(self, user_id: int) -> User:
+    async def deactivate_user(self, user_id: int) -> User:
         """Деактивация пользователя"""
-        user = self.get_user_by_id(user_id)
+        user = await self.get_user_by_id(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -160,8 +164,8 @@ class AuthService:
             )
         
         user.is_active = False
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
         
         return user
 
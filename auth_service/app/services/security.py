@@ -4,10 +4,10 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.user import User
 from app.schemas.token import TokenData
 
@@ -75,11 +75,7 @@ class SecurityService:
             return False
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Dependency для получения текущего пользователя из токена"""
+async def _load_current_user(token: str, db: AsyncSession) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -90,7 +86,7 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = await db.get(User, token_data.user_id)
     if user is None:
         raise credentials_exception
     
@@ -103,6 +99,27 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Dependency для получения текущего пользователя из токена"""
+    return await _load_current_user(token, db)
+
+
+async def get_current_user_readonly(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db)
+) -> User:
+    """
+    Текущий пользователь, прочитанный с реплики
+
+    Только для обработчиков, которые не изменяют пользователя: объект
+    принадлежит сессии реплики.
+    """
+    return await _load_current_user(token, db)
+
+
 async def get_current_active_superuser(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -2,11 +2,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from common.metrics import MetricsMiddleware, instrument_engine, metrics_response
+
 from app.core.config import settings
-from app.db.database import engine, Base
+from app.db.database import async_engine, replica_engines
+from app.db.replicas import ReadYourWritesMiddleware
 from app.routers import auth_router, users_router
 
-Base.metadata.create_all(bind=engine)
+instrument_engine(async_engine.sync_engine, "primary")
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine.sync_engine, f"replica{index}")
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -24,6 +29,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Вход, обновление токенов и выход ничего не пишут: /auth/me сразу после входа читает с реплики
+app.add_middleware(
+    ReadYourWritesMiddleware,
+    window_seconds=settings.READ_YOUR_WRITES_SECONDS,
+    read_only_paths=[
+        "/api/v1/auth/login",
+        "/api/v1/auth/login/form",
+        "/api/v1/auth/refresh",
+        "/api/v1/auth/logout",
+    ]
+)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(users_router, prefix="/api/v1")
 
@@ -43,3 +61,8 @@ async def health_check():
     """Health check endpoint для мониторинга"""
     return {"status": "ok"}
 
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Метрики в формате Prometheus"""
+    return metrics_response()
@@ -9,20 +9,32 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app.core.config import settings
-from app.db.database import Base
-from app.models.user import User 
+from app.db.database import Base, MIGRATIONS_VERSION_TABLE
+import app.models  # noqa: F401 - регистрация всех моделей в Base.metadata
 
 config = context.config
 
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+# Адрес из настроек приложения, если вызывающий (app.commands.migrate) не передал свой
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
 # Interpret the config file for Python logging.
+# Логгеры приложения не отключаются: миграции могут выполняться в его процессе
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 # Метаданные для автогенерации миграций
 target_metadata = Base.metadata
 
+# База общая с services_service: своя таблица версий, и автогенерация не трогает чужие таблицы
+VERSION_TABLE = MIGRATIONS_VERSION_TABLE
+
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return name in target_metadata.tables
+    return True
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
@@ -32,6 +44,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        version_table=VERSION_TABLE,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -49,7 +63,9 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection, 
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            version_table=VERSION_TABLE,
+            include_name=include_name
         )
 
         with context.begin_transaction():
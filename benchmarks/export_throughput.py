@@ -0,0 +1,66 @@
+"""
+Пропускная способность потоковой выгрузки услуг
+
+Читает выгрузку напрямую из генератора stream_export на базе,
+указанной в настройках services_service, и печатает строки в секунду
+и пиковое потребление памяти Python.
+
+    python benchmarks/export_throughput.py --format ndjson --chunk-size 2000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "services_service"))
+
+from app.db.database import AsyncSessionLocal  # noqa: E402
+from app.services.export import stream_export  # noqa: E402
+
+
+async def open_session():
+    return AsyncSessionLocal()
+
+
+async def run(format: str, chunk_size: int) -> dict:
+    rows = 0
+    size = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    async for chunk in stream_export(open_session, format=format, chunk_size=chunk_size):
+        size += len(chunk)
+        rows += chunk.count(b"\n")
+
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if format == "csv":
+        rows -= 1  # строка заголовка
+
+    return {
+        "format": format,
+        "chunk_size": chunk_size,
+        "rows": rows,
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed else None,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.format, args.chunk_size)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Нагрузочный бенчмарк auth_service и services_service
+
+Запросы идут в ASGI-приложение в том же процессе (httpx.ASGITransport)
+или в запущенный uvicorn (--base-url). Для каждого сценария считаются
+пропускная способность и задержки p50/p95/p99, результат пишется в JSON.
+Режим --compare сравнивает результат с сохраненным эталоном и завершается
+с кодом 1 при регрессии.
+
+Данные удобно готовить генератором:
+    cd services_service && python -m app.commands.generate_dataset --seed 42 --users 1000 --truncate
+
+Примеры:
+    python benchmarks/load.py --service services --concurrency 1,8,32 --duration 10 --output services.json
+    python benchmarks/load.py --service auth --scenarios login,me --output auth.json
+    python benchmarks/load.py --service services --output new.json --compare services.json --threshold 0.15
+
+Требуется httpx.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CITY_SLUGS = ["moscow", "spb", "ekaterinburg", "kazan", "novosibirsk"]
+SERVICE_TYPES = ["work", "estate", "news", "auto"]
+
+
+class Worker:
+    """Виртуальный клиент: свое состояние (токен, курсор) и свой генератор случайных чисел"""
+
+    def __init__(self, client: httpx.AsyncClient, number: int, args):
+        self.client = client
+        self.number = number
+        self.args = args
+        self.rng = random.Random(f"{args.seed}:{number}")
+        self.token: Optional[str] = None
+        self.cursor: Optional[str] = None
+
+
+async def auth_login(worker: Worker) -> httpx.Response:
+    user = worker.rng.randint(1, worker.args.users)
+    return await worker.client.post(
+        "/api/v1/auth/login",
+        json={"email": f"user{user}@example.com", "password": "password123"}
+    )
+
+
+async def auth_me(worker: Worker) -> httpx.Response:
+    if worker.token is None:
+        response = await worker.client.post(
+            "/api/v1/auth/login",
+            json={"email": f"user{worker.number % worker.args.users + 1}@example.com", "password": "password123"}
+        )
+        response.raise_for_status()
+        worker.token = response.json()["access_token"]
+    return await worker.client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {worker.token}"})
+
+
+async def cities_list(worker: Worker) -> httpx.Response:
+    return await worker.client.get("/api/v1/cities/")
+
+
+async def services_filtered(worker: Worker) -> httpx.Response:
+    return await worker.client.get("/api/v1/services/", params={
+        "city_slug": worker.rng.choice(CITY_SLUGS),
+        "service_type": worker.rng.choice(SERVICE_TYPES),
+        "limit": 20
+    })
+
+
+async def services_deep_offset(worker: Worker) -> httpx.Response:
+    return await worker.client.get("/api/v1/services/", params={
+        "skip": worker.rng.randint(worker.args.deep_offset // 2, worker.args.deep_offset),
+        "limit": 20
+    })
+
+
+async def services_deep_cursor(worker: Worker) -> httpx.Response:
+    params = {"limit": 20}
+    if worker.cursor:
+        params["cursor"] = worker.cursor
+    response = await worker.client.get("/api/v1/services/", params=params)
+    worker.cursor = response.headers.get("x-next-cursor")
+    return response
+
+
+async def services_bulk(worker: Worker) -> httpx.Response:
+    lines = [
+        json.dumps({
+            "title": f"Нагрузка {worker.number}-{i}",
+            "description": "Синтетическая услуга для бенчмарка",
+            "service_type": worker.rng.choice(SERVICE_TYPES),
+            "city_slug": worker.rng.choice(CITY_SLUGS),
+            "price": worker.rng.randint(100, 10000)
+        }, ensure_ascii=False)
+        for i in range(worker.args.bulk_rows)
+    ]
+    return await worker.client.post(
+        "/api/v1/services/bulk",
+        content="\n".join(lines).encode("utf-8"),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+
+
+SCENARIOS: Dict[str, Dict[str, Callable[[Worker], Awaitable[httpx.Response]]]] = {
+    "auth": {
+        "login": auth_login,
+        "me": auth_me,
+    },
+    "services": {
+        "cities": cities_list,
+        "filtered": services_filtered,
+        "deep_offset": services_deep_offset,
+        "deep_cursor": services_deep_cursor,
+        "bulk": services_bulk,
+    },
+}
+
+
+def load_app(service: str):
+    """Импорт ASGI-приложения сервиса: у каждого сервиса свой пакет app, поэтому один сервис на процесс"""
+    service_dir = ROOT / f"{service}_service"
+    sys.path.insert(0, str(service_dir))
+    # Общий пакет common лежит в корне репозитория
+    sys.path.insert(1, str(ROOT))
+    os.chdir(service_dir)
+    import main
+    return main.app
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Callable[[Worker], Awaitable[httpx.Response]],
+    concurrency: int,
+    args
+) -> dict:
+    """Прогон одного сценария: concurrency клиентов шлют запросы в течение duration секунд"""
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def worker_loop(worker: Worker):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await scenario(worker)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    workers = [Worker(client, number, args) for number in range(concurrency)]
+    for worker in workers:
+        for _ in range(args.warmup):
+            await scenario(worker)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker_loop(worker) for worker in workers))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        transport = httpx.ASGITransport(app=load_app(args.service))
+        base_url = "http://bench"
+
+    scenarios = SCENARIOS[args.service]
+    names = args.scenarios.split(",") if args.scenarios else list(scenarios)
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    results = {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        for name, level in itertools.product(names, levels):
+            key = f"{name}@{level}"
+            results[key] = await run_scenario(client, scenarios[name], level, args)
+            print(key, json.dumps(results[key], ensure_ascii=False), file=sys.stderr)
+
+    return {
+        "service": args.service,
+        "target": args.base_url or "asgi",
+        "duration_s": args.duration,
+        "seed": args.seed,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Регрессии: рост p95/p99 или падение пропускной способности больше чем на threshold"""
+    regressions = []
+    for key, new in current["results"].items():
+        old = baseline["results"].get(key)
+        if not old or not old.get("requests") or not new.get("requests"):
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if new[metric] > old[metric] * (1 + threshold):
+                regressions.append(f"{key}: {metric} {old[metric]} -> {new[metric]}")
+        if new["throughput_rps"] < old["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{key}: throughput_rps {old['throughput_rps']} -> {new['throughput_rps']}")
+        if new["errors"] > old["errors"]:
+            regressions.append(f"{key}: errors {old['errors']} -> {new['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=list(SCENARIOS), required=True)
+    parser.add_argument("--scenarios", help="Сценарии через запятую, по умолчанию все для сервиса")
+    parser.add_argument("--base-url", help="Адрес запущенного uvicorn вместо ASGI в процессе")
+    parser.add_argument("--concurrency", default="1,8,32", help="Уровни параллельности через запятую")
+    parser.add_argument("--duration", type=float, default=10, help="Длительность каждого прогона, с")
+    parser.add_argument("--warmup", type=int, default=2, help="Запросов прогрева на клиента")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=1000, help="Число синтетических пользователей user{n}@example.com")
+    parser.add_argument("--deep-offset", type=int, default=10000)
+    parser.add_argument("--bulk-rows", type=int, default=500)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="JSON эталонного прогона")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Допустимое ухудшение, доля")
+    args = parser.parse_args()
+
+    output = Path(args.output).resolve()
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+
+    result = asyncio.run(run(args))
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"Результат: {output}")
+
+    if baseline is not None:
+        regressions = compare(result, baseline, args.threshold)
+        for line in regressions:
+            print(f"РЕГРЕССИЯ {line}")
+        if regressions:
+            sys.exit(1)
+        print("Регрессий нет")
+
+
+if __name__ == "__main__":
+    main()
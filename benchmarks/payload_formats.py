@@ -0,0 +1,60 @@
+"""
+Размер и время кодирования страницы услуг по форматам ответа
+
+Для каждой комбинации формата (JSON, MessagePack) и сжатия (нет, gzip, brotli)
+считаются размер тела и время кодирования, включая сериализацию.
+Данные синтетические, база не нужна.
+
+    python benchmarks/payload_formats.py --rows 100 --repeat 500
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "services_service"))
+
+from app.core.negotiation import brotli, compress  # noqa: E402
+from app.core.responses import dump_json, dump_msgpack, service_items  # noqa: E402
+from serialization import make_rows  # noqa: E402
+
+SERIALIZERS = {
+    "json": dump_json,
+    "msgpack": dump_msgpack,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    payload = service_items(make_rows(args.rows))
+    encodings = [None, "gzip"] + (["br"] if brotli is not None else [])
+
+    results = []
+    for name, serialize in SERIALIZERS.items():
+        for encoding in encodings:
+            def encode():
+                body = serialize(payload)
+                return compress(body, encoding) if encoding else body
+
+            seconds = timeit.timeit(encode, number=args.repeat) / args.repeat
+            results.append({
+                "format": name,
+                "encoding": encoding or "identity",
+                "bytes": len(encode()),
+                "encode_us": round(seconds * 1e6, 1),
+            })
+
+    baseline = results[0]["bytes"]
+    for result in results:
+        result["size_vs_json"] = round(result["bytes"] / baseline, 3)
+
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Сериализация страницы услуг: путь response_model против dump_services
+
+Контракт (побайтово одинаковый JSON обоих путей) проверяет тест
+services_service/tests/test_serialization.py. Данные синтетические,
+база не нужна.
+
+    python benchmarks/serialization.py --rows 100 --repeat 2000
+"""
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "services_service"))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.core.responses import dump_services  # noqa: E402
+from app.schemas.service import ServiceWithCity  # noqa: E402
+
+adapter = TypeAdapter(List[ServiceWithCity])
+
+
+def make_rows(count: int) -> List[dict]:
+    created = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": i + 1,
+            "city_id": i % 15 + 1,
+            "service_type": ["work", "estate", "news", "auto"][i % 4],
+            "title": f"Услуга №{i}",
+            "description": "Профессиональный маникюр и педикюр" if i % 3 else None,
+            "price": Decimal("1500.00") + i if i % 4 != 2 else None,
+            "image_url": "img/news01.webp",
+            "rating": Decimal(f"{3 + i % 20 / 10:.1f}"),
+            "reviews_count": i * 7 % 500,
+            "created_at": created + timedelta(minutes=i, microseconds=i * 13),
+            "updated_at": None if i % 2 else created + timedelta(days=1),
+            "city_name": "Москва",
+            "city_slug": "moscow",
+            "thumbnail_url": "/api/v1/images/320/img/news01.webp",
+        })
+    return rows
+
+
+def response_model_path(rows: List[dict]) -> bytes:
+    """Эквивалент FastAPI: валидация response_model, dump в JSON-режиме, json.dumps JSONResponse"""
+    content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+
+    before = timeit.timeit(lambda: response_model_path(rows), number=args.repeat) / args.repeat
+    after = timeit.timeit(lambda: dump_services(rows), number=args.repeat) / args.repeat
+
+    print(json.dumps({
+        "rows": args.rows,
+        "response_model_us": round(before * 1e6, 1),
+        "dump_services_us": round(after * 1e6, 1),
+        "speedup": round(before / after, 1)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
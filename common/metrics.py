@@ -0,0 +1,220 @@
+"""
+Метрики Prometheus: HTTP-запросы, пул соединений и время запросов к БД
+
+Общая реализация для auth_service и services_service. Сервис подключает
+instrument_engine к своим движкам и MetricsMiddleware к приложению; свою
+статистику запроса (например, бюджет SQL-запросов) он задает через
+stats_factory и on_finish.
+
+При нескольких воркерах задайте PROMETHEUS_MULTIPROC_DIR (пустой каталог,
+общий для воркеров): метрики каждого процесса пишутся в файлы и суммируются
+при чтении /metrics.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запроса",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Запросы в обработке",
+    ["method"],
+    multiprocess_mode="livesum"
+)
+
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Соединения, выданные из пула",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Соединения сверх pool_size",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Получение соединения: ожидание в пуле, открытие нового и pre-ping",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Длительность SQL-запроса",
+    ["engine"]
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Число SQL-запросов на HTTP-запрос",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Суммарное время SQL-запросов на HTTP-запрос",
+    ["route"]
+)
+QUERIES_TOTAL = Counter(
+    "db_queries_total",
+    "Выполненные SQL-запросы",
+    ["engine"]
+)
+
+
+class RequestDbStats:
+    """Число SQL-запросов и время в БД в пределах одного HTTP-запроса"""
+
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+
+
+current_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("current_db_stats", default=None)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Подключение метрик пула и запросов к синхронному движку
+
+    Для AsyncEngine передается engine.sync_engine: события вызываются
+    в контексте задачи запроса, поэтому статистика попадает в current_db_stats.
+    """
+    pool = engine.pool
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        QUERY_DURATION.labels(name).observe(elapsed)
+        QUERIES_TOTAL.labels(name).inc()
+
+        stats = current_db_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+    def update_pool_gauges(returning: int = 0):
+        POOL_CHECKED_OUT.labels(name).set(pool.checkedout() - returning)
+        POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+    @event.listens_for(pool, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        update_pool_gauges()
+
+    @event.listens_for(pool, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        # Событие приходит до возврата соединения в пул: оно еще числится выданным
+        update_pool_gauges(returning=1)
+
+    # События пула (checkout, connect) приходят уже после получения соединения, события
+    # начала ожидания нет. Поэтому замеряется весь Engine.connect() этого движка:
+    # ожидание свободного соединения, открытие нового и pre-ping
+    connect = engine.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_CHECKOUT_WAIT.labels(name).observe(time.perf_counter() - started)
+
+    engine.connect = timed_connect
+
+
+def route_template(scope: Scope) -> str:
+    """Шаблон маршрута с префиксом include_router вместо пути, чтобы не плодить метки по ID"""
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: длительность, запросы в обработке и статистика БД по маршруту
+
+    stats_factory создает статистику запроса, on_finish(method, route, stats)
+    вызывается после ответа.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        stats_factory: Callable[[], RequestDbStats] = RequestDbStats,
+        on_finish: Optional[Callable[[str, str, RequestDbStats], None]] = None
+    ):
+        self.app = app
+        self.stats_factory = stats_factory
+        self.on_finish = on_finish
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = self.stats_factory()
+        token = current_db_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            current_db_stats.reset(token)
+
+            route_path = route_template(scope)
+            REQUEST_DURATION.labels(method, route_path, str(status_code)).observe(elapsed)
+            REQUEST_QUERIES.labels(route_path).observe(stats.queries)
+            REQUEST_DB_TIME.labels(route_path).observe(stats.db_time)
+            if self.on_finish is not None:
+                self.on_finish(method, route_path, stats)
+
+
+def metrics_response() -> Response:
+    """Ответ /metrics с учетом всех воркеров в многопроцессном режиме"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        payload = generate_latest(registry)
+    else:
+        payload = generate_latest()
+    return Response(content=payload, media_type=CONTENT_TYPE_LATEST)
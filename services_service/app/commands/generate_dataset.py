@@ -0,0 +1,296 @@
+"""
+Детерминированный генератор синтетических данных
+
+Одинаковые --seed и параметры масштаба дают одинаковые данные, поэтому
+планы запросов и замеры производительности воспроизводимы.
+Данные загружаются через COPY. Запуск из каталога services_service:
+
+    python -m app.commands.generate_dataset --seed 42 --cities 200 --services-per-city 5000 --truncate
+    python -m app.commands.generate_dataset --seed 42 --users 100000 --auth-database-url postgresql://...
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import asyncpg
+
+from app.core.config import settings
+from app.models.service import ServiceType
+from app.services.counters import reconcile_counters_statements
+from app.services.popularity import popularity_score_statement
+
+# bcrypt-хэш пароля "password123" с фиксированной солью: у всех синтетических пользователей он одинаковый
+SYNTHETIC_PASSWORD_HASH = "$2b$12$EveningCitySyntheticDe4str94uXMMbNGuJQJcmHnx7dYcfqsA."
+
+BASE_CITIES = [
+    ("Москва", "moscow", 55.7558, 37.6173),
+    ("Санкт-Петербург", "spb", 59.9343, 30.3351),
+    ("Екатеринбург", "ekaterinburg", 56.8389, 60.6057),
+    ("Казань", "kazan", 55.7963, 49.1088),
+    ("Новосибирск", "novosibirsk", 55.0084, 82.9357),
+    ("Челябинск", "chelyabinsk", 55.1644, 61.4368),
+    ("Краснодар", "krasnodar", 45.0355, 38.9753),
+    ("Нижний Новгород", "nizhni_novgorod", 56.2965, 43.9361),
+    ("Самара", "samara", 53.1959, 50.1002),
+    ("Уфа", "ufa", 54.7388, 55.9721),
+    ("Ростов-на-Дону", "rostov", 47.2357, 39.7015),
+    ("Омск", "omsk", 54.9885, 73.3242),
+    ("Красноярск", "krasnoyarsk", 56.0153, 92.8932),
+    ("Воронеж", "voronezh", 51.672, 39.1843),
+    ("Пермь", "perm", 58.0105, 56.2502),
+]
+
+TITLE_WORDS = {
+    ServiceType.WORK: ["Маникюр", "Репетитор", "Сантехник", "Электрик", "Уборка", "Ремонт", "Массаж", "Грузчики"],
+    ServiceType.ESTATE: ["Квартира", "Студия", "Таунхаус", "Дом", "Комната", "Апартаменты", "Дача", "Офис"],
+    ServiceType.NEWS: ["Открытие", "Фестиваль", "Ремонт дорог", "Выставка", "Концерт", "Благоустройство", "Ярмарка"],
+    ServiceType.AUTO: ["Toyota", "BMW", "Lada", "Mercedes", "Kia", "Hyundai", "Skoda", "Volkswagen"],
+}
+
+PRICE_RANGES = {
+    ServiceType.WORK: (500, 10000),
+    ServiceType.ESTATE: (2000000, 30000000),
+    ServiceType.NEWS: None,
+    ServiceType.AUTO: (300000, 9000000),
+}
+
+VOCABULARY = (
+    "город центр район новый отличный профессиональный быстро недорого качественно опыт гарантия "
+    "ремонт квартира дом улица парк метро рядом удобно просторный светлый современный мебель техника "
+    "выезд консультация договор скидка срочно работа мастер услуга праздник жители программа "
+    "мероприятие открытие выходные вечер утро неделя сезон пробег владелец состояние комплектация"
+).split()
+
+CITY_COLUMNS = ["id", "name", "slug", "latitude", "longitude"]
+
+SERVICE_COLUMNS = [
+    "id", "city_id", "service_type", "title", "description", "price", "image_url",
+    "rating", "reviews_count", "created_at", "updated_at",
+]
+
+USER_COLUMNS = [
+    "id", "email", "username", "hashed_password", "balance",
+    "is_active", "is_verified", "is_superuser", "created_at",
+]
+
+
+def parse_type_mix(value: str) -> Dict[ServiceType, float]:
+    """Разбор доли типов вида work=4,estate=2,news=2,auto=2"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[ServiceType(name.strip())] = float(weight)
+    return mix
+
+
+def city_sizes(cities: int, services_per_city: int, skew: float) -> List[int]:
+    """Число услуг по городам: равномерно при skew=0, иначе по закону Ципфа с тем же итогом"""
+    if skew <= 0:
+        return [services_per_city] * cities
+
+    weights = [1 / (rank + 1) ** skew for rank in range(cities)]
+    total = sum(weights)
+    return [max(1, round(services_per_city * cities * w / total)) for w in weights]
+
+
+def words(rng: random.Random, mean: float, sigma: float, limit: int) -> str:
+    """Текст с логнормальным распределением длины в словах"""
+    count = max(1, min(limit, round(rng.lognormvariate(math.log(mean), sigma))))
+    return " ".join(rng.choice(VOCABULARY) for _ in range(count))
+
+
+def generate_cities(args) -> Iterator[Tuple]:
+    """Первые города реальные, остальные синтетические со случайными координатами в пределах России"""
+    rng = random.Random(f"{args.seed}:cities")
+    for i in range(args.cities):
+        if i < len(BASE_CITIES):
+            name, slug, lat, lon = BASE_CITIES[i]
+        else:
+            name, slug = f"Город {i + 1:05d}", f"city-{i + 1:05d}"
+            lat, lon = round(rng.uniform(43, 68), 4), round(rng.uniform(28, 135), 4)
+        yield i + 1, name, slug, lat, lon
+
+
+def generate_services(args, sizes: List[int]) -> Iterator[Tuple]:
+    """Строки услуг; у каждого города свой поток случайных чисел, чтобы данные не зависели от порядка"""
+    mix = parse_type_mix(args.type_mix)
+    types, weights = list(mix), list(mix.values())
+    now = datetime.fromisoformat(args.now).replace(tzinfo=timezone.utc)
+    service_id = 0
+
+    for city_index, size in enumerate(sizes):
+        rng = random.Random(f"{args.seed}:services:{city_index}")
+        for _ in range(size):
+            service_id += 1
+            service_type = rng.choices(types, weights)[0]
+            price_range = PRICE_RANGES[service_type]
+            price = None
+            if price_range:
+                price = Decimal(rng.randint(*price_range)).quantize(Decimal("0.01"))
+
+            created_at = now - timedelta(seconds=rng.randint(0, args.days * 86400))
+            updated_at = None
+            if rng.random() < args.updated_ratio:
+                updated_at = created_at + timedelta(seconds=rng.randint(60, 30 * 86400))
+                updated_at = min(updated_at, now)
+
+            yield (
+                service_id,
+                city_index + 1,
+                service_type.name,
+                f"{rng.choice(TITLE_WORDS[service_type])} {words(rng, args.title_words, 0.4, 12)}"[:255],
+                words(rng, args.description_words, args.description_sigma, 400),
+                price,
+                f"img/{service_type.value}{rng.randint(1, 20):02d}.webp",
+                Decimal(f"{rng.uniform(1, 5):.1f}"),
+                min(int(rng.paretovariate(1.2)) - 1, 100000),
+                created_at,
+                updated_at,
+            )
+
+
+def generate_users(args) -> Iterator[Tuple]:
+    rng = random.Random(f"{args.seed}:users")
+    now = datetime.fromisoformat(args.now).replace(tzinfo=timezone.utc)
+    for i in range(args.users):
+        yield (
+            i + 1,
+            f"user{i + 1}@example.com",
+            f"user{i + 1}",
+            SYNTHETIC_PASSWORD_HASH,
+            Decimal(rng.randint(0, 100000)).quantize(Decimal("0.01")),
+            True,
+            rng.random() < 0.7,
+            False,
+            now - timedelta(seconds=rng.randint(0, args.days * 86400)),
+        )
+
+
+async def copy_rows(conn: asyncpg.Connection, table: str, columns: List[str], rows: Iterator[Tuple], batch: int) -> int:
+    """COPY пачками по batch строк, чтобы не держать весь набор в памяти"""
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch:
+            await conn.copy_records_to_table(table, records=chunk, columns=columns)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        await conn.copy_records_to_table(table, records=chunk, columns=columns)
+        total += len(chunk)
+    return total
+
+
+async def load_services(args) -> None:
+    conn = await asyncpg.connect(args.database_url)
+    try:
+        # Одна транзакция: при ошибке загрузки откатываются и данные, и удаление индексов
+        async with conn.transaction():
+            existing = await conn.fetchval("SELECT count(*) FROM cities")
+            if existing and not args.truncate:
+                raise SystemExit("Таблица cities не пуста, используйте --truncate")
+            if args.truncate:
+                await conn.execute("TRUNCATE service_counters, services, cities RESTART IDENTITY CASCADE")
+
+            started = time.perf_counter()
+            cities = await copy_rows(conn, "cities", CITY_COLUMNS, generate_cities(args), args.batch)
+
+            # Индексы строятся один раз после загрузки: это быстрее, чем обновлять их на каждой строке COPY
+            indexes = [] if args.keep_indexes else await conn.fetch(
+                """
+                SELECT i.indexname, i.indexdef FROM pg_indexes i
+                WHERE i.tablename = 'services'
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+                """
+            )
+            for index in indexes:
+                await conn.execute(f'DROP INDEX "{index["indexname"]}"')
+
+            sizes = city_sizes(args.cities, args.services_per_city, args.city_skew)
+            services = await copy_rows(conn, "services", SERVICE_COLUMNS, generate_services(args, sizes), args.batch)
+
+            # Оценка популярности считается до построения индексов, пока UPDATE не обновляет их
+            await conn.execute(popularity_score_statement())
+
+            loaded = time.perf_counter()
+
+            await conn.execute("SET LOCAL maintenance_work_mem = '512MB'")
+            for index in indexes:
+                await conn.execute(index["indexdef"])
+
+            await conn.execute("SELECT setval(pg_get_serial_sequence('cities', 'id'), (SELECT max(id) FROM cities))")
+            await conn.execute("SELECT setval(pg_get_serial_sequence('services', 'id'), (SELECT max(id) FROM services))")
+            await conn.execute("ANALYZE cities")
+            await conn.execute("ANALYZE services")
+
+            # Счетчики пересчитываются в той же базе и транзакции: --database-url может отличаться от настроек
+            for statement in reconcile_counters_statements():
+                await conn.execute(statement)
+            counters = await conn.fetchval("SELECT count(*) FROM service_counters")
+        elapsed = loaded - started
+        print(f"Города: {cities}, услуги: {services} за {elapsed:.1f} с ({services / elapsed:.0f} строк/с)")
+        print(f"Индексы, ANALYZE и счетчики: {time.perf_counter() - loaded:.1f} с, счетчиков: {counters}")
+    finally:
+        await conn.close()
+
+
+async def load_users(args) -> None:
+    conn = await asyncpg.connect(args.auth_database_url)
+    try:
+        existing = await conn.fetchval("SELECT count(*) FROM users")
+        if existing and not args.truncate:
+            raise SystemExit("Таблица users не пуста, используйте --truncate")
+        if args.truncate:
+            await conn.execute("TRUNCATE users RESTART IDENTITY CASCADE")
+
+        started = time.perf_counter()
+        users = await copy_rows(conn, "users", USER_COLUMNS, generate_users(args), args.batch)
+        await conn.execute("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))")
+        await conn.execute("ANALYZE users")
+        print(f"Пользователи: {users} за {time.perf_counter() - started:.1f} с, пароль password123")
+    finally:
+        await conn.close()
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cities", type=int, default=15)
+    parser.add_argument("--services-per-city", type=int, default=1000)
+    parser.add_argument("--city-skew", type=float, default=0.0, help="Показатель Ципфа для размеров городов, 0 - равномерно")
+    parser.add_argument("--type-mix", default="work=1,estate=1,news=1,auto=1")
+    parser.add_argument("--title-words", type=float, default=3, help="Средняя длина заголовка в словах")
+    parser.add_argument("--description-words", type=float, default=25, help="Медиана длины описания в словах")
+    parser.add_argument("--description-sigma", type=float, default=0.8, help="Разброс длины описания (логнормальный)")
+    parser.add_argument("--updated-ratio", type=float, default=0.3, help="Доля услуг с updated_at")
+    parser.add_argument("--days", type=int, default=365, help="Глубина дат created_at в днях")
+    parser.add_argument("--now", default="2025-01-01T00:00:00", help="Опорная дата, от которой отсчитываются даты")
+    parser.add_argument("--users", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=50000, help="Строк в одной пачке COPY")
+    parser.add_argument("--truncate", action="store_true", help="Очистить таблицы перед загрузкой")
+    parser.add_argument("--keep-indexes", action="store_true", help="Не пересоздавать индексы services вокруг загрузки")
+    parser.add_argument("--skip-services", action="store_true")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--auth-database-url", default=settings.DATABASE_URL)
+    return parser.parse_args(argv)
+
+
+async def run(args) -> None:
+    if not args.skip_services:
+        await load_services(args)
+    if args.users:
+        await load_users(args)
+
+
+def main():
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
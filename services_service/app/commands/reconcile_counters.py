@@ -0,0 +1,26 @@
+"""
+Пересчет счетчиков услуг по городу и типу
+
+Вместе с количеством заполняет last_modified - время последнего изменения
+группы, из которого строится валидатор (ETag / Last-Modified) списков услуг.
+В базе, созданной до появления этой колонки, ее добавляет и заполняет ревизия 0005:
+    python -m app.commands.migrate
+
+Запуск из каталога services_service:
+    python -m app.commands.reconcile_counters
+"""
+from app.db.database import SessionLocal
+from app.services.counters import reconcile_counters
+
+
+def main():
+    db = SessionLocal()
+    try:
+        written = reconcile_counters(db)
+        print(f"Счетчики пересчитаны: {written}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Расчет оценки популярности услуг (sort=popular)
+
+По умолчанию досчитываются услуги без оценки; --full пересчитывает все,
+например после изменения настроек POPULARITY_*. Запуск из каталога services_service:
+    python -m app.commands.refresh_popularity [--full] [--batch 5000]
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import func, select
+
+from app.core.cache import invalidate_catalog_caches
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models.service import Service
+from app.services.popularity import popularity_refresher, refresh_range
+
+
+async def refresh_all(batch: int) -> int:
+    """Пересчет пачками по диапазонам id: каждая пачка - отдельная короткая транзакция"""
+    async with AsyncSessionLocal() as db:
+        first_id, last_id = (await db.execute(select(func.min(Service.id), func.max(Service.id)))).one()
+    if first_id is None:
+        return 0
+
+    total = 0
+    for start in range(first_id, last_id + 1, batch):
+        async with AsyncSessionLocal() as db:
+            total += await refresh_range(db, start, start + batch - 1)
+    await invalidate_catalog_caches()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="Пересчитать все услуги")
+    parser.add_argument("--batch", type=int, default=settings.POPULARITY_REFRESH_BATCH)
+    args = parser.parse_args()
+
+    if args.full:
+        updated = asyncio.run(refresh_all(args.batch))
+    else:
+        popularity_refresher.batch_size = args.batch
+        updated = asyncio.run(popularity_refresher.run_once())
+    print(f"Оценка популярности пересчитана: {updated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Демонстрационные данные: 15 городов и по 5 услуг каждого типа
+
+Загружаются этой командой или при старте приложения с SEED_ON_STARTUP=true.
+Пустая база заполняется, непустая не меняется. Запуск из каталога services_service:
+    python -m app.commands.seed_demo
+"""
+import asyncio
+import zlib
+
+from sqlalchemy import select, func
+
+from app.db.database import AsyncSessionLocal
+from app.models.city import City
+from app.models.service import ServiceType
+from app.services.ingest import ServiceIngestor
+
+
+async def seed_demo_data():
+    """Заполнение тестовыми данными, если городов еще нет"""
+    db = AsyncSessionLocal()
+    
+    try:
+        # Проверяем, есть ли уже данные
+        if await db.scalar(select(func.count(City.id))) > 0:
+            return
+        
+        # 15 городов
+        cities_data = [
+            {"name": "Москва", "slug": "moscow", "latitude": 55.7558, "longitude": 37.6173},
+            {"name": "Санкт-Петербург", "slug": "spb", "latitude": 59.9343, "longitude": 30.3351},
+            {"name": "Екатеринбург", "slug": "ekaterinburg", "latitude": 56.8389, "longitude": 60.6057},
+            {"name": "Казань", "slug": "kazan", "latitude": 55.7963, "longitude": 49.1088},
+            {"name": "Новосибирск", "slug": "novosibirsk", "latitude": 55.0084, "longitude": 82.9357},
+            {"name": "Челябинск", "slug": "chelyabinsk", "latitude": 55.1644, "longitude": 61.4368},
+            {"name": "Краснодар", "slug": "krasnodar", "latitude": 45.0355, "longitude": 38.9753},
+            {"name": "Нижний Новгород", "slug": "nizhni_novgorod", "latitude": 56.2965, "longitude": 43.9361},
+            {"name": "Самара", "slug": "samara", "latitude": 53.1959, "longitude": 50.1002},
+            {"name": "Уфа", "slug": "ufa", "latitude": 54.7388, "longitude": 55.9721},
+            {"name": "Ростов-на-Дону", "slug": "rostov", "latitude": 47.2357, "longitude": 39.7015},
+            {"name": "Омск", "slug": "omsk", "latitude": 54.9885, "longitude": 73.3242},
+            {"name": "Красноярск", "slug": "krasnoyarsk", "latitude": 56.0153, "longitude": 92.8932},
+            {"name": "Воронеж", "slug": "voronezh", "latitude": 51.672, "longitude": 39.1843},
+            {"name": "Пермь", "slug": "perm", "latitude": 58.0105, "longitude": 56.2502},
+        ]
+        
+        cities = []
+        for city_data in cities_data:
+            city = City(**city_data)
+            db.add(city)
+            cities.append(city)
+        
+        await db.commit()
+        
+        # Тестовые услуги для каждого города
+        services_templates = {
+            ServiceType.WORK: [
+                {"title": "Маникюр", "description": "Профессиональный маникюр и педикюр", "price": 1500},
+                {"title": "Репетитор по математике", "description": "Подготовка к ЕГЭ и ОГЭ", "price": 2000},
+                {"title": "Сантехник", "description": "Установка и ремонт сантехники", "price": 3000},
+                {"title": "Электрик", "description": "Электромонтажные работы любой сложности", "price": 2500},
+                {"title": "Уборка квартир", "description": "Генеральная и поддерживающая уборка", "price": 4000},
+            ],
+            ServiceType.ESTATE: [
+                {"title": "2-к квартира, 65 м²", "description": "Евроремонт, мебель, техника", "price": 8500000},
+                {"title": "1-к квартира, 42 м²", "description": "Новостройка, чистовая отделка", "price": 5200000},
+                {"title": "Студия, 28 м²", "description": "Современный ремонт, центр города", "price": 3800000},
+                {"title": "3-к квартира, 95 м²", "description": "Просторная планировка, парковка", "price": 12000000},
+                {"title": "Таунхаус, 150 м²", "description": "Загородная жизнь рядом с городом", "price": 15000000},
+            ],
+            ServiceType.NEWS: [
+                {"title": "Открытие нового ТЦ", "description": "В центре города открылся крупный торговый центр", "price": None},
+                {"title": "Ремонт дорог завершен", "description": "Капитальный ремонт главной улицы закончен", "price": None},
+                {"title": "Новая линия метро", "description": "Планируется строительство новой ветки метрополитена", "price": None},
+                {"title": "Фестиваль еды", "description": "В эти выходные пройдет гастрономический фестиваль", "price": None},
+                {"title": "День города", "description": "Программа мероприятий на День города", "price": None},
+            ],
+            ServiceType.AUTO: [
+                {"title": "Toyota Camry 2020", "description": "Пробег 45000 км, один владелец", "price": 2500000},
+                {"title": "BMW X5 2019", "description": "Полный привод, панорамная крыша", "price": 4500000},
+                {"title": "Lada Vesta 2022", "description": "Новая, на гарантии", "price": 1200000},
+                {"title": "Mercedes E-class 2021", "description": "AMG пакет, все опции", "price": 5800000},
+                {"title": "Kia Rio 2023", "description": "Автомат, климат-контроль", "price": 1600000},
+            ],
+        }
+        
+        # Загрузка тем же пакетным путем, что и POST /services/bulk
+        ingestor = ServiceIngestor(db)
+        for city in cities:
+            for service_type, templates in services_templates.items():
+                for template in templates:
+                    await ingestor.add_service({
+                        "city_id": city.id,
+                        "service_type": service_type,
+                        "title": template["title"],
+                        "description": template["description"],
+                        "price": template["price"],
+                        "image_url": "img/news01.webp",
+                        "rating": round(3 + (zlib.crc32(template["title"].encode()) % 20) / 10, 1),
+                        "reviews_count": zlib.crc32(template["title"].encode()) % 500
+                    })
+        
+        await ingestor.finish()
+        print("Тестовые данные успешно добавлены!")
+        
+    except Exception as e:
+        print(f"Ошибка при добавлении тестовых данных: {e}")
+        await db.rollback()
+    finally:
+        await db.close()
+
+
+def main():
+    asyncio.run(seed_demo_data())
+
+
+if __name__ == "__main__":
+    main()
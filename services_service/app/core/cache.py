@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.shared_cache import shared_cache
+
+
+class ResponseCache:
+    """
+    Кэш сериализованных ответов в памяти процесса
+
+    Записи живут не дольше ttl секунд и сбрасываются явно через invalidate()
+    при изменении данных. Сброс действует в пределах одного процесса,
+    остальные воркеры обновятся по истечении TTL. Ключи могут зависеть от
+    параметров запроса, поэтому записей не больше max_entries: сверх лимита
+    вытесняются давно не читанные, устаревшие удаляются при чтении.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, enabled: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Получить байты ответа или None, если записи нет или она устарела"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: bytes, generation: Optional[int] = None) -> None:
+        """
+        Сохранить байты ответа
+
+        generation - значение self.generation до начала вычисления ответа:
+        если за это время кэш был сброшен, устаревший результат не сохраняется.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Сбросить все записи"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Счетчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+cities_cache = ResponseCache(
+    ttl=settings.CITIES_CACHE_TTL,
+    max_entries=settings.CITIES_CACHE_MAX_ENTRIES,
+    enabled=settings.CITIES_CACHE_ENABLED
+)
+
+facets_cache = ResponseCache(
+    ttl=settings.FACETS_CACHE_TTL,
+    max_entries=settings.FACETS_CACHE_MAX_ENTRIES,
+    enabled=settings.FACETS_CACHE_ENABLED
+)
+
+
+async def invalidate_catalog_caches() -> None:
+    """Сброс кэшей, зависящих от набора услуг"""
+    cities_cache.invalidate()
+    facets_cache.invalidate()
+    await shared_cache.invalidate("services")
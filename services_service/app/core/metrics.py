@@ -0,0 +1,19 @@
+"""
+Метрики Prometheus сервиса: общая реализация common.metrics
+
+К статистике БД запроса добавляется проверка бюджета SQL-запросов (app.core.query_budget).
+"""
+from starlette.types import ASGIApp
+
+from common.metrics import MetricsMiddleware as BaseMetricsMiddleware, instrument_engine, metrics_response, route_template
+
+from app.core.query_budget import RequestDbStats, check_budget
+
+__all__ = ["MetricsMiddleware", "instrument_engine", "metrics_response", "route_template"]
+
+
+class MetricsMiddleware(BaseMetricsMiddleware):
+    """Метрики запроса и лог превышения бюджета SQL-запросов"""
+
+    def __init__(self, app: ASGIApp):
+        super().__init__(app, stats_factory=RequestDbStats, on_finish=check_budget)
@@ -0,0 +1,107 @@
+"""
+Выбор формата и сжатия ответа по заголовкам Accept и Accept-Encoding
+
+Формат: JSON по умолчанию или MessagePack (application/msgpack) - та же
+структура ServiceWithCity без повторяющихся строковых десятичных значений.
+Сжатие: brotli, если клиент его принимает и модуль установлен, иначе gzip;
+ответы меньше COMPRESSION_MIN_SIZE байт не сжимаются. У представлений
+в разных форматах разные ETag (representation_etag).
+"""
+import gzip
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.responses import dump_json, dump_msgpack
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli необязателен, остается gzip
+    brotli = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Заголовки запроса, от которых зависит ответ; передается и в 304
+VARY = "Accept, Accept-Encoding"
+
+
+def header_qualities(header: Optional[str]) -> Dict[str, float]:
+    """Значения заголовка Accept* с весами q (без q - 1.0, некорректный q - 0)"""
+    qualities = {}
+    for part in (header or "").split(","):
+        value, *params = [item.strip() for item in part.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, raw = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(raw)
+                except ValueError:
+                    quality = 0.0
+        qualities[value.lower()] = quality
+    return qualities
+
+
+def preferred_media_type(request: Request) -> str:
+    """MessagePack только по явному запросу клиента и не ниже по весу, чем JSON"""
+    qualities = header_qualities(request.headers.get("accept"))
+    msgpack_quality = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    if msgpack_quality > 0 and msgpack_quality >= qualities.get(JSON_MEDIA_TYPE, 0.0):
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def representation_etag(etag: str, media_type: str) -> str:
+    """
+    ETag представления в формате media_type
+
+    JSON сохраняет валидатор ресурса, MessagePack получает свой: иначе кэш
+    мог бы подтвердить копию в одном формате валидатором другого.
+    """
+    if media_type == JSON_MEDIA_TYPE:
+        return etag
+    return f'{etag[:-1]}-msgpack"'
+
+
+def preferred_encoding(request: Request) -> Optional[str]:
+    qualities = header_qualities(request.headers.get("accept-encoding"))
+    if brotli is not None and qualities.get("br", 0.0) > 0:
+        return "br"
+    if qualities.get("gzip", 0.0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL)
+
+
+def encode_payload(payload, media_type: str) -> bytes:
+    return dump_msgpack(payload) if media_type == MSGPACK_MEDIA_TYPE else dump_json(payload)
+
+
+def body_response(request: Request, body: bytes, media_type: str, headers: Optional[dict] = None) -> Response:
+    """Ответ с уже сериализованным телом, сжатым по Accept-Encoding"""
+    headers = dict(headers or {})
+    headers["Vary"] = VARY
+
+    if len(body) >= settings.COMPRESSION_MIN_SIZE:
+        encoding = preferred_encoding(request)
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def negotiated_response(request: Request, payload, headers: Optional[dict] = None) -> Response:
+    """Ответ с payload в формате и сжатии, выбранных по заголовкам запроса"""
+    media_type = preferred_media_type(request)
+    return body_response(request, encode_payload(payload, media_type), media_type, headers)
@@ -0,0 +1,59 @@
+import base64
+import json
+import math
+from datetime import datetime
+from typing import Any, List
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Упаковка ключа последней строки страницы в непрозрачный курсор"""
+    payload = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Распаковка курсора, выданного encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise _invalid_cursor()
+
+    return values
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Некорректный курсор"
+    )
+
+
+def decode_id(value: Any) -> int:
+    """Разбор id из курсора"""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise _invalid_cursor()
+    return value
+
+
+def decode_number(value: Any) -> float:
+    """Разбор числового ключа (оценки, ранга) из курсора: конечное число, не bool"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise _invalid_cursor()
+    return value
+
+
+def decode_datetime(value: Any) -> datetime:
+    """Разбор даты из курсора"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise _invalid_cursor()
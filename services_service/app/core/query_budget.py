@@ -0,0 +1,94 @@
+"""
+Бюджет SQL-запросов на HTTP-запрос и поиск N+1
+
+Статистика собирается событиями движка (см. common.metrics.instrument_engine)
+в объект RequestDbStats текущего запроса. Запрос сверх бюджета пишется в лог
+вместе с повторяющимися выражениями - типичным признаком N+1.
+
+Бюджет по умолчанию задается настройкой QUERY_BUDGET, для маршрута - зависимостью:
+
+    @router.get("/{service_id}", dependencies=[Depends(query_budget(1))])
+
+В тестах assert_query_budget проваливает тест, если какой-либо запрос внутри
+блока превысил объявленный бюджет:
+
+    with assert_query_budget():
+        client.get("/api/v1/services/")
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from common.metrics import RequestDbStats as BaseRequestDbStats, current_db_stats
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestDbStats(BaseRequestDbStats):
+    """Статистика БД запроса с выполненными выражениями и бюджетом"""
+
+    __slots__ = ("statements", "budget")
+
+    def __init__(self):
+        super().__init__()
+        self.statements: Counter = Counter()
+        self.budget: Optional[int] = settings.QUERY_BUDGET
+
+    def record(self, statement: str, elapsed: float) -> None:
+        super().record(statement, elapsed)
+        self.statements[statement] += 1
+
+    def repeated_statements(self, limit: int = 5) -> List[Tuple[str, int]]:
+        """Выражения, выполненные больше одного раза, от самых частых"""
+        return [(statement, count) for statement, count in self.statements.most_common(limit) if count > 1]
+
+
+# Списки нарушений, открытые assert_query_budget
+_recorders: List[list] = []
+
+
+def query_budget(max_queries: Optional[int]):
+    """Зависимость FastAPI, объявляющая бюджет маршрута; None снимает проверку"""
+
+    async def declare_budget():
+        stats = current_db_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return declare_budget
+
+
+def check_budget(method: str, route: str, stats: RequestDbStats) -> None:
+    """Лог и регистрация нарушения, если запрос вышел за бюджет"""
+    if stats.budget is None or stats.queries <= stats.budget:
+        return
+
+    repeated = stats.repeated_statements()
+    logger.warning(
+        "%s %s: %d SQL-запросов при бюджете %d, время в БД %.1f мс%s",
+        method, route, stats.queries, stats.budget, stats.db_time * 1000,
+        "".join(f"\n  x{count}: {' '.join(statement.split())}" for statement, count in repeated)
+    )
+    for violations in _recorders:
+        violations.append((method, route, stats.queries, stats.budget, repeated))
+
+
+@contextmanager
+def assert_query_budget() -> Iterator[list]:
+    """Помощник для pytest: AssertionError, если запросы внутри блока превысили бюджет"""
+    violations: list = []
+    _recorders.append(violations)
+    try:
+        yield violations
+    finally:
+        _recorders.remove(violations)
+
+    if violations:
+        lines = []
+        for method, route, queries, budget, repeated in violations:
+            lines.append(f"{method} {route}: {queries} SQL-запросов при бюджете {budget}")
+            lines.extend(f"  x{count}: {' '.join(statement.split())}" for statement, count in repeated)
+        raise AssertionError("Превышен бюджет SQL-запросов:\n" + "\n".join(lines))
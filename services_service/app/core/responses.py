@@ -0,0 +1,59 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, List
+
+import msgpack
+import orjson
+from app.schemas.service import ServiceWithCity
+
+# Порядок полей совпадает с сериализацией ServiceWithCity в pydantic
+SERVICE_WITH_CITY_FIELDS = list(ServiceWithCity.model_fields)
+
+
+def _default(value):
+    # pydantic сериализует Decimal в JSON строкой
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json(data) -> bytes:
+    """JSON в том же виде, что и ответ FastAPI через response_model"""
+    return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z)
+
+
+def format_datetime(value: datetime) -> str:
+    """Дата в том же виде, что и в JSON-ответах (UTC с суффиксом Z), для форматов без типа даты"""
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z)[1:-1].decode()
+
+
+def _msgpack_default(value):
+    # В MessagePack десятичные значения передаются числами, а не строками как в JSON
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def dump_msgpack(data) -> bytes:
+    """MessagePack той же структуры, что и JSON-ответ; даты - расширение timestamp"""
+    return msgpack.packb(data, default=_msgpack_default, datetime=True)
+
+
+def service_items(rows: Iterable[dict]) -> List[dict]:
+    """Строки проекции в виде ServiceWithCity с порядком полей pydantic"""
+    return [{field: row[field] for field in SERVICE_WITH_CITY_FIELDS} for row in rows]
+
+
+def batch_payload(items: Iterable[dict], missing: List[int]) -> dict:
+    """Структура ответа ServiceBatchResponse"""
+    return {"items": service_items(items), "missing": missing}
+
+
+def dump_services(rows: Iterable[dict]) -> bytes:
+    """
+    Сериализация строк проекции в JSON-массив ServiceWithCity за один проход
+
+    Обработчики приходят к тем же байтам через encode_payload(service_items(...)),
+    сама функция - эталон для тестов контракта и бенчмарка сериализации.
+    """
+    return dump_json(service_items(rows))
@@ -0,0 +1,319 @@
+"""
+Общий для воркеров кэш ответов чтения
+
+Ответы get_service, списков услуг и get_city_by_slug хранятся в Redis (или
+другом сервере с протоколом Redis), поэтому прогреваются и сбрасываются
+сразу во всех воркерах. Ключ записи - пространство имен, его версия и хэш
+нормализованных параметров запроса. Запись данных сбрасывает пространство
+имен целиком, увеличивая версию (INCR): старые записи больше не читаются
+и истекают по TTL.
+
+Если Redis не настроен или недоступен, записи хранятся в памяти процесса:
+кэш продолжает работать, но сброс действует только в своем воркере, а
+остальные обновятся по истечении TTL. Недоступный Redis проверяется снова
+не чаще раза в CACHE_REDIS_RETRY_SECONDS секунд.
+
+Клиент в окне read-your-writes (см. app.db.replicas) читает мимо кэша:
+он не получает страницу, построенную по отстающей реплике до его записи,
+и его ответ в кэш не попадает.
+"""
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import msgpack
+from fastapi import Request, Response
+from prometheus_client import Counter
+
+from app.core.conditional import is_not_modified, not_modified
+from app.core.config import settings
+from app.core.metrics import route_template
+from app.core.negotiation import VARY, body_response, encode_payload, preferred_media_type, representation_etag
+from app.core.single_flight import single_flight
+from app.db.replicas import reads_own_writes
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # pragma: no cover - без redis остается кэш в памяти процесса
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Обращения к общему кэшу ответов: hit, miss, bypass - чтение мимо кэша после записи клиента",
+    ["route", "result"]
+)
+CACHE_SAVED_SECONDS = Counter(
+    "cache_saved_seconds_total",
+    "Время построения ответа, сэкономленное попаданиями в кэш",
+    ["route"]
+)
+CACHE_BACKEND_ERRORS = Counter(
+    "cache_backend_errors_total",
+    "Ошибки обращения к Redis, после которых кэш перешел на память процесса"
+)
+
+BACKEND_ERRORS = (OSError, redis.RedisError) if redis is not None else (OSError,)
+
+Builder = Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]]
+
+
+class MemoryBackend:
+    """Записи в памяти процесса; при переполнении вытесняются давно не читанные"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._versions[key] = self._versions.get(key, 0) + 1
+        return self._versions[key]
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Записи в Redis; версии пространств имен хранятся без TTL
+
+    Используется протокол RESP2: его поддерживают и совместимые с Redis серверы.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, timeout: float):
+        self._client = redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout, protocol=2)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(key, value, px=int(ttl * 1000))
+
+    async def get_version(self, key: str) -> int:
+        value = await self._client.get(key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """Параметры запроса в каноническом виде: по имени, без пустых значений"""
+    return "&".join(f"{name}={params[name]}" for name in sorted(params) if params[name] is not None)
+
+
+class SharedCache:
+    """Кэш с версионированными пространствами имен поверх Redis или памяти процесса"""
+
+    def __init__(
+        self,
+        ttl: float,
+        local: MemoryBackend,
+        remote: Optional[RedisBackend] = None,
+        retry_seconds: float = 30,
+        prefix: str = "cache",
+        enabled: bool = True
+    ):
+        self.ttl = ttl
+        self.local = local
+        self.remote = remote
+        self.retry_seconds = retry_seconds
+        self.prefix = prefix
+        self.enabled = enabled
+        self._remote_down_until = 0.0
+        self._routes: Dict[str, Dict[str, float]] = {}
+
+    def _remote_available(self) -> bool:
+        return self.remote is not None and self._remote_down_until <= time.monotonic()
+
+    def _remote_failed(self, error: Exception) -> None:
+        self._remote_down_until = time.monotonic() + self.retry_seconds
+        CACHE_BACKEND_ERRORS.inc()
+        logger.warning("Кэш Redis недоступен, используется память процесса: %s", error)
+
+    async def _call(self, method: str, *args):
+        if self._remote_available():
+            try:
+                return await getattr(self.remote, method)(*args)
+            except BACKEND_ERRORS as e:
+                self._remote_failed(e)
+        return await getattr(self.local, method)(*args)
+
+    def _version_key(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}:version"
+
+    def entry_key(self, namespace: str, version: int, params: Dict[str, Any]) -> str:
+        digest = hashlib.sha1(normalize_params(params).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{namespace}:{version}:{digest}"
+
+    async def get(self, namespace: str, params: Dict[str, Any]) -> Tuple[int, Optional[bytes]]:
+        """
+        Текущая версия пространства имен и запись по параметрам
+
+        Версию нужно передать в set(): если пространство сбросили, пока
+        строился ответ, он сохранится под старой версией и не будет прочитан.
+        """
+        version = await self._call("get_version", self._version_key(namespace))
+        return version, await self._call("get", self.entry_key(namespace, version, params))
+
+    async def set(self, namespace: str, version: int, params: Dict[str, Any], value: bytes) -> None:
+        await self._call("set", self.entry_key(namespace, version, params), value, self.ttl)
+
+    async def invalidate(self, namespace: str) -> None:
+        """Сбросить пространство имен во всех воркерах (в памяти процесса - в своем)"""
+        # Локальная версия сдвигается всегда: при переходе на память не отдадим записи до сброса
+        await self.local.incr(self._version_key(namespace))
+        if self._remote_available():
+            try:
+                await self.remote.incr(self._version_key(namespace))
+            except BACKEND_ERRORS as e:
+                self._remote_failed(e)
+
+    def record(self, route: str, result: str, saved_seconds: float = 0.0) -> None:
+        """Учет обращения по маршруту: hit, miss или bypass; saved_seconds - сэкономленное попаданием время"""
+        stats = self._routes.setdefault(route, {"hits": 0, "misses": 0, "bypassed": 0, "saved_seconds": 0.0})
+        if result == "hit":
+            stats["hits"] += 1
+            stats["saved_seconds"] += saved_seconds
+            CACHE_SAVED_SECONDS.labels(route).inc(saved_seconds)
+        elif result == "miss":
+            stats["misses"] += 1
+        else:
+            stats["bypassed"] += 1
+        CACHE_REQUESTS.labels(route, result).inc()
+
+    def stats(self) -> dict:
+        """Доля попаданий и сэкономленное время по маршрутам в текущем процессе"""
+        routes = {}
+        for route, stats in self._routes.items():
+            total = stats["hits"] + stats["misses"]
+            routes[route] = {
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "bypassed": stats["bypassed"],
+                "hit_ratio": round(stats["hits"] / total, 4) if total else 0.0,
+                "saved_seconds": round(stats["saved_seconds"], 4)
+            }
+        return {
+            "enabled": self.enabled,
+            "backend": self.remote.name if self._remote_available() else self.local.name,
+            "local_entries": self.local.size(),
+            "routes": routes
+        }
+
+    async def close(self) -> None:
+        if self.remote is not None:
+            await self.remote.close()
+
+
+def _respond(request: Request, body: bytes, media_type: str, headers: Dict[str, str], cache_status: str) -> Response:
+    etag = headers.get("ETag")
+    if etag:
+        etag = representation_etag(etag, media_type)
+        headers = {**headers, "ETag": etag}
+        last_modified = headers.get("Last-Modified")
+        last_modified = parsedate_to_datetime(last_modified) if last_modified else None
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified, vary=VARY)
+
+    return body_response(request, body, media_type, {**headers, "X-Cache": cache_status})
+
+
+def cached_reads_enabled() -> bool:
+    """Идут ли чтения через cached_response: общий кэш или single-flight включены"""
+    return shared_cache.enabled or single_flight.enabled
+
+
+async def cached_response(request: Request, namespace: str, params: Dict[str, Any], build: Builder) -> Response:
+    """
+    Ответ из общего кэша либо построенный build() и сохраненный в кэш
+
+    build возвращает payload и заголовки ответа (ETag, Last-Modified и др.).
+    В кэш попадает тело в формате, выбранном по Accept, вместе с заголовками,
+    поэтому условные запросы при попадании проверяются без обращения к БД.
+    Одинаковые одновременные промахи в процессе объединяются: build()
+    и сериализация выполняются один раз. Исключения build (например, 404)
+    не кэшируются. Клиент, который недавно писал, получает ответ build()
+    без чтения и заполнения кэша.
+    """
+    route = route_template(request.scope)
+    media_type = preferred_media_type(request)
+
+    if reads_own_writes(request):
+        payload, headers = await build()
+        shared_cache.record(route, "bypass")
+        return _respond(request, encode_payload(payload, media_type), media_type, headers, "BYPASS")
+
+    params = {**params, "format": media_type}
+    started = time.perf_counter()
+    version, entry = await shared_cache.get(namespace, params) if shared_cache.enabled else (0, None)
+    if entry is not None:
+        cached = msgpack.unpackb(entry)
+        saved_seconds = max(0.0, cached["seconds"] - (time.perf_counter() - started))
+        shared_cache.record(route, "hit", saved_seconds=saved_seconds)
+        return _respond(request, cached["body"], media_type, cached["headers"], "HIT")
+
+    async def fetch() -> Tuple[bytes, Dict[str, str]]:
+        payload, headers = await build()
+        body = encode_payload(payload, media_type)
+        if shared_cache.enabled:
+            entry = msgpack.packb({"body": body, "headers": headers, "seconds": time.perf_counter() - started})
+            await shared_cache.set(namespace, version, params, entry)
+        return body, headers
+
+    # Ключ включает версию: запрос, пришедший после сброса, не присоединится к чтению до него
+    (body, headers), coalesced = await single_flight.do(shared_cache.entry_key(namespace, version, params), route, fetch)
+    shared_cache.record(route, "miss")
+    return _respond(request, body, media_type, headers, "COALESCED" if coalesced else "MISS")
+
+
+def _create_shared_cache() -> SharedCache:
+    remote = None
+    if settings.CACHE_REDIS_URL:
+        if redis is None:
+            logger.warning("CACHE_REDIS_URL задан, но пакет redis не установлен: используется память процесса")
+        else:
+            remote = RedisBackend(settings.CACHE_REDIS_URL, settings.CACHE_REDIS_TIMEOUT)
+
+    return SharedCache(
+        ttl=settings.SHARED_CACHE_TTL,
+        local=MemoryBackend(settings.SHARED_CACHE_LOCAL_MAX_ENTRIES),
+        remote=remote,
+        retry_seconds=settings.CACHE_REDIS_RETRY_SECONDS,
+        prefix=settings.CACHE_KEY_PREFIX,
+        enabled=settings.SHARED_CACHE_ENABLED
+    )
+
+
+shared_cache = _create_shared_cache()
@@ -0,0 +1,76 @@
+"""
+Объединение одинаковых одновременных чтений (single-flight)
+
+Пока по ключу выполняется запрос к БД, остальные запросы с тем же ключом
+не берут соединение из пула, а ждут и получают тот же результат. Если
+первый запрос отменен (клиент отключился), ожидающие не получают отмену:
+один из них выполняет запрос заново.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from prometheus_client import Counter
+
+from app.core.config import settings
+
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "single_flight_requests_total",
+    "Чтения через single-flight: executed - выполнили запрос, coalesced - получили чужой результат",
+    ["route", "result"]
+)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # Ошибку получает вызвавший запрос; без ожидающих asyncio не должен писать "exception was never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """Выполняющиеся вызовы по ключу в текущем процессе"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, route: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Результат fn() для ключа и признак того, что он получен от другого запроса
+
+        Исключения fn() (в том числе HTTPException) получают все ожидающие.
+        """
+        if not self.enabled:
+            return await fn(), False
+
+        while key in self._calls:
+            future = self._calls[key]
+            # wait, в отличие от await future, не отменяет общий future при отмене ожидающего
+            await asyncio.wait([future])
+            if future.cancelled():
+                continue
+            SINGLE_FLIGHT_REQUESTS.labels(route, "coalesced").inc()
+            return future.result(), True
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._calls[key] = future
+        SINGLE_FLIGHT_REQUESTS.labels(route, "executed").inc()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+single_flight = SingleFlight(enabled=settings.SINGLE_FLIGHT_ENABLED)
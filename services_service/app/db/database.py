@@ -1,23 +1,69 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Request
+
 from app.core.config import settings
+from app.db.replicas import ReplicaRouter
 
+# Синхронный движок: создание схемы, миграции и служебные скрипты
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок: обработчики запросов, не блокирующие event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Реплики для читающих обработчиков, см. app.db.replicas
+replica_engines = [
+    create_async_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        connect_args={"timeout": settings.DB_REPLICA_CONNECT_TIMEOUT}
+    )
+    for url in settings.ASYNC_REPLICA_URLS
+]
+
+replica_router = ReplicaRouter(replica_engines, settings.DB_REPLICA_RETRY_SECONDS, primary=async_engine)
+
 Base = declarative_base()
 
+# База общая с auth_service: у миграций Alembic этого сервиса своя таблица версий
+MIGRATIONS_VERSION_TABLE = "services_alembic_version"
+
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
+
+async def open_read_session(request: Request) -> AsyncSession:
+    """Сессия только для чтения: реплика, если она доступна, иначе основная база"""
+    db = replica_router.open_session(request)
+    if db is None:
+        db = AsyncSessionLocal()
+    return db
+
+
+async def get_read_db(request: Request):
+    async with await open_read_session(request) as db:
+        yield db
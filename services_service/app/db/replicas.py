@@ -0,0 +1,158 @@
+"""
+Маршрутизация чтения на реплики
+
+Читающие обработчики получают сессию через get_read_db: реплики выбираются
+по кругу, недоступная реплика исключается на DB_REPLICA_RETRY_SECONDS,
+а если живых реплик нет - используется основная база. Клиент, который
+только что писал, READ_YOUR_WRITES_SECONDS читает с основной базы, чтобы
+увидеть свои изменения несмотря на задержку репликации.
+
+Сессия реплики берет соединение из пула только при первом запросе к БД:
+запросы, объединенные single-flight или отвеченные из кэша, соединение
+не занимают. Если соединение с репликой получить не удалось, этот же
+запрос выполняется на основной базе (ReplicaSession), а реплика, к которой
+не удалось подключиться, исключается для следующих запросов.
+"""
+import itertools
+import logging
+import time
+from typing import Iterable, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSession(Session):
+    """
+    Сессия реплики с переходом на основную базу
+
+    При первом запросе сессия берет соединение реплики; если это не удалось
+    (реплика недоступна, пул исчерпан), все запросы сессии идут на движок
+    info["primary"].
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        bind = self.info.get("active_bind")
+        if bind is not None:
+            return bind
+
+        bind = self.bind
+        try:
+            self.connection(bind_arguments={"bind": bind})
+        except Exception as e:
+            bind = self.info["primary"]
+            logger.warning("Реплика недоступна, запрос выполняется на основной базе: %s", e)
+        self.info["active_bind"] = bind
+        return bind
+
+
+class ReplicaRouter:
+    """Круговой выбор реплик с временным исключением недоступных"""
+
+    def __init__(self, engines: List[AsyncEngine], retry_seconds: float, primary: AsyncEngine):
+        self.engines = engines
+        self.sessionmakers = [
+            async_sessionmaker(
+                bind=engine,
+                class_=AsyncSession,
+                sync_session_class=ReplicaSession,
+                info={"primary": primary.sync_engine},
+                autoflush=False,
+                expire_on_commit=False
+            )
+            for engine in engines
+        ]
+        self.retry_seconds = retry_seconds
+        self._unhealthy_until = [0.0] * len(engines)
+        self._turn = itertools.count()
+        for index, engine in enumerate(engines):
+            self._watch_connects(index, engine)
+
+    def _watch_connects(self, index: int, engine: AsyncEngine) -> None:
+        """Исключает реплику, к которой не удалось установить новое соединение"""
+        @event.listens_for(engine.sync_engine, "do_connect")
+        def do_connect(dialect, conn_rec, cargs, cparams):
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except Exception:
+                self.mark_unhealthy(index)
+                raise
+
+    def candidates(self) -> List[int]:
+        """Номера живых реплик, начиная со следующей по кругу"""
+        if not self.engines:
+            return []
+        start = next(self._turn)
+        now = time.monotonic()
+        count = len(self.engines)
+        return [
+            index for index in ((start + shift) % count for shift in range(count))
+            if self._unhealthy_until[index] <= now
+        ]
+
+    def mark_unhealthy(self, index: int) -> None:
+        self._unhealthy_until[index] = time.monotonic() + self.retry_seconds
+
+    def open_session(self, request: Request) -> Optional[AsyncSession]:
+        """Сессия следующей живой реплики (соединение берется при первом запросе, см. ReplicaSession) или None"""
+        if reads_own_writes(request):
+            return None
+
+        candidates = self.candidates()
+        if not candidates:
+            return None
+        return self.sessionmakers[candidates[0]]()
+
+
+def reads_own_writes(request: Request) -> bool:
+    """Клиент недавно писал и должен читать с основной базы"""
+    until = request.cookies.get(READ_PRIMARY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """
+    После успешного изменяющего запроса выставляет cookie окна чтения с основной базы
+
+    read_only_paths - пути POST-запросов, которые ничего не пишут (например, пакетное чтение).
+    """
+
+    def __init__(self, app: ASGIApp, window_seconds: int, read_only_paths: Iterable[str] = ()):
+        self.app = app
+        self.window_seconds = window_seconds
+        self.read_only_paths = set(read_only_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or scope["path"] in self.read_only_paths
+            or self.window_seconds <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + self.window_seconds
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{READ_PRIMARY_COOKIE}={until}; Max-Age={self.window_seconds}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,3 +1,5 @@
 from .city import City
 from .service import Service
+from .service_counter import ServiceCounter
 
+from .review import Review
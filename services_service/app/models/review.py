@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, SmallInteger, Text, Boolean, ForeignKey, DateTime, Index, CheckConstraint
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class Review(Base):
+    """Отзыв об услуге; в агрегаты услуги попадает фоновым сбросом (applied)"""
+    __tablename__ = "reviews"
+    
+    id = Column(Integer, primary_key=True)
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, nullable=True)
+    rating = Column(SmallInteger, nullable=False)
+    text = Column(Text, nullable=True)
+    applied = Column(Boolean, nullable=False, default=False, server_default="false")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        CheckConstraint("rating BETWEEN 1 AND 5", name="ck_reviews_rating"),
+        # Лента отзывов услуги от новых к старым
+        Index("ix_reviews_service_id_id", "service_id", "id"),
+        # Очередь сброса: только еще не учтенные отзывы
+        Index("ix_reviews_pending", "id", postgresql_where=applied.is_(False)),
+    )
+    
+    def __repr__(self):
+        return f"<Review(id={self.id}, service_id={self.service_id}, rating={self.rating})>"
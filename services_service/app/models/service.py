@@ -1,10 +1,27 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric, ForeignKey, Enum, DateTime
+from sqlalchemy import Column, Integer, String, Text, Numeric, Float, ForeignKey, Enum, DateTime, Index, literal_column, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
 import enum
 
 
+# Конфигурация полнотекстового поиска PostgreSQL
+SEARCH_CONFIG = literal_column("'russian'")
+
+
+def search_document(title, description):
+    """
+    Выражение tsvector по заголовку и описанию
+
+    Запросы должны строить документ этой же функцией, иначе планировщик
+    не сопоставит выражение с GIN-индексом ix_services_search.
+    """
+    return func.to_tsvector(
+        SEARCH_CONFIG,
+        func.coalesce(title, literal_column("''")) + literal_column("' '") + func.coalesce(description, literal_column("''"))
+    )
+
+
 class ServiceType(enum.Enum):
     WORK = "work"
     ESTATE = "estate"
@@ -26,12 +43,37 @@ class Service(Base):
     
     rating = Column(Numeric(2, 1), default=0)
     reviews_count = Column(Integer, default=0)
+    # Сумма оценок для пересчета среднего без накопления ошибки округления;
+    # NULL - сумма еще не велась и выводится из rating * reviews_count
+    rating_sum = Column(Numeric(14, 1), nullable=True)
+    # Оценка популярности, считается фоновой задачей (app.services.popularity); NULL - еще не посчитана
+    popularity_score = Column(Float, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     city = relationship("City", back_populates="services")
     
+    __table_args__ = (
+        # Ключи для курсорной пагинации: (created_at, id) в пределах фильтров
+        Index("ix_services_city_type_created_id", "city_id", "service_type", "created_at", "id"),
+        Index("ix_services_city_created_id", "city_id", "created_at", "id"),
+        Index("ix_services_type_created_id", "service_type", "created_at", "id"),
+        Index("ix_services_created_id", "created_at", "id"),
+        # То же для sort=popular: (popularity_score, id)
+        Index("ix_services_city_type_popularity_id", "city_id", "service_type", "popularity_score", "id"),
+        Index("ix_services_city_popularity_id", "city_id", "popularity_score", "id"),
+        Index("ix_services_type_popularity_id", "service_type", "popularity_score", "id"),
+        Index("ix_services_popularity_id", "popularity_score", "id"),
+        # Очередь фонового расчета: услуги без оценки
+        Index("ix_services_popularity_pending", "id", postgresql_where=text("popularity_score IS NULL")),
+        Index(
+            "ix_services_search",
+            search_document(title, description),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+    
     def __repr__(self):
         return f"<Service(id={self.id}, title={self.title}, type={self.service_type})>"
 
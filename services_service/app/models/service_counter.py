@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, ForeignKey, Enum, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+from app.models.service import ServiceType
+
+
+class ServiceCounter(Base):
+    """Количество услуг и время последнего изменения по городу и типу, поддерживается при записи услуг"""
+    __tablename__ = "service_counters"
+    
+    city_id = Column(Integer, ForeignKey("cities.id", ondelete="CASCADE"), primary_key=True)
+    service_type = Column(Enum(ServiceType), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    last_modified = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    
+    def __repr__(self):
+        return f"<ServiceCounter(city_id={self.city_id}, type={self.service_type}, count={self.count})>"
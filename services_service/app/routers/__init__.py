@@ -1,3 +1,4 @@
 from .cities import router as cities_router
+from .images import router as images_router
 from .services import router as services_router
 
@@ -1,45 +1,75 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db
+from app.core.cache import cities_cache
+from app.core.conditional import body_etag, make_etag, is_not_modified, not_modified
+from app.core.query_budget import query_budget
+from app.core.shared_cache import cached_reads_enabled, cached_response, shared_cache
+from app.db.database import get_db, get_read_db
 from app.models.city import City
-from app.models.service import Service
-from app.schemas.city import CityCreate, CityResponse, CityWithCount
+from app.schemas.city import CityCreate, CityResponse, CityWithCount, CityNearest
+from app.services.cities import CITIES_CACHE_KEY, load_cities_body
+from app.services.geo import city_locator
 
 router = APIRouter(prefix="/cities", tags=["Cities"])
 
 
-@router.get("/", response_model=List[CityWithCount])
-async def get_all_cities(db: Session = Depends(get_db)):
+def _cities_response(request: Request, body: bytes, cache_status: str) -> Response:
+    """Ответ со списком городов либо 304, если у клиента та же версия"""
+    etag = body_etag(body)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "X-Cache": cache_status}
+    )
+
+
+@router.get("/", response_model=List[CityWithCount], dependencies=[Depends(query_budget(1))])
+async def get_all_cities(request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Получение списка всех городов с количеством услуг
-    """
-    cities = db.query(
-        City,
-        func.count(Service.id).label("services_count")
-    ).outerjoin(Service).group_by(City.id).all()
     
-    result = []
-    for city, count in cities:
-        city_dict = {
-            "id": city.id,
-            "name": city.name,
-            "slug": city.slug,
-            "services_count": count
-        }
-        result.append(city_dict)
+    Ответ кэшируется в сериализованном виде и сбрасывается
+    при создании города или услуги
+    """
+    body = cities_cache.get(CITIES_CACHE_KEY)
+    if body is not None:
+        return _cities_response(request, body, "HIT")
     
-    return result
+    body = await load_cities_body(db)
+    return _cities_response(request, body, "MISS")
 
 
-@router.get("/{city_slug}", response_model=CityResponse)
-async def get_city_by_slug(city_slug: str, db: Session = Depends(get_db)):
+@router.get("/nearest", response_model=List[CityNearest], dependencies=[Depends(query_budget(1))])
+async def get_nearest_cities(
+    lat: float = Query(..., ge=-90, le=90, description="Широта"),
+    lon: float = Query(..., ge=-180, le=180, description="Долгота"),
+    k: int = Query(1, ge=1, le=50, description="Число городов"),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
-    Получение города по slug
+    Ближайшие к точке города
+    
+    Поиск идет по индексу в памяти; города без координат не учитываются
     """
-    city = db.query(City).filter(City.slug == city_slug).first()
+    index = await city_locator.get_index(db)
+    return [
+        {**city, "distance_km": round(distance, 3)}
+        for city, distance in index.nearest(lat, lon, k)
+    ]
+
+
+async def _fetch_city(db: AsyncSession, city_slug: str):
+    """Город в виде CityResponse и его ETag"""
+    result = await db.execute(
+        select(City.name, City.slug, City.latitude, City.longitude, City.id).where(City.slug == city_slug)
+    )
+    city = result.mappings().one_or_none()
     
     if not city:
         raise HTTPException(
@@ -47,17 +77,48 @@ async def get_city_by_slug(city_slug: str, db: Session = Depends(get_db)):
             detail="Город не найден"
         )
     
+    etag = make_etag("city", city["id"], city["name"], city["slug"], city["latitude"], city["longitude"])
+    return dict(city), etag
+
+
+@router.get("/{city_slug}", response_model=CityResponse, dependencies=[Depends(query_budget(1))])
+async def get_city_by_slug(
+    city_slug: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получение города по slug
+    
+    Поддерживает условные запросы (If-None-Match)
+    """
+    if cached_reads_enabled():
+        async def build():
+            city, etag = await _fetch_city(db, city_slug)
+            return city, {"ETag": etag}
+        
+        return await cached_response(request, "cities", {"city_slug": city_slug}, build)
+    
+    city, etag = await _fetch_city(db, city_slug)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    response.headers["ETag"] = etag
     return city
 
 
 @router.post("/", response_model=CityResponse, status_code=status.HTTP_201_CREATED)
-async def create_city(city_data: CityCreate, db: Session = Depends(get_db)):
+async def create_city(city_data: CityCreate, db: AsyncSession = Depends(get_db)):
     """
     Создание нового города
     """
-    existing = db.query(City).filter(
-        (City.name == city_data.name) | (City.slug == city_data.slug)
-    ).first()
+    result = await db.execute(
+        select(City).where(
+            (City.name == city_data.name) | (City.slug == city_data.slug)
+        ).limit(1)
+    )
+    existing = result.scalar_one_or_none()
     
     if existing:
         raise HTTPException(
@@ -67,8 +128,11 @@ async def create_city(city_data: CityCreate, db: Session = Depends(get_db)):
     
     city = City(**city_data.model_dump())
     db.add(city)
-    db.commit()
-    db.refresh(city)
+    await db.commit()
+    await db.refresh(city)
+    cities_cache.invalidate()
+    city_locator.invalidate()
+    await shared_cache.invalidate("cities")
     
     return city
 
@@ -0,0 +1,54 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import FileResponse
+
+from app.core.conditional import is_not_modified, not_modified
+from app.core.config import settings
+from app.core.negotiation import header_qualities
+from app.services.images import VARIANT_FORMATS, image_variants
+
+router = APIRouter(prefix="/images", tags=["Images"])
+
+CACHE_CONTROL = "public, max-age=86400"
+
+
+def _preferred_format(request: Request) -> str:
+    """AVIF, если клиент явно принимает его с весом не ниже WebP, иначе WebP"""
+    qualities = header_qualities(request.headers.get("accept"))
+    avif_quality = qualities.get("image/avif", 0.0)
+    webp_quality = qualities.get("image/webp", qualities.get("image/*", qualities.get("*/*", 0.0)))
+    return "avif" if avif_quality > 0 and avif_quality >= webp_quality else "webp"
+
+
+@router.get("/{width}/{image_path:path}")
+async def get_image_variant(
+    width: int,
+    image_path: str,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(webp|avif)$", description="Формат; по умолчанию по заголовку Accept")
+):
+    """
+    Уменьшенная копия изображения услуги
+    
+    width - одна из IMAGE_WIDTHS, image_path - значение image_url услуги.
+    Вариант строится при первом запросе и дальше отдается с диска.
+    Поддерживает условные запросы (If-None-Match)
+    """
+    if width not in settings.IMAGE_WIDTHS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Недопустимая ширина, доступны: {settings.IMAGE_WIDTHS}"
+        )
+    
+    image_format = format or _preferred_format(request)
+    path, digest = await image_variants.get_variant(image_path, width, image_format)
+    
+    headers = {"ETag": f'"{digest}"', "Cache-Control": CACHE_CONTROL}
+    if format is None:
+        headers["Vary"] = "Accept"
+    if is_not_modified(request, headers["ETag"]):
+        response = not_modified(headers["ETag"])
+        response.headers.update(headers)
+        return response
+    
+    return FileResponse(path, media_type=VARIANT_FORMATS[image_format][1], headers=headers)
@@ -1,106 +1,380 @@
+from datetime import datetime
+from functools import partial
+from decimal import Decimal
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db
+from app.core.cache import facets_cache, invalidate_catalog_caches
+from app.core.conditional import body_etag, make_etag, is_not_modified, not_modified, validator_headers
+from app.core.config import settings
+from app.core.negotiation import VARY, negotiated_response, preferred_media_type, representation_etag, JSON_MEDIA_TYPE
+from app.core.query_budget import query_budget
+from app.core.responses import batch_payload, service_items
+from app.core.shared_cache import cached_reads_enabled, cached_response
+from app.db.database import get_db, get_read_db, open_read_session
 from app.models.city import City
 from app.models.service import Service, ServiceType as ServiceTypeModel
-from app.schemas.service import ServiceCreate, ServiceResponse, ServiceWithCity, ServiceType, ServiceUpdate
+from app.models.service_counter import ServiceCounter
+from app.schemas.service import (
+    ServiceCreate, ServiceResponse, ServiceWithCity, ServiceType, BulkIngestReport,
+    ServiceBatchRequest, ServiceBatchResponse, ServiceFacets, ReviewCreate, ReviewResponse
+)
+from app.services.catalog import CatalogService
+from app.services.counters import CounterService
+from app.services.export import EXPORT_MEDIA_TYPES, stream_export
+from app.services.geo import city_locator
+from app.services.ingest import ServiceIngestor, iter_csv_records, iter_ndjson_records
+from app.services.reviews import ReviewService
 
 router = APIRouter(prefix="/services", tags=["Services"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
-@router.get("/", response_model=List[ServiceWithCity])
+_facets_adapter = TypeAdapter(ServiceFacets)
+
+
+def _render_page(request: Request, services: List[dict], response: Response, headers: dict):
+    """
+    Ответ со страницей услуг
+
+    В режиме FAST_JSON_ENABLED строки проекции сериализуются сразу тем же форматом,
+    что и ServiceWithCity, минуя повторную валидацию response_model. Формат (JSON или
+    MessagePack) и сжатие выбираются по заголовкам Accept и Accept-Encoding.
+    """
+    if settings.FAST_JSON_ENABLED or preferred_media_type(request) != JSON_MEDIA_TYPE:
+        return negotiated_response(request, service_items(services), headers)
+    
+    response.headers.update({**headers, "Vary": VARY})
+    return services
+
+
+async def _list_page(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    city_slug: Optional[str],
+    service_type: Optional[str],
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    sort: str
+):
+    """
+    Общая часть списков услуг: условный GET и страница с курсором
+
+    Валидатор списка строится по числу строк и последнему изменению в выборке
+    без чтения и сериализации самой страницы. При включенном общем кэше
+    страница вместе с валидатором берется из него, а одинаковые одновременные
+    запросы выполняют чтение один раз.
+    """
+    catalog = CatalogService(db)
+    
+    if cached_reads_enabled():
+        async def build():
+            count, last_modified = await catalog.list_validator(city_slug, service_type)
+            services, next_cursor = await catalog.list_services(
+                city_slug=city_slug,
+                service_type=service_type,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                sort=sort
+            )
+            headers = validator_headers(
+                make_etag("services", city_slug, service_type, sort, skip, limit, cursor, count, last_modified),
+                last_modified
+            )
+            if next_cursor:
+                headers[NEXT_CURSOR_HEADER] = next_cursor
+            return service_items(services), headers
+        
+        params = {
+            "list": "services", "city_slug": city_slug, "service_type": service_type,
+            "sort": sort, "skip": skip, "limit": limit, "cursor": cursor
+        }
+        return await cached_response(request, "services", params, build)
+    
+    count, last_modified = await catalog.list_validator(city_slug, service_type)
+    etag = representation_etag(
+        make_etag("services", city_slug, service_type, sort, skip, limit, cursor, count, last_modified),
+        preferred_media_type(request)
+    )
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified, vary=VARY)
+    
+    services, next_cursor = await catalog.list_services(
+        city_slug=city_slug,
+        service_type=service_type,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort
+    )
+    
+    headers = validator_headers(etag, last_modified)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    return _render_page(request, services, response, headers)
+
+
+@router.get("/", response_model=List[ServiceWithCity], dependencies=[Depends(query_budget(2))])
 async def get_services(
+    request: Request,
+    response: Response,
     city_slug: Optional[str] = Query(None, description="Фильтр по городу (slug)"),
     service_type: Optional[ServiceType] = Query(None, description="Тип услуги"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (X-Next-Cursor)"),
+    sort: str = Query("newest", pattern="^(newest|popular)$", description="Порядок: newest - новые, popular - популярные"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Получение списка услуг с фильтрацией
-    """
-    query = db.query(Service).join(City)
-    
-    if city_slug:
-        query = query.filter(City.slug == city_slug)
-    
-    if service_type:
-        query = query.filter(Service.service_type == ServiceTypeModel[service_type.value.upper()])
-    
-    services = query.offset(skip).limit(limit).all()
-    
-    result = []
-    for service in services:
-        service_dict = {
-            "id": service.id,
-            "city_id": service.city_id,
-            "service_type": service.service_type.value,
-            "title": service.title,
-            "description": service.description,
-            "price": service.price,
-            "image_url": service.image_url,
-            "rating": service.rating,
-            "reviews_count": service.reviews_count,
-            "created_at": service.created_at,
-            "updated_at": service.updated_at,
-            "city_name": service.city.name,
-            "city_slug": service.city.slug
-        }
-        result.append(service_dict)
     
-    return result
+    Поддерживает курсорную пагинацию: значение заголовка X-Next-Cursor
+    передается в параметре cursor для получения следующей страницы.
+    sort=popular упорядочивает по оценке популярности (рейтинг, отзывы, новизна).
+    Поддерживает условные запросы (If-None-Match / If-Modified-Since)
+    """
+    return await _list_page(
+        request, response, db,
+        city_slug=city_slug,
+        service_type=service_type.value if service_type else None,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort
+    )
 
 
-@router.get("/by-type/{service_type}", response_model=List[ServiceWithCity])
+@router.get("/by-type/{service_type}", response_model=List[ServiceWithCity], dependencies=[Depends(query_budget(2))])
 async def get_services_by_type(
+    request: Request,
+    response: Response,
     service_type: ServiceType,
     city_slug: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (X-Next-Cursor)"),
+    sort: str = Query("newest", pattern="^(newest|popular)$", description="Порядок: newest - новые, popular - популярные"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Получение услуг по типу (work, estate, news, auto)
+    
+    Поддерживает курсорную пагинацию аналогично списку услуг
+    """
+    return await _list_page(
+        request, response, db,
+        city_slug=city_slug,
+        service_type=service_type.value,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort
+    )
+
+
+@router.get("/search", response_model=List[ServiceWithCity], dependencies=[Depends(query_budget(1))])
+async def search_services(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+    city_slug: Optional[str] = Query(None, description="Фильтр по городу (slug)"),
+    service_type: Optional[ServiceType] = Query(None, description="Тип услуги"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Полнотекстовый поиск услуг по заголовку и описанию
+    
+    Результаты отсортированы по релевантности, пагинация курсорная
     """
-    query = db.query(Service).join(City).filter(
-        Service.service_type == ServiceTypeModel[service_type.value.upper()]
+    services, next_cursor = await CatalogService(db).search_services(
+        q=q,
+        city_slug=city_slug,
+        service_type=service_type.value if service_type else None,
+        limit=limit,
+        cursor=cursor
     )
     
-    if city_slug:
-        query = query.filter(City.slug == city_slug)
-    
-    services = query.offset(skip).limit(limit).all()
-    
-    result = []
-    for service in services:
-        service_dict = {
-            "id": service.id,
-            "city_id": service.city_id,
-            "service_type": service.service_type.value,
-            "title": service.title,
-            "description": service.description,
-            "price": service.price,
-            "image_url": service.image_url,
-            "rating": service.rating,
-            "reviews_count": service.reviews_count,
-            "created_at": service.created_at,
-            "updated_at": service.updated_at,
-            "city_name": service.city.name,
-            "city_slug": service.city.slug
-        }
-        result.append(service_dict)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    return _render_page(request, services, response, headers)
+
+
+async def _batch(request: Request, db: AsyncSession, ids: List[int]):
+    """Общая часть пакетного получения услуг"""
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Не более {settings.BATCH_MAX_IDS} ID за запрос"
+        )
+    
+    items, missing = await CatalogService(db).get_services_batch(ids)
+    
+    if settings.FAST_JSON_ENABLED or preferred_media_type(request) != JSON_MEDIA_TYPE:
+        return negotiated_response(request, batch_payload(items, missing))
     
-    return result
+    return {"items": items, "missing": missing}
 
 
-@router.get("/{service_id}", response_model=ServiceWithCity)
-async def get_service(service_id: int, db: Session = Depends(get_db)):
+@router.get("/batch", response_model=ServiceBatchResponse, dependencies=[Depends(query_budget(1))])
+async def get_services_batch(
+    request: Request,
+    ids: List[str] = Query(..., description="ID услуг через запятую или повторяющимся параметром"),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
-    Получение услуги по ID
+    Получение нескольких услуг по ID одним запросом
+    
+    Услуги возвращаются в порядке запроса, отсутствующие ID
+    перечисляются в поле missing
+    """
+    try:
+        service_ids = [int(value) for raw in ids for value in raw.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID услуг должны быть целыми числами"
+        )
+    
+    return await _batch(request, db, service_ids)
+
+
+@router.post("/batch", response_model=ServiceBatchResponse, dependencies=[Depends(query_budget(1))])
+async def get_services_batch_post(
+    request: Request,
+    batch: ServiceBatchRequest,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получение нескольких услуг по ID, переданным в теле запроса
+    
+    Вариант GET /services/batch для больших наборов ID
+    """
+    return await _batch(request, db, batch.ids)
+
+
+@router.get("/export", dependencies=[Depends(query_budget(1))])
+async def export_services(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Формат выгрузки: ndjson или csv"),
+    city_slug: Optional[str] = Query(None, description="Фильтр по городу (slug)"),
+    service_type: Optional[ServiceType] = Query(None, description="Тип услуги"),
+    updated_since: Optional[datetime] = Query(None, description="Только измененные или созданные начиная с этого момента")
+):
+    """
+    Полная выгрузка услуг с названием города потоком NDJSON или CSV
+    
+    Строки читаются серверным курсором порциями фиксированного размера,
+    с реплики, как и остальные чтения
     """
-    service = db.query(Service).filter(Service.id == service_id).first()
+    return StreamingResponse(
+        stream_export(
+            partial(open_read_session, request),
+            format=format,
+            city_slug=city_slug,
+            service_type=service_type.value if service_type else None,
+            updated_since=updated_since
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="services.{format}"'}
+    )
+
+
+@router.get("/facets", response_model=ServiceFacets, dependencies=[Depends(query_budget(1))])
+async def get_service_facets(
+    request: Request,
+    city_slug: Optional[str] = Query(None, description="Фильтр по городу (slug)"),
+    service_type: Optional[ServiceType] = Query(None, description="Тип услуги"),
+    price_min: Optional[Decimal] = Query(None, ge=0, description="Минимальная цена"),
+    price_max: Optional[Decimal] = Query(None, ge=0, description="Максимальная цена"),
+    rating_min: Optional[Decimal] = Query(None, ge=0, le=5, description="Минимальный рейтинг"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Счетчики для боковой панели фильтров
+    
+    Количество услуг по типу, городу, диапазону цены и рейтингу
+    при текущих фильтрах; каждый разрез считается без собственного фильтра,
+    итог - со всеми. Ответ кэшируется по набору фильтров
+    """
+    filters = (
+        city_slug,
+        service_type.value if service_type else None,
+        price_min.normalize() if price_min is not None else None,
+        price_max.normalize() if price_max is not None else None,
+        rating_min.normalize() if rating_min is not None else None
+    )
+    cache_key = "facets:" + make_etag(*filters)
+    
+    body = facets_cache.get(cache_key)
+    cache_status = "HIT"
+    if body is None:
+        cache_status = "MISS"
+        generation = facets_cache.generation
+        facets = await CatalogService(db).facets(
+            settings.FACET_PRICE_BOUNDS,
+            city_slug=filters[0],
+            service_type=filters[1],
+            price_min=price_min,
+            price_max=price_max,
+            rating_min=rating_min
+        )
+        body = _facets_adapter.dump_json(_facets_adapter.validate_python(facets))
+        facets_cache.set(cache_key, body, generation)
+    
+    etag = body_etag(body)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "X-Cache": cache_status}
+    )
+
+
+@router.get("/nearby", response_model=List[ServiceWithCity], dependencies=[Depends(query_budget(2))])
+async def get_services_nearby(
+    request: Request,
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90, description="Широта"),
+    lon: float = Query(..., ge=-180, le=180, description="Долгота"),
+    radius_km: float = Query(50, gt=0, le=settings.NEARBY_MAX_RADIUS_KM, description="Радиус поиска городов, км"),
+    service_type: Optional[ServiceType] = Query(None, description="Тип услуги"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Услуги городов в радиусе от точки
+    
+    Сначала услуги ближайшего города, затем следующих по удаленности;
+    внутри города - от новых к старым
+    """
+    index = await city_locator.get_index(db)
+    city_ids = [city["id"] for city, _ in index.within(lat, lon, radius_km)]
+    
+    services = await CatalogService(db).list_in_cities(
+        city_ids,
+        service_type=service_type.value if service_type else None,
+        skip=skip,
+        limit=limit
+    )
+    return _render_page(request, services, response, {})
+
+
+async def _fetch_service(db: AsyncSession, service_id: int):
+    """Услуга с городом и ее валидаторы (ETag, Last-Modified)"""
+    service = await CatalogService(db).get_service(service_id)
     
     if not service:
         raise HTTPException(
@@ -108,29 +382,84 @@ async def get_service(service_id: int, db: Session = Depends(get_db)):
             detail="Услуга не найдена"
         )
     
-    return {
-        "id": service.id,
-        "city_id": service.city_id,
-        "service_type": service.service_type.value,
-        "title": service.title,
-        "description": service.description,
-        "price": service.price,
-        "image_url": service.image_url,
-        "rating": service.rating,
-        "reviews_count": service.reviews_count,
-        "created_at": service.created_at,
-        "updated_at": service.updated_at,
-        "city_name": service.city.name,
-        "city_slug": service.city.slug
-    }
+    last_modified = service["updated_at"] or service["created_at"]
+    etag = make_etag("service", service["id"], last_modified, service["city_name"], service["city_slug"])
+    return service, etag, last_modified
+
+
+@router.get("/{service_id}", response_model=ServiceWithCity, dependencies=[Depends(query_budget(1))])
+async def get_service(
+    service_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получение услуги по ID
+    
+    Поддерживает условные запросы (If-None-Match / If-Modified-Since)
+    """
+    if cached_reads_enabled():
+        async def build():
+            service, etag, last_modified = await _fetch_service(db, service_id)
+            return service_items([service])[0], validator_headers(etag, last_modified)
+        
+        return await cached_response(request, "services", {"service_id": service_id}, build)
+    
+    service, etag, last_modified = await _fetch_service(db, service_id)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    
+    response.headers.update(validator_headers(etag, last_modified))
+    return service
+
+
+@router.post(
+    "/{service_id}/reviews",
+    response_model=ReviewResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(2))]
+)
+async def create_review(service_id: int, review_data: ReviewCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Отзыв об услуге
+    
+    Рейтинг и число отзывов услуги пересчитываются фоновой задачей
+    с задержкой до REVIEWS_FLUSH_INTERVAL секунд
+    """
+    return await ReviewService(db).create_review(
+        service_id,
+        rating=review_data.rating,
+        text=review_data.text,
+        user_id=review_data.user_id
+    )
+
+
+@router.get("/{service_id}/reviews", response_model=List[ReviewResponse], dependencies=[Depends(query_budget(1))])
+async def get_reviews(
+    service_id: int,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Отзывы об услуге от новых к старым
+    
+    Пагинация курсорная: значение заголовка X-Next-Cursor передается в параметре cursor
+    """
+    reviews, next_cursor = await ReviewService(db).list_reviews(service_id, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return reviews
 
 
-@router.post("/", response_model=ServiceResponse, status_code=status.HTTP_201_CREATED)
-async def create_service(service_data: ServiceCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=ServiceResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(query_budget(4))])
+async def create_service(service_data: ServiceCreate, db: AsyncSession = Depends(get_db)):
     """
     Создание новой услуги
     """
-    city = db.query(City).filter(City.id == service_data.city_id).first()
+    city = await db.get(City, service_data.city_id)
     if not city:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -146,36 +475,65 @@ async def create_service(service_data: ServiceCreate, db: Session = Depends(get_
         image_url=service_data.image_url
     )
     db.add(service)
-    db.commit()
-    db.refresh(service)
+    await CounterService(db).increment(service.city_id, service.service_type)
+    await db.commit()
+    await db.refresh(service)
+    await invalidate_catalog_caches()
     
     return service
 
 
-@router.get("/count/by-city/{city_slug}")
-async def get_services_count_by_city(city_slug: str, db: Session = Depends(get_db)):
+@router.post("/bulk", response_model=BulkIngestReport, dependencies=[Depends(query_budget(None))])
+async def create_services_bulk(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="Формат тела: ndjson или csv"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Пакетная загрузка услуг потоком NDJSON или CSV
+    
+    Формат определяется параметром format или заголовком Content-Type
+    (text/csv для CSV, иначе NDJSON). Каждая строка содержит поля ServiceCreate,
+    вместо city_id можно передать city_slug. Некорректные строки
+    не прерывают загрузку и попадают в отчет с номером строки. Запись CSV
+    длиннее BULK_MAX_RECORD_SIZE (обычно незакрытая кавычка) останавливает
+    разбор: строки до нее записываются, ошибка попадает в отчет.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if content_type.startswith("text/csv") else "ndjson"
+    
+    parse = iter_csv_records if format == "csv" else iter_ndjson_records
+    return await ServiceIngestor(db).ingest(parse(request.stream()))
+
+
+@router.get("/count/by-city/{city_slug}", dependencies=[Depends(query_budget(1))])
+async def get_services_count_by_city(city_slug: str, db: AsyncSession = Depends(get_read_db)):
     """
     Получение количества услуг по городу
+    
+    Читается из поддерживаемых счетчиков одним запросом
     """
-    city = db.query(City).filter(City.slug == city_slug).first()
-    if not city:
+    rows = (await db.execute(
+        select(City.name, City.slug, ServiceCounter.service_type, ServiceCounter.count)
+        .outerjoin(ServiceCounter, ServiceCounter.city_id == City.id)
+        .where(City.slug == city_slug)
+    )).all()
+    
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Город не найден"
         )
     
-    counts = {}
-    for st in ServiceTypeModel:
-        count = db.query(Service).filter(
-            Service.city_id == city.id,
-            Service.service_type == st
-        ).count()
-        counts[st.value] = count
+    counts = {st.value: 0 for st in ServiceTypeModel}
+    for row in rows:
+        if row.service_type is not None:
+            counts[row.service_type.value] = row.count
     
     return {
-        "city": city.name,
-        "city_slug": city.slug,
+        "city": rows[0].name,
+        "city_slug": rows[0].slug,
         "counts": counts,
         "total": sum(counts.values())
     }
-
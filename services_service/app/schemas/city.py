@@ -5,6 +5,8 @@ from typing import Optional, List
 class CityBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     slug: str = Field(..., min_length=1, max_length=100)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class CityCreate(CityBase):
@@ -21,3 +23,6 @@ class CityResponse(CityBase):
 class CityWithCount(CityResponse):
     services_count: int = 0
 
+
+class CityNearest(CityResponse):
+    distance_km: float
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
@@ -46,4 +46,74 @@ class ServiceResponse(ServiceBase):
 class ServiceWithCity(ServiceResponse):
     city_name: str
     city_slug: str
+    thumbnail_url: Optional[str] = None
 
+
+
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[dict]
+
+
+class BulkIngestReport(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
+    errors_truncated: bool = False
+
+
+class ServiceBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
+class ServiceBatchResponse(BaseModel):
+    items: List[ServiceWithCity]
+    missing: List[int]
+
+
+class TypeFacet(BaseModel):
+    service_type: ServiceType
+    count: int
+
+
+class CityFacet(BaseModel):
+    city_slug: str
+    city_name: str
+    count: int
+
+
+class PriceFacet(BaseModel):
+    """Диапазон цены [price_from, price_to); None - без границы"""
+    price_from: Optional[Decimal] = None
+    price_to: Optional[Decimal] = None
+    count: int
+
+
+class RatingFacet(BaseModel):
+    """Диапазон рейтинга [rating_from, rating_from + 1)"""
+    rating_from: int
+    count: int
+
+
+class ServiceFacets(BaseModel):
+    total: int
+    service_type: List[TypeFacet]
+    city: List[CityFacet]
+    price: List[PriceFacet]
+    without_price: int
+    rating: List[RatingFacet]
+
+
+class ReviewCreate(BaseModel):
+    rating: int = Field(..., ge=1, le=5)
+    text: Optional[str] = Field(None, max_length=5000)
+    user_id: Optional[int] = None
+
+
+class ReviewResponse(ReviewCreate):
+    id: int
+    service_id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,2 @@
+from .catalog import CatalogService
+from .counters import CounterService, reconcile_counters
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob(ABC):
+    """Фоновая задача процесса, вызывающая run_once раз в interval секунд"""
+
+    name = "job"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def run_once(self) -> int:
+        """Один проход задачи; возвращает число обработанных записей"""
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Ошибка фоновой задачи %s", self.name)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, final_run: bool = True) -> None:
+        """Остановка; final_run - выполнить задачу последний раз, чтобы не оставлять хвост до следующего запуска"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if final_run:
+            await self.run_once()
@@ -0,0 +1,364 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from sqlalchemy import Integer, Numeric, and_, any_, func, literal, literal_column, or_, select, true, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import encode_cursor, decode_cursor, decode_datetime, decode_id, decode_number
+from app.models.city import City
+from app.models.service import Service, ServiceType as ServiceTypeModel, SEARCH_CONFIG, search_document
+from app.models.service_counter import ServiceCounter
+from app.services.images import thumbnail_url
+
+
+# Колонки ответа ServiceWithCity: услуга и город выбираются одним запросом
+SERVICE_WITH_CITY_COLUMNS = (
+    Service.id,
+    Service.city_id,
+    Service.service_type,
+    Service.title,
+    Service.description,
+    Service.price,
+    Service.image_url,
+    Service.rating,
+    Service.reviews_count,
+    Service.created_at,
+    Service.updated_at,
+    City.name.label("city_name"),
+    City.slug.label("city_slug"),
+)
+
+
+def city_id_by_slug(city_slug: str):
+    """
+    ID города по slug скалярным подзапросом
+
+    Подзапрос вычисляется один раз до чтения услуг, и фильтр по city_id
+    использует индексы (city_id, ..., id) в порядке ключа пагинации.
+    """
+    return select(City.id).where(City.slug == city_slug).scalar_subquery()
+
+
+def row_to_dict(row) -> dict:
+    """Преобразование строки проекции в словарь ответа ServiceWithCity"""
+    data = dict(row)
+    data["service_type"] = data["service_type"].value
+    data["thumbnail_url"] = thumbnail_url(data["image_url"])
+    return data
+
+
+class CatalogService:
+    """Чтение услуг вместе с городом без загрузки ORM-объектов"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def base_query():
+        """Проекция услуг, соединенная с городами"""
+        return select(*SERVICE_WITH_CITY_COLUMNS).join(City, City.id == Service.city_id)
+
+    @staticmethod
+    def apply_filters(query, city_slug: Optional[str] = None, service_type: Optional[str] = None):
+        """Фильтры по slug города и типу услуги"""
+        if city_slug:
+            query = query.where(Service.city_id == city_id_by_slug(city_slug))
+
+        if service_type:
+            query = query.where(Service.service_type == ServiceTypeModel[service_type.upper()])
+
+        return query
+
+    @staticmethod
+    def apply_range_filters(
+        query,
+        price_min: Optional[Decimal] = None,
+        price_max: Optional[Decimal] = None,
+        rating_min: Optional[Decimal] = None
+    ):
+        """Фильтры по диапазону цены и минимальному рейтингу"""
+        if price_min is not None:
+            query = query.where(Service.price >= price_min)
+
+        if price_max is not None:
+            query = query.where(Service.price <= price_max)
+
+        if rating_min is not None:
+            query = query.where(Service.rating >= rating_min)
+
+        return query
+
+    async def list_services(
+        self,
+        city_slug: Optional[str] = None,
+        service_type: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        sort: str = "newest"
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Страница услуг в стабильном порядке по убыванию
+
+        sort=newest - по (created_at, id), sort=popular - по (popularity_score, id);
+        услуги, для которых оценка еще не посчитана, в популярные не попадают.
+        При переданном cursor страница строится по ключу (keyset) и skip игнорируется,
+        иначе используется offset для обратной совместимости.
+        Возвращает строки страницы и курсор следующей страницы.
+        """
+        query = self.apply_filters(self.base_query(), city_slug, service_type)
+
+        if sort == "popular":
+            query = query.add_columns(Service.popularity_score).where(Service.popularity_score.is_not(None))
+            sort_column, sort_key = Service.popularity_score, "popularity_score"
+        else:
+            sort_column, sort_key = Service.created_at, "created_at"
+        query = query.order_by(sort_column.desc(), Service.id.desc())
+
+        if cursor:
+            value, service_id = decode_cursor(cursor, 2)
+            value = decode_number(value) if sort == "popular" else decode_datetime(value)
+            query = query.where(tuple_(sort_column, Service.id) < tuple_(value, decode_id(service_id)))
+        else:
+            query = query.offset(skip)
+
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([last[sort_key], last["id"]])
+
+        items = [row_to_dict(row) for row in rows]
+        for item in items:
+            item.pop("popularity_score", None)
+        return items, next_cursor
+
+    async def list_in_cities(
+        self,
+        city_ids: List[int],
+        service_type: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> List[dict]:
+        """
+        Услуги нескольких городов: сначала города в порядке city_ids, внутри города - новые
+        """
+        if not city_ids:
+            return []
+
+        ids = literal(city_ids, ARRAY(Integer))
+        query = self.apply_filters(self.base_query(), service_type=service_type)
+        query = query.where(Service.city_id == any_(ids)).order_by(
+            func.array_position(ids, Service.city_id),
+            Service.created_at.desc(),
+            Service.id.desc()
+        )
+
+        result = await self.db.execute(query.offset(skip).limit(limit))
+        return [row_to_dict(row) for row in result.mappings()]
+
+    async def list_validator(
+        self,
+        city_slug: Optional[str] = None,
+        service_type: Optional[str] = None
+    ) -> Tuple[int, Optional[datetime]]:
+        """
+        Количество строк и время последнего изменения в выборке (для ETag списка)
+
+        Читается из таблицы счетчиков, а не агрегатом по услугам.
+        """
+        query = select(
+            func.coalesce(func.sum(ServiceCounter.count), 0),
+            func.max(ServiceCounter.last_modified)
+        ).select_from(ServiceCounter)
+
+        if city_slug:
+            query = query.where(ServiceCounter.city_id == city_id_by_slug(city_slug))
+
+        if service_type:
+            query = query.where(ServiceCounter.service_type == ServiceTypeModel[service_type.upper()])
+
+        result = await self.db.execute(query)
+        count, last_modified = result.one()
+        return count, last_modified
+
+    async def search_services(
+        self,
+        q: str,
+        city_slug: Optional[str] = None,
+        service_type: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Полнотекстовый поиск по заголовку и описанию
+
+        Результаты упорядочены по релевантности (ts_rank_cd), затем по id.
+        Пагинация курсорная по паре (rank, id).
+        """
+        document = search_document(Service.title, Service.description)
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = func.ts_rank_cd(document, ts_query)
+
+        query = self.apply_filters(
+            self.base_query().add_columns(rank.label("rank")),
+            city_slug,
+            service_type
+        ).where(document.op("@@")(ts_query))
+        query = query.order_by(rank.desc(), Service.id.desc())
+
+        if cursor:
+            last_rank, service_id = decode_cursor(cursor, 2)
+            query = query.where(tuple_(rank, Service.id) < tuple_(decode_number(last_rank), decode_id(service_id)))
+
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([last["rank"], last["id"]])
+
+        items = []
+        for row in rows:
+            data = row_to_dict(row)
+            del data["rank"]
+            items.append(data)
+
+        return items, next_cursor
+
+    async def get_services_batch(self, ids: List[int]) -> Tuple[List[dict], List[int]]:
+        """
+        Услуги по списку ID одним запросом WHERE id = ANY(...)
+
+        Возвращает найденные услуги в порядке запроса (без повторов)
+        и список ID, которых нет в базе.
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return [], []
+
+        result = await self.db.execute(
+            self.base_query().where(Service.id == any_(literal(ids, ARRAY(Integer))))
+        )
+        found = {row["id"]: row_to_dict(row) for row in result.mappings()}
+
+        items = [found[service_id] for service_id in ids if service_id in found]
+        missing = [service_id for service_id in ids if service_id not in found]
+        return items, missing
+
+    async def get_service(self, service_id: int) -> Optional[dict]:
+        """Услуга по ID вместе с городом"""
+        result = await self.db.execute(
+            self.base_query().where(Service.id == service_id)
+        )
+        row = result.mappings().first()
+
+        return row_to_dict(row) if row else None
+
+    async def facets(
+        self,
+        price_bounds: List[int],
+        city_slug: Optional[str] = None,
+        service_type: Optional[str] = None,
+        price_min: Optional[Decimal] = None,
+        price_max: Optional[Decimal] = None,
+        rating_min: Optional[Decimal] = None
+    ) -> dict:
+        """
+        Количество услуг по типу, городу, диапазону цены и рейтингу
+
+        Все разрезы и общий итог считаются одним проходом через GROUPING SETS.
+        Разрез считается со всеми фильтрами, кроме своего: при service_type=x
+        разрез по типу показывает и остальные типы, чтобы их можно было выбрать.
+        Для этого у каждого разреза свой count(*) FILTER, а WHERE отбрасывает
+        строки, не прошедшие два фильтра и больше. Общий итог - со всеми
+        фильтрами. Диапазоны цены заданы возрастающими границами price_bounds.
+        """
+        price_bucket = func.width_bucket(Service.price, literal(price_bounds, ARRAY(Numeric)))
+        rating_bucket = func.floor(Service.rating).cast(Integer)
+
+        # Условия фильтров по разрезу, к которому они относятся
+        conditions = {
+            "type": self.apply_filters(select(), service_type=service_type).whereclause,
+            "city": self.apply_filters(select(), city_slug=city_slug).whereclause,
+            "price": self.apply_range_filters(select(), price_min, price_max).whereclause,
+            "rating": self.apply_range_filters(select(), rating_min=rating_min).whereclause,
+        }
+        active = [dimension for dimension, condition in conditions.items() if condition is not None]
+
+        def matching(exclude: Optional[str] = None):
+            return and_(true(), *(conditions[dimension] for dimension in active if dimension != exclude))
+
+        query = select(
+            func.grouping(Service.service_type).label("by_type"),
+            func.grouping(City.slug, City.name).label("by_city"),
+            func.grouping(price_bucket).label("by_price"),
+            func.grouping(rating_bucket).label("by_rating"),
+            Service.service_type,
+            City.slug,
+            City.name,
+            price_bucket.label("price_bucket"),
+            rating_bucket.label("rating_bucket"),
+            *(func.count().filter(matching(dimension)).label(f"{dimension}_count") for dimension in conditions),
+            func.count().filter(matching()).label("total_count")
+        ).select_from(Service).join(City, City.id == Service.city_id)
+        if active:
+            query = query.where(or_(*(matching(dimension) for dimension in active)))
+        query = query.group_by(func.grouping_sets(
+            Service.service_type,
+            tuple_(City.slug, City.name),
+            price_bucket,
+            rating_bucket,
+            literal_column("()")
+        ))
+
+        result = await self.db.execute(query)
+
+        facets = {"total": 0, "service_type": [], "city": [], "price": [], "without_price": 0, "rating": []}
+        bounds = [None] + [Decimal(bound) for bound in price_bounds] + [None]
+        for row in result.mappings():
+            if row["by_type"] == 0:
+                dimension = "type"
+            elif row["by_city"] == 0:
+                dimension = "city"
+            elif row["by_price"] == 0:
+                dimension = "price"
+            elif row["by_rating"] == 0:
+                dimension = "rating"
+            else:
+                facets["total"] = row["total_count"]
+                continue
+
+            # Группа, все строки которой отсеяны фильтрами других разрезов, не показывается
+            count = row[f"{dimension}_count"]
+            if not count:
+                continue
+
+            if dimension == "type":
+                facets["service_type"].append({"service_type": row["service_type"].value, "count": count})
+            elif dimension == "city":
+                facets["city"].append({"city_slug": row["slug"], "city_name": row["name"], "count": count})
+            elif dimension == "price":
+                bucket = row["price_bucket"]
+                if bucket is None:
+                    facets["without_price"] = count
+                else:
+                    facets["price"].append({
+                        "price_from": bounds[bucket],
+                        "price_to": bounds[bucket + 1],
+                        "count": count
+                    })
+            elif row["rating_bucket"] is not None:
+                facets["rating"].append({"rating_from": row["rating_bucket"], "count": count})
+
+        facets["service_type"].sort(key=lambda item: -item["count"])
+        facets["city"].sort(key=lambda item: (-item["count"], item["city_slug"]))
+        facets["price"].sort(key=lambda item: (item["price_from"] is not None, item["price_from"] or 0))
+        facets["rating"].sort(key=lambda item: item["rating_from"])
+        return facets
@@ -0,0 +1,47 @@
+"""
+Сериализованный список городов с количеством услуг
+
+Общий для обработчика GET /cities/ и прогрева воркера (app.services.warmup):
+тело ответа строится один раз и хранится в cities_cache.
+"""
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cities_cache
+from app.models.city import City
+from app.models.service_counter import ServiceCounter
+from app.schemas.city import CityWithCount
+
+CITIES_CACHE_KEY = "cities:all"
+
+_cities_adapter = TypeAdapter(List[CityWithCount])
+
+
+async def load_cities_body(db: AsyncSession) -> bytes:
+    """Список городов с количеством услуг в сериализованном виде с сохранением в кэш"""
+    generation = cities_cache.generation
+    cities = await db.execute(
+        select(
+            City,
+            func.coalesce(func.sum(ServiceCounter.count), 0).label("services_count")
+        ).outerjoin(ServiceCounter, ServiceCounter.city_id == City.id).group_by(City.id)
+    )
+    
+    result = []
+    for city, count in cities:
+        city_dict = {
+            "id": city.id,
+            "name": city.name,
+            "slug": city.slug,
+            "latitude": city.latitude,
+            "longitude": city.longitude,
+            "services_count": count
+        }
+        result.append(city_dict)
+    
+    body = _cities_adapter.dump_json(_cities_adapter.validate_python(result))
+    cities_cache.set(CITIES_CACHE_KEY, body, generation)
+    return body
@@ -0,0 +1,92 @@
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import Executable
+
+from app.models.service import Service, ServiceType as ServiceTypeModel
+from app.models.service_counter import ServiceCounter
+
+
+class CounterService:
+    """
+    Поддержание счетчиков услуг по городу и типу
+
+    Помимо количества хранится время последнего изменения группы:
+    по нему строится валидатор (ETag / Last-Modified) списков услуг.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def increment_many(self, deltas: Dict[Tuple[int, ServiceTypeModel], int]) -> None:
+        """
+        Прибавить приращения к счетчикам одним upsert-запросом
+
+        Вызывается в той же транзакции, что и запись услуг, коммит остается за вызывающим.
+        """
+        if not deltas:
+            return
+
+        # Фиксированный порядок ключей исключает взаимные блокировки параллельных вставок
+        stmt = pg_insert(ServiceCounter).values([
+            {"city_id": city_id, "service_type": service_type, "count": delta}
+            for (city_id, service_type), delta in sorted(deltas.items(), key=lambda item: (item[0][0], item[0][1].name))
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ServiceCounter.city_id, ServiceCounter.service_type],
+            set_={
+                "count": ServiceCounter.count + stmt.excluded.count,
+                "last_modified": func.now()
+            }
+        )
+        await self.db.execute(stmt)
+
+    async def increment(self, city_id: int, service_type: ServiceTypeModel, delta: int = 1) -> None:
+        """Прибавить приращение к одному счетчику"""
+        await self.increment_many({(city_id, service_type): delta})
+
+    async def touch(self, groups: Iterable[Tuple[int, ServiceTypeModel]]) -> None:
+        """Отметить изменение услуг групп (город, тип) без изменения количества: сдвигает валидатор списков"""
+        await self.increment_many({group: 0 for group in groups})
+
+
+def _reconcile_statements() -> List[Executable]:
+    """Блокировка вставок услуг и перезапись счетчиков агрегатом по таблице услуг"""
+    return [
+        text("LOCK TABLE services IN SHARE MODE"),
+        delete(ServiceCounter),
+        insert(ServiceCounter).from_select(
+            ["city_id", "service_type", "count", "last_modified"],
+            select(
+                Service.city_id,
+                Service.service_type,
+                func.count(Service.id),
+                func.max(func.coalesce(Service.updated_at, Service.created_at, func.now()))
+            ).group_by(Service.city_id, Service.service_type)
+        ),
+    ]
+
+
+def reconcile_counters_statements() -> List[str]:
+    """SQL пересчета счетчиков для загрузки данных в обход ORM, выполняется в транзакции загрузки"""
+    return [
+        str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        for statement in _reconcile_statements()
+    ]
+
+
+def reconcile_counters(db: Session) -> int:
+    """
+    Пересчитать счетчики с нуля по таблице услуг
+
+    Вставки услуг блокируются на время пересчета, чтобы не потерять приращения.
+    Возвращает количество записанных счетчиков.
+    """
+    for statement in _reconcile_statements():
+        db.execute(statement)
+    written = db.scalar(select(func.count()).select_from(ServiceCounter))
+    db.commit()
+    return written
@@ -0,0 +1,74 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.responses import dump_json, format_datetime
+from app.models.service import Service
+from app.services.catalog import CatalogService, SERVICE_WITH_CITY_COLUMNS
+
+EXPORT_FIELDS = [column.key for column in SERVICE_WITH_CITY_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return format_datetime(value)
+    return value
+
+
+async def stream_export(
+    open_session: Callable[[], Awaitable[AsyncSession]],
+    format: str = "ndjson",
+    city_slug: Optional[str] = None,
+    service_type: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    chunk_size: int = settings.EXPORT_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Выгрузка услуг с названием города порциями по chunk_size строк
+
+    Строки читаются через серверный курсор, поэтому память не зависит
+    от размера таблицы. Сессия открывается внутри генератора через
+    open_session и живет, пока ответ передается клиенту.
+    """
+    query = CatalogService.apply_filters(CatalogService.base_query(), city_slug, service_type)
+    if updated_since is not None:
+        query = query.where(func.coalesce(Service.updated_at, Service.created_at) >= updated_since)
+    query = query.order_by(Service.id).execution_options(yield_per=chunk_size)
+
+    async with await open_session() as db:
+        result = await db.stream(query)
+
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+            yield buffer.getvalue().encode("utf-8")
+
+            async for rows in result.mappings().partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                for row in rows:
+                    writer.writerow([
+                        row["service_type"].value if field == "service_type" else _csv_value(row[field])
+                        for field in EXPORT_FIELDS
+                    ])
+                yield buffer.getvalue().encode("utf-8")
+        else:
+            async for rows in result.mappings().partitions():
+                lines = []
+                for row in rows:
+                    data = dict(row)
+                    data["service_type"] = data["service_type"].value
+                    lines.append(dump_json(data))
+                yield b"\n".join(lines) + b"\n"
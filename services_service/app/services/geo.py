@@ -0,0 +1,163 @@
+"""
+Пространственный индекс городов в памяти процесса
+
+Координаты переводятся в точки на единичной сфере, и по ним строится
+KD-дерево: евклидово расстояние (хорда) монотонно расстоянию по дуге,
+поэтому нет проблем с переходом через 180-й меридиан и полюсами.
+Поиск ближайших и поиск в радиусе обходят O(log n) узлов.
+"""
+import asyncio
+import heapq
+import math
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.city import City
+
+EARTH_RADIUS_KM = 6371.0088
+
+Point = Tuple[float, float, float]
+
+
+def to_point(lat: float, lon: float) -> Point:
+    """Широта и долгота в градусах -> точка на единичной сфере"""
+    lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(lat_rad)
+    return cos_lat * math.cos(lon_rad), cos_lat * math.sin(lon_rad), math.sin(lat_rad)
+
+
+def chord_to_km(chord_squared: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_squared) / 2))
+
+
+def km_to_chord(distance_km: float) -> float:
+    return 2 * math.sin(min(distance_km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+class _Node:
+    __slots__ = ("point", "city", "axis", "left", "right")
+
+    def __init__(self, point: Point, city: dict, axis: int, left: "Optional[_Node]", right: "Optional[_Node]"):
+        self.point = point
+        self.city = city
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+def _build(entries: List[Tuple[Point, dict]], depth: int = 0) -> Optional[_Node]:
+    if not entries:
+        return None
+    axis = depth % 3
+    entries.sort(key=lambda entry: entry[0][axis])
+    middle = len(entries) // 2
+    point, city = entries[middle]
+    return _Node(point, city, axis, _build(entries[:middle], depth + 1), _build(entries[middle + 1:], depth + 1))
+
+
+def _distance_squared(a: Point, b: Point) -> float:
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+class CityIndex:
+    """KD-дерево городов с координатами"""
+
+    def __init__(self, cities: List[dict]):
+        self.size = len(cities)
+        self._root = _build([(to_point(city["latitude"], city["longitude"]), city) for city in cities])
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[dict, float]]:
+        """k ближайших городов с расстоянием в км, от ближнего к дальнему"""
+        target = to_point(lat, lon)
+        heap: List[Tuple[float, int, dict]] = []
+
+        def visit(node: Optional[_Node]) -> None:
+            if node is None:
+                return
+            distance = _distance_squared(node.point, target)
+            if len(heap) < k:
+                heapq.heappush(heap, (-distance, node.city["id"], node.city))
+            elif distance < -heap[0][0]:
+                heapq.heapreplace(heap, (-distance, node.city["id"], node.city))
+
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return [(city, chord_to_km(-distance)) for distance, _, city in sorted(heap, reverse=True)]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[dict, float]]:
+        """Города в радиусе radius_km с расстоянием, от ближнего к дальнему"""
+        target = to_point(lat, lon)
+        limit = km_to_chord(radius_km) ** 2
+        found: List[Tuple[float, dict]] = []
+
+        def visit(node: Optional[_Node]) -> None:
+            if node is None:
+                return
+            distance = _distance_squared(node.point, target)
+            if distance <= limit:
+                found.append((distance, node.city))
+
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            visit(near)
+            if diff * diff <= limit:
+                visit(far)
+
+        visit(self._root)
+        found.sort(key=lambda entry: (entry[0], entry[1]["id"]))
+        return [(city, chord_to_km(distance)) for distance, city in found]
+
+
+class CityLocator:
+    """
+    Индекс городов, перестраиваемый при изменении городов
+
+    invalidate() сбрасывает индекс в текущем процессе; остальные воркеры
+    перестроят его по истечении ttl секунд.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._index: Optional[CityIndex] = None
+        self._expires = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def get_index(self, db: AsyncSession) -> CityIndex:
+        index = self._index
+        if index is not None and self._expires > time.monotonic():
+            return index
+
+        async with self._lock:
+            if self._index is not None and self._expires > time.monotonic():
+                return self._index
+
+            generation = self._generation
+            result = await db.execute(
+                select(City.id, City.name, City.slug, City.latitude, City.longitude)
+                .where(City.latitude.is_not(None), City.longitude.is_not(None))
+            )
+            index = CityIndex([dict(row) for row in result.mappings()])
+
+            # Города изменились во время чтения: индекс отдается, но не запоминается
+            if generation == self._generation:
+                self._index = index
+                self._expires = time.monotonic() + self.ttl
+            return index
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._index = None
+        self._expires = 0.0
+
+
+city_locator = CityLocator(ttl=settings.CITY_INDEX_TTL)
@@ -0,0 +1,230 @@
+"""
+Производные изображений: уменьшенные копии WebP/AVIF фиксированной ширины
+
+Исходники лежат в IMAGES_ROOT по относительному пути из Service.image_url.
+Если IMAGES_ROOT не задан или каталога нет, варианты не выдаются, а в
+списках нет thumbnail_url.
+Варианты строятся в пуле процессов (декодирование и кодирование занимают
+CPU) и сохраняются в дисковый кэш с адресацией по содержимому: имя файла -
+хэш исходника и параметров варианта, поэтому новый исходник дает новый
+файл, а устаревшие вытесняются по LRU при превышении IMAGE_CACHE_MAX_BYTES.
+Первый запрос варианта платит за его построение, следующие отдают файл
+с диска.
+
+Размер кэша учитывается в каждом воркере отдельно, поэтому при нескольких
+воркерах каталог может временно превышать лимит; удаленный другим воркером
+файл строится заново.
+"""
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from prometheus_client import Counter
+
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+
+# Формат варианта: (формат Pillow, MIME-тип, настройка качества)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp", "IMAGE_WEBP_QUALITY"),
+    "avif": ("AVIF", "image/avif", "IMAGE_AVIF_QUALITY"),
+}
+
+IMAGE_VARIANTS = Counter(
+    "image_variants_total",
+    "Запросы вариантов изображений: hit - с диска, rendered - построены",
+    ["format", "result"]
+)
+
+
+class UnsupportedImageError(Exception):
+    """Исходник не распознан как изображение"""
+
+
+def thumbnail_url(image_url: Optional[str]) -> Optional[str]:
+    """URL миниатюры для списков; только для локальных изображений (относительный путь) при заданном IMAGES_ROOT"""
+    if not image_variants.enabled or not image_url or "://" in image_url or image_url.startswith("/"):
+        return None
+    return f"{settings.IMAGES_URL_PREFIX}/{settings.IMAGE_THUMBNAIL_WIDTH}/{image_url}"
+
+
+def render_variant(source: str, target: str, width: int, pil_format: str, quality: int) -> int:
+    """
+    Построение варианта в процессе пула; возвращает размер файла
+
+    Файл пишется во временный и переименовывается, поэтому читатели
+    никогда не видят его недописанным; при ошибке временный файл удаляется.
+    Изображения не увеличиваются.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    temporary = Path(f"{target}.{os.getpid()}.tmp")
+    try:
+        try:
+            image = Image.open(source)
+        except UnidentifiedImageError as e:
+            raise UnsupportedImageError(str(e))
+
+        with image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            image.save(temporary, pil_format, quality=quality)
+
+        os.replace(temporary, target)
+    finally:
+        temporary.unlink(missing_ok=True)
+    return os.path.getsize(target)
+
+
+class DiskLRU:
+    """Учет файлов кэша по времени последнего обращения и вытеснение сверх max_bytes"""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._files: "OrderedDict[Path, int]" = OrderedDict()
+        self._loaded = False
+
+    def _load(self) -> None:
+        """Файлы, оставшиеся с прошлого запуска, в порядке mtime (обращение обновляет mtime)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.root.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._files[path] = size
+            self.total += size
+        self._loaded = True
+
+    def lookup(self, path: Path) -> bool:
+        if not self._loaded:
+            self._load()
+        if not path.exists():
+            self.total -= self._files.pop(path, 0)
+            return False
+
+        if path not in self._files:
+            self._files[path] = path.stat().st_size
+            self.total += self._files[path]
+        self._files.move_to_end(path)
+        os.utime(path)
+        return True
+
+    def add(self, path: Path, size: int) -> None:
+        self.total += size - self._files.pop(path, 0)
+        self._files[path] = size
+        while self.total > self.max_bytes and len(self._files) > 1:
+            oldest, oldest_size = self._files.popitem(last=False)
+            self.total -= oldest_size
+            try:
+                oldest.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ImageVariants:
+    """Выдача вариантов изображений из дискового кэша с построением в пуле процессов"""
+
+    def __init__(self, source_root: str, cache_dir: str, max_bytes: int, workers: int):
+        self.source_root = Path(source_root).resolve()
+        self.enabled = bool(source_root) and self.source_root.is_dir()
+        self.cache = DiskLRU(Path(cache_dir), max_bytes)
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._digests: Dict[Path, Tuple[int, int, str]] = {}
+        self._renders = SingleFlight()
+
+    def source_path(self, image_path: str) -> Path:
+        """Путь к исходнику внутри source_root; выход за его пределы и отсутствие файла - 404"""
+        path = (self.source_root / image_path).resolve()
+        if not self.enabled or self.source_root not in path.parents or not path.is_file():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Изображение не найдено"
+            )
+        return path
+
+    def source_digest(self, path: Path) -> str:
+        """SHA-256 исходника; пересчитывается только при изменении размера или mtime"""
+        stat = path.stat()
+        cached = self._digests.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as source:
+            for chunk in iter(lambda: source.read(1 << 20), b""):
+                digest.update(chunk)
+        self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def get_variant(self, image_path: str, width: int, image_format: str) -> Tuple[Path, str]:
+        """Файл варианта и его хэш (ETag); строит вариант, если его нет в кэше"""
+        pil_format, _, quality_setting = VARIANT_FORMATS[image_format]
+        quality = getattr(settings, quality_setting)
+
+        source = self.source_path(image_path)
+        source_digest = await asyncio.to_thread(self.source_digest, source)
+        digest = hashlib.sha256(f"{source_digest}:{width}:{image_format}:{quality}".encode()).hexdigest()
+        target = self.cache.root / digest[:2] / f"{digest}.{image_format}"
+
+        if self.cache.lookup(target):
+            IMAGE_VARIANTS.labels(image_format, "hit").inc()
+            return target, digest
+
+        async def render() -> int:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(
+                    self._get_pool(), render_variant, str(source), str(target), width, pil_format, quality
+                )
+            except UnsupportedImageError:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail="Формат исходного изображения не поддерживается"
+                )
+            except Exception as e:
+                # Поврежденный файл, сбой кодировщика или процесса пула
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Не удалось обработать изображение: {e}"
+                )
+
+        # Одновременные запросы одного варианта ждут одно построение
+        size, coalesced = await self._renders.do(digest, "images", render)
+        if not coalesced:
+            self.cache.add(target, size)
+            IMAGE_VARIANTS.labels(image_format, "rendered").inc()
+        return target, digest
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+image_variants = ImageVariants(
+    source_root=settings.IMAGES_ROOT,
+    cache_dir=settings.IMAGE_CACHE_DIR,
+    max_bytes=settings.IMAGE_CACHE_MAX_BYTES,
+    workers=settings.IMAGE_WORKERS
+)
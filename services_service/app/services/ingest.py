@@ -0,0 +1,265 @@
+import codecs
+import csv
+import json
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import invalidate_catalog_caches
+from app.core.config import settings
+from app.models.city import City
+from app.models.service import Service, ServiceType as ServiceTypeModel
+from app.schemas.service import ServiceCreate
+from app.services.counters import CounterService
+
+
+# Строка входного потока: номер строки и данные либо сообщение об ошибке разбора
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+# Колонки COPY; created_at заполняет server_default, rating и reviews_count - значения по умолчанию модели
+COPY_COLUMNS = ["city_id", "service_type", "title", "description", "price", "image_url", "rating", "reviews_count"]
+
+
+class IngestError(ValueError):
+    """Поток нельзя разбирать дальше: ошибку получает отчет, загрузка останавливается"""
+
+    def __init__(self, row_number: int, message: str):
+        super().__init__(message)
+        self.row_number = row_number
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Разбиение потока байтов на строки без накопления всего тела"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    tail = ""
+
+    async for chunk in chunks:
+        text = tail + decoder.decode(chunk)
+        lines = text.split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.rstrip("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Записи NDJSON: один JSON-объект на строку, пустые строки пропускаются"""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+
+        row_number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Некорректный JSON: {e}"
+            continue
+
+        if not isinstance(data, dict):
+            yield row_number, None, "Строка должна быть JSON-объектом"
+            continue
+
+        yield row_number, data, None
+
+
+async def iter_csv_records(
+    chunks: AsyncIterator[bytes],
+    max_record_size: int = settings.BULK_MAX_RECORD_SIZE
+) -> AsyncIterator[Record]:
+    """
+    Записи CSV с заголовком в первой строке
+
+    Поле в кавычках может содержать перевод строки: запись считается
+    завершенной, когда число кавычек в ней четное. Четность считается по
+    мере чтения строк. Запись длиннее max_record_size символов (обычно
+    незакрытая кавычка) прерывает разбор IngestError с номером строки,
+    на которой она началась: иначе в память ушел бы весь остаток потока.
+    """
+    header: Optional[List[str]] = None
+    row_number = 0
+    line_number = 0
+    pending: List[str] = []
+    pending_size = 0
+    pending_quotes = 0
+
+    async for line in iter_lines(chunks):
+        line_number += 1
+        pending.append(line)
+        pending_size += len(line) + 1
+        pending_quotes += line.count('"')
+        if pending_quotes % 2:
+            if pending_size > max_record_size:
+                raise IngestError(
+                    row_number + 1,
+                    f"Запись со строки {line_number - len(pending) + 1} длиннее {max_record_size} символов: "
+                    f"вероятно, незакрытая кавычка"
+                )
+            continue
+        text = "\n".join(pending)
+        pending, pending_size, pending_quotes = [], 0, 0
+
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"Ожидалось {len(header)} полей, получено {len(values)}"
+            continue
+
+        # Пустые ячейки CSV соответствуют отсутствующим значениям
+        yield row_number, {k: (v if v != "" else None) for k, v in zip(header, values)}, None
+
+    if pending:
+        yield row_number + 1, None, "Незакрытая кавычка в конце файла"
+
+
+class ServiceIngestor:
+    """
+    Пакетная загрузка услуг
+
+    Строки валидируются по ServiceCreate, город определяется по заранее
+    загруженному справочнику (city_id или city_slug), запись идет пачками
+    по batch_size строк через COPY: вставка услуг и приращение счетчиков
+    в одной транзакции. В памяти держится не больше одной пачки.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        batch_size: int = settings.BULK_BATCH_SIZE,
+        max_errors: int = settings.BULK_MAX_ERRORS
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self._city_ids: Dict[str, int] = {}
+        self._known_ids: set = set()
+        self._batch: List[dict] = []
+
+    async def load_cities(self) -> None:
+        """Загрузка справочника городов: slug -> id"""
+        result = await self.db.execute(select(City.id, City.slug))
+        self._city_ids = {slug: city_id for city_id, slug in result.all()}
+        self._known_ids = set(self._city_ids.values())
+
+    def _error(self, row_number: int, errors: List[dict]) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "errors": errors})
+
+    async def add_row(self, row_number: int, data: Dict[str, Any]) -> None:
+        """Валидация строки входного потока и постановка в пачку"""
+        if data.get("city_id") is None and data.get("city_slug") is not None:
+            city_id = self._city_ids.get(data["city_slug"])
+            if city_id is None:
+                self._error(row_number, [{"loc": ["city_slug"], "msg": "Город не найден"}])
+                return
+            data = {**data, "city_id": city_id}
+
+        try:
+            service_data = ServiceCreate.model_validate(data)
+        except ValidationError as e:
+            self._error(row_number, [
+                {"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()
+            ])
+            return
+
+        if service_data.city_id not in self._known_ids:
+            self._error(row_number, [{"loc": ["city_id"], "msg": "Город не найден"}])
+            return
+
+        await self.add_service({
+            "city_id": service_data.city_id,
+            "service_type": ServiceTypeModel[service_data.service_type.value.upper()],
+            "title": service_data.title,
+            "description": service_data.description,
+            "price": service_data.price,
+            "image_url": service_data.image_url
+        })
+
+    async def add_service(self, values: Dict[str, Any]) -> None:
+        """Постановка в пачку уже проверенных значений колонок услуги"""
+        self._batch.append(values)
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Запись текущей пачки и приращений счетчиков одной транзакцией"""
+        if not self._batch:
+            return
+
+        batch, self._batch = self._batch, []
+        deltas: Dict[Tuple[int, ServiceTypeModel], int] = {}
+        for values in batch:
+            key = (values["city_id"], values["service_type"])
+            deltas[key] = deltas.get(key, 0) + 1
+
+        # Upsert счетчиков идет первым: он открывает транзакцию, в которой затем выполняется COPY
+        await CounterService(self.db).increment_many(deltas)
+        await self._copy(batch)
+        await self.db.commit()
+        self.inserted += len(batch)
+
+    async def _copy(self, batch: List[dict]) -> None:
+        """COPY пачки в services через соединение asyncpg текущей транзакции сессии"""
+        connection = await (await self.db.connection()).get_raw_connection()
+        await connection.driver_connection.copy_records_to_table(
+            Service.__tablename__,
+            columns=COPY_COLUMNS,
+            records=[
+                (
+                    values["city_id"],
+                    values["service_type"].name,
+                    values["title"],
+                    values.get("description"),
+                    values.get("price"),
+                    values.get("image_url"),
+                    Decimal(str(values.get("rating", 0))),
+                    values.get("reviews_count", 0),
+                )
+                for values in batch
+            ]
+        )
+
+    async def ingest(self, records: AsyncIterator[Record]) -> dict:
+        """Загрузка потока записей, возвращает отчет по строкам"""
+        await self.load_cities()
+
+        try:
+            async for row_number, data, error in records:
+                if error is not None:
+                    self._error(row_number, [{"loc": [], "msg": error}])
+                    continue
+                await self.add_row(row_number, data)
+        except IngestError as e:
+            # Остаток потока не разобрать: строки до ошибки записываются, она попадает в отчет
+            self._error(e.row_number, [{"loc": [], "msg": str(e)}])
+
+        return await self.finish()
+
+    async def finish(self) -> dict:
+        """Запись остатка и формирование отчета"""
+        await self.flush()
+        if self.inserted:
+            await invalidate_catalog_caches()
+
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
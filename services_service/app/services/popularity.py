@@ -0,0 +1,139 @@
+"""
+Оценка популярности услуг для sort=popular
+
+Оценка хранится в индексированной колонке services.popularity_score, поэтому
+топ-N в городе и категории читается сканированием индекса без сортировки.
+Затухание по давности записано в логарифмической шкале как прибавка от даты
+создания: порядок услуг не меняется со временем, и пересчитывать нужно
+только строки, у которых изменились рейтинг или число отзывов. Такие строки
+флашер отзывов обновляет сам, а фоновая задача досчитывает новые услуги
+(popularity_score IS NULL).
+"""
+import math
+
+from sqlalchemy import Float, cast, func, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import invalidate_catalog_caches
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models.service import Service
+from app.services.background import PeriodicJob
+from app.services.counters import CounterService
+
+# Ключ advisory-блокировки: новые услуги досчитывает один воркер
+REFRESH_LOCK_KEY = 0x706F70756C
+
+SECONDS_PER_DAY = 86400
+
+
+def popularity_score(rating, reviews_count, created_at):
+    """
+    SQL-выражение оценки популярности
+
+    log2(качество * ln(2 + отзывы)) + дни с эпохи / период полураспада, где
+    качество - байесовское среднее рейтинга с априорной оценкой
+    POPULARITY_PRIOR_RATING весом POPULARITY_PRIOR_WEIGHT отзывов. Услуга
+    на POPULARITY_HALF_LIFE_DAYS дней старше должна быть вдвое "лучше",
+    чтобы стоять рядом с новой.
+    """
+    reviews = cast(func.coalesce(reviews_count, 0), Float)
+    prior_weight = settings.POPULARITY_PRIOR_WEIGHT
+    quality = (
+        (cast(func.coalesce(rating, 0), Float) * reviews + settings.POPULARITY_PRIOR_RATING * prior_weight)
+        / (reviews + prior_weight)
+    )
+    age_bonus = (
+        cast(func.extract("epoch", created_at), Float)
+        / (SECONDS_PER_DAY * settings.POPULARITY_HALF_LIFE_DAYS)
+    )
+    return func.ln(quality * func.ln(reviews + 2)) / math.log(2) + age_bonus
+
+
+SCORE = popularity_score(Service.rating, Service.reviews_count, Service.created_at)
+
+
+def _recompute(condition):
+    """
+    UPDATE оценки для строк по условию
+
+    updated_at сохраняется: для клиента услуга не изменилась. Для этого
+    updated_at явно присваивается самому себе: onupdate колонки срабатывает
+    и в UPDATE на уровне таблицы и подставил бы now().
+    """
+    return (
+        update(Service.__table__)
+        .where(condition)
+        .values(popularity_score=SCORE, updated_at=Service.updated_at)
+        .returning(Service.city_id, Service.service_type)
+    )
+
+
+def popularity_score_statement() -> str:
+    """SQL пересчета оценки всех услуг для загрузки данных в обход ORM"""
+    return str(
+        update(Service.__table__)
+        .values(popularity_score=SCORE, updated_at=Service.updated_at)
+        .compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    )
+
+
+async def _touch_groups(db: AsyncSession, rows) -> None:
+    # Порядок списков этих групп изменился: сдвигаем их валидатор (ETag / Last-Modified)
+    await CounterService(db).touch((city_id, service_type) for city_id, service_type in rows)
+
+
+async def refresh_pending(db: AsyncSession, batch_size: int) -> int:
+    """Досчитать оценку до batch_size услуг без нее; возвращает число обновленных"""
+    locked = await db.scalar(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_KEY)))
+    if not locked:
+        return 0
+
+    pending = (
+        select(Service.id)
+        .where(Service.popularity_score.is_(None))
+        .order_by(Service.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = (await db.execute(_recompute(Service.id.in_(pending.scalar_subquery())))).all()
+    await _touch_groups(db, rows)
+    await db.commit()
+
+    if rows:
+        await invalidate_catalog_caches()
+    return len(rows)
+
+
+async def refresh_range(db: AsyncSession, first_id: int, last_id: int) -> int:
+    """Пересчитать оценку услуг с id в [first_id, last_id] (после смены формулы)"""
+    rows = (await db.execute(_recompute(Service.id.between(first_id, last_id)))).all()
+    await _touch_groups(db, rows)
+    await db.commit()
+    return len(rows)
+
+
+class PopularityRefresher(PeriodicJob):
+    """Фоновая задача, досчитывающая оценку новых услуг"""
+
+    name = "popularity"
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(interval)
+        self.batch_size = batch_size
+
+    async def run_once(self) -> int:
+        total = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                updated = await refresh_pending(db, self.batch_size)
+            total += updated
+            if updated < self.batch_size:
+                return total
+
+
+popularity_refresher = PopularityRefresher(
+    interval=settings.POPULARITY_REFRESH_INTERVAL,
+    batch_size=settings.POPULARITY_REFRESH_BATCH
+)
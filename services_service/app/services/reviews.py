@@ -0,0 +1,163 @@
+"""
+Отзывы об услугах и фоновый пересчет рейтинга
+
+Отправка отзыва только вставляет строку в reviews и не трогает services,
+поэтому популярная услуга не становится точкой блокировок. Флашер раз
+в REVIEWS_FLUSH_INTERVAL секунд забирает неучтенные отзывы и обновляет
+агрегаты одним UPDATE на услугу.
+"""
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import invalidate_catalog_caches
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor, decode_id
+from app.db.database import AsyncSessionLocal
+from app.models.review import Review
+from app.models.service import Service
+from app.services.background import PeriodicJob
+from app.services.counters import CounterService
+from app.services.popularity import popularity_score
+
+# Ключ advisory-блокировки: в каждый момент отзывы сбрасывает один воркер
+FLUSH_LOCK_KEY = 0x7265766965
+
+REVIEW_COLUMNS = (Review.id, Review.service_id, Review.user_id, Review.rating, Review.text, Review.created_at)
+
+
+class ReviewService:
+    """Запись и чтение отзывов"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_review(self, service_id: int, rating: int, text: Optional[str], user_id: Optional[int]) -> Review:
+        exists = await self.db.scalar(select(Service.id).where(Service.id == service_id))
+        if exists is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Услуга не найдена"
+            )
+
+        review = Review(service_id=service_id, rating=rating, text=text, user_id=user_id)
+        self.db.add(review)
+        await self.db.commit()
+        return review
+
+    async def list_reviews(
+        self,
+        service_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Отзывы услуги от новых к старым с курсором по id"""
+        query = select(*REVIEW_COLUMNS).where(Review.service_id == service_id).order_by(Review.id.desc())
+
+        if cursor:
+            (review_id,) = decode_cursor(cursor, 1)
+            query = query.where(Review.id < decode_id(review_id))
+
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = [dict(row) for row in result.mappings()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]["id"]])
+
+        return rows, next_cursor
+
+
+async def flush_reviews(db: AsyncSession, batch_size: int) -> int:
+    """
+    Учесть до batch_size новых отзывов в rating и reviews_count услуг
+
+    Отзывы помечаются учтенными и агрегаты обновляются в одной транзакции,
+    поэтому сбой не теряет и не удваивает оценки. Возвращает число
+    учтенных отзывов.
+    """
+    locked = await db.scalar(select(func.pg_try_advisory_xact_lock(FLUSH_LOCK_KEY)))
+    if not locked:
+        return 0
+
+    pending = (
+        select(Review.id)
+        .where(Review.applied.is_(False))
+        .order_by(Review.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    applied = (
+        update(Review)
+        .where(Review.id.in_(pending.scalar_subquery()))
+        .values(applied=True)
+        .returning(Review.service_id, Review.rating)
+        .cte("applied")
+    )
+    totals = (
+        select(
+            applied.c.service_id,
+            func.count().label("reviews"),
+            func.sum(applied.c.rating).label("rating_sum")
+        )
+        .group_by(applied.c.service_id)
+        .cte("totals")
+    )
+
+    # Обновление на уровне таблицы (Core): ORM-вариант не поддерживает RETURNING из CTE.
+    # В SET все выражения видят значения строки до обновления
+    rating_sum = func.coalesce(Service.rating_sum, Service.rating * Service.reviews_count) + totals.c.rating_sum
+    reviews_count = Service.reviews_count + totals.c.reviews
+    rating = func.round(rating_sum / reviews_count, 1)
+    stmt = (
+        update(Service.__table__)
+        .where(Service.id == totals.c.service_id)
+        .values(
+            rating_sum=rating_sum,
+            reviews_count=reviews_count,
+            rating=rating,
+            # Оценка популярности пересчитывается здесь же, без второго UPDATE строки
+            popularity_score=popularity_score(rating, reviews_count, Service.created_at)
+        )
+        .returning(Service.city_id, Service.service_type, totals.c.reviews)
+    )
+
+    rows = (await db.execute(stmt)).all()
+    groups = {(city_id, service_type) for city_id, service_type, _ in rows}
+
+    # Списки услуг этих групп изменились: сдвигаем их валидатор (ETag / Last-Modified)
+    await CounterService(db).touch(groups)
+    await db.commit()
+
+    if groups:
+        await invalidate_catalog_caches()
+    return sum(reviews for _, _, reviews in rows)
+
+
+class ReviewFlusher(PeriodicJob):
+    """Фоновая задача, периодически вызывающая flush_reviews"""
+
+    name = "reviews"
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(interval)
+        self.batch_size = batch_size
+
+    async def run_once(self) -> int:
+        """Сбросить накопленные отзывы пачками по batch_size, пока пачки полные"""
+        total = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                applied = await flush_reviews(db, self.batch_size)
+            total += applied
+            if applied < self.batch_size:
+                return total
+
+
+review_flusher = ReviewFlusher(
+    interval=settings.REVIEWS_FLUSH_INTERVAL,
+    batch_size=settings.REVIEWS_FLUSH_BATCH
+)
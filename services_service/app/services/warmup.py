@@ -0,0 +1,112 @@
+"""
+Прогрев воркера и готовность к приему трафика (/ready)
+
+Импорт приложения не обращается к БД. Прогрев (WARMUP_ENABLED) идет фоновой
+задачей после старта: открывает соединения пула основной базы и реплик и
+заполняет горячие кэши (список городов, индекс городов). Пока он не закончен,
+/ready отвечает 503 и балансировщик не направляет запросы в воркер. Если
+основная база недоступна, прогрев повторяется раз в WARMUP_RETRY_SECONDS.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from prometheus_client import Gauge
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal, async_engine, replica_engines
+from app.services.cities import load_cities_body
+from app.services.geo import city_locator
+
+logger = logging.getLogger(__name__)
+
+IMPORT_TO_READY = Gauge(
+    "app_import_to_ready_seconds",
+    "Время от начала импорта приложения до готовности к приему запросов",
+    multiprocess_mode="max"
+)
+
+
+class Readiness:
+    """Отметки времени запуска воркера: импорт, старт, готовность"""
+
+    def __init__(self):
+        self.import_started: Optional[float] = None
+        self.startup_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def mark_startup(self, import_started: float) -> None:
+        self.import_started = import_started
+        self.startup_at = time.perf_counter()
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+        IMPORT_TO_READY.set(self.ready_at - self.import_started)
+        logger.info("Воркер готов: %.3f с от начала импорта", self.ready_at - self.import_started)
+
+    def status(self) -> dict:
+        def elapsed(start: Optional[float], end: Optional[float]) -> Optional[float]:
+            return round(end - start, 4) if start is not None and end is not None else None
+
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "import_seconds": elapsed(self.import_started, self.startup_at),
+            "warmup_seconds": elapsed(self.startup_at, self.ready_at),
+            "import_to_ready_seconds": elapsed(self.import_started, self.ready_at),
+            "steps": {name: round(seconds, 4) for name, seconds in self.steps.items()}
+        }
+
+
+async def open_pool_connections(engine: AsyncEngine, count: int) -> None:
+    """Открыть count соединений одновременно и вернуть их в пул"""
+    results = await asyncio.gather(*(engine.connect() for _ in range(count)), return_exceptions=True)
+    for result in results:
+        if not isinstance(result, BaseException):
+            await result.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def _step(readiness: Readiness, name: str, coroutine) -> None:
+    started = time.perf_counter()
+    await coroutine
+    readiness.steps[name] = time.perf_counter() - started
+
+
+async def _prime_caches() -> None:
+    async with AsyncSessionLocal() as db:
+        await load_cities_body(db)
+        await city_locator.get_index(db)
+
+
+async def warm_up(readiness: Readiness) -> None:
+    """Прогрев с повторами до успеха; реплики необязательны и их ошибки не мешают готовности"""
+    connections = min(settings.WARMUP_CONNECTIONS, settings.DB_POOL_SIZE)
+
+    while True:
+        try:
+            await _step(readiness, "primary_pool", open_pool_connections(async_engine, connections))
+            await _step(readiness, "caches", _prime_caches())
+            break
+        except Exception as e:
+            logger.warning("Ошибка прогрева, повтор через %s с: %s", settings.WARMUP_RETRY_SECONDS, e)
+            await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+
+    for index, engine in enumerate(replica_engines):
+        try:
+            await _step(readiness, f"replica{index}_pool", open_pool_connections(engine, connections))
+        except Exception as e:
+            logger.warning("Реплика replica%d не прогрета: %s", index, e)
+
+    readiness.mark_ready()
+
+
+readiness = Readiness()
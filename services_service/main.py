@@ -1,13 +1,29 @@
+import time
+
+# Начало импорта приложения: от него считается время до готовности (/ready)
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.cache import cities_cache
+from app.core.shared_cache import shared_cache
 from app.core.config import settings
-from app.db.database import engine, Base
-from app.routers import cities_router, services_router
-from app.models.city import City
-from app.models.service import Service, ServiceType
+from app.core.metrics import MetricsMiddleware, instrument_engine, metrics_response
+from app.db.database import async_engine, replica_engines
+from app.db.replicas import ReadYourWritesMiddleware
+from app.routers import cities_router, images_router, services_router
+from app.services.images import image_variants
+from app.services.popularity import popularity_refresher
+from app.services.reviews import review_flusher
+from app.services.warmup import readiness, warm_up
+from app.commands.seed_demo import seed_demo_data
 
-Base.metadata.create_all(bind=engine)
+instrument_engine(async_engine.sync_engine, "primary")
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine.sync_engine, f"replica{index}")
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -23,10 +39,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
+)
+
+app.add_middleware(
+    ReadYourWritesMiddleware,
+    window_seconds=settings.READ_YOUR_WRITES_SECONDS,
+    read_only_paths=["/api/v1/services/batch"]
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(cities_router, prefix="/api/v1")
 app.include_router(services_router, prefix="/api/v1")
+app.include_router(images_router, prefix="/api/v1")
 
 
 @app.get("/", tags=["Health"])
@@ -45,99 +70,81 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready", tags=["Health"])
+async def ready():
+    """
+    Готовность воркера к приему запросов
+    
+    503, пока идет прогрев (WARMUP_ENABLED); в ответе время от импорта до готовности
+    """
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Метрики в формате Prometheus"""
+    return metrics_response()
+
+
+@app.get("/stats/cache", tags=["Health"])
+async def cache_stats():
+    """Счетчики попаданий и промахов кэша каталога городов и общего кэша чтения"""
+    return {"cities": cities_cache.stats(), "shared": shared_cache.stats()}
+
+
+@app.on_event("startup")
+async def start_review_flusher():
+    """Фоновый пересчет рейтинга услуг по новым отзывам"""
+    if settings.REVIEWS_FLUSH_ENABLED:
+        review_flusher.start()
+
+
+@app.on_event("shutdown")
+async def stop_review_flusher():
+    await review_flusher.stop()
+
+
+@app.on_event("startup")
+async def start_popularity_refresher():
+    """Фоновый расчет оценки популярности новых услуг"""
+    if settings.POPULARITY_REFRESH_ENABLED:
+        popularity_refresher.start()
+
+
+@app.on_event("shutdown")
+async def stop_popularity_refresher():
+    await popularity_refresher.stop()
+
+
+@app.on_event("shutdown")
+async def close_shared_cache():
+    await shared_cache.close()
+
+
+@app.on_event("shutdown")
+async def stop_image_workers():
+    image_variants.close()
+
+
 @app.on_event("startup")
 async def seed_data():
-    """Заполнение тестовыми данными при первом запуске"""
-    from app.db.database import SessionLocal
-    
-    db = SessionLocal()
-    
-    try:
-        # Проверяем, есть ли уже данные
-        if db.query(City).count() > 0:
-            return
-        
-        # 15 городов
-        cities_data = [
-            {"name": "Москва", "slug": "moscow"},
-            {"name": "Санкт-Петербург", "slug": "spb"},
-            {"name": "Екатеринбург", "slug": "ekaterinburg"},
-            {"name": "Казань", "slug": "kazan"},
-            {"name": "Новосибирск", "slug": "novosibirsk"},
-            {"name": "Челябинск", "slug": "chelyabinsk"},
-            {"name": "Краснодар", "slug": "krasnodar"},
-            {"name": "Нижний Новгород", "slug": "nizhni_novgorod"},
-            {"name": "Самара", "slug": "samara"},
-            {"name": "Уфа", "slug": "ufa"},
-            {"name": "Ростов-на-Дону", "slug": "rostov"},
-            {"name": "Омск", "slug": "omsk"},
-            {"name": "Красноярск", "slug": "krasnoyarsk"},
-            {"name": "Воронеж", "slug": "voronezh"},
-            {"name": "Пермь", "slug": "perm"},
-        ]
-        
-        cities = []
-        for city_data in cities_data:
-            city = City(**city_data)
-            db.add(city)
-            cities.append(city)
-        
-        db.commit()
-        
-        # Тестовые услуги для каждого города
-        services_templates = {
-            ServiceType.WORK: [
-                {"title": "Маникюр", "description": "Профессиональный маникюр и педикюр", "price": 1500},
-                {"title": "Репетитор по математике", "description": "Подготовка к ЕГЭ и ОГЭ", "price": 2000},
-                {"title": "Сантехник", "description": "Установка и ремонт сантехники", "price": 3000},
-                {"title": "Электрик", "description": "Электромонтажные работы любой сложности", "price": 2500},
-                {"title": "Уборка квартир", "description": "Генеральная и поддерживающая уборка", "price": 4000},
-            ],
-            ServiceType.ESTATE: [
-                {"title": "2-к квартира, 65 м²", "description": "Евроремонт, мебель, техника", "price": 8500000},
-                {"title": "1-к квартира, 42 м²", "description": "Новостройка, чистовая отделка", "price": 5200000},
-                {"title": "Студия, 28 м²", "description": "Современный ремонт, центр города", "price": 3800000},
-                {"title": "3-к квартира, 95 м²", "description": "Просторная планировка, парковка", "price": 12000000},
-                {"title": "Таунхаус, 150 м²", "description": "Загородная жизнь рядом с городом", "price": 15000000},
-            ],
-            ServiceType.NEWS: [
-                {"title": "Открытие нового ТЦ", "description": "В центре города открылся крупный торговый центр", "price": None},
-                {"title": "Ремонт дорог завершен", "description": "Капитальный ремонт главной улицы закончен", "price": None},
-                {"title": "Новая линия метро", "description": "Планируется строительство новой ветки метрополитена", "price": None},
-                {"title": "Фестиваль еды", "description": "В эти выходные пройдет гастрономический фестиваль", "price": None},
-                {"title": "День города", "description": "Программа мероприятий на День города", "price": None},
-            ],
-            ServiceType.AUTO: [
-                {"title": "Toyota Camry 2020", "description": "Пробег 45000 км, один владелец", "price": 2500000},
-                {"title": "BMW X5 2019", "description": "Полный привод, панорамная крыша", "price": 4500000},
-                {"title": "Lada Vesta 2022", "description": "Новая, на гарантии", "price": 1200000},
-                {"title": "Mercedes E-class 2021", "description": "AMG пакет, все опции", "price": 5800000},
-                {"title": "Kia Rio 2023", "description": "Автомат, климат-контроль", "price": 1600000},
-            ],
-        }
-        
-        for city in cities:
-            db.refresh(city)
-            for service_type, templates in services_templates.items():
-                for template in templates:
-                    service = Service(
-                        city_id=city.id,
-                        service_type=service_type,
-                        title=template["title"],
-                        description=template["description"],
-                        price=template["price"],
-                        image_url="img/news01.webp",
-                        rating=round(3 + (hash(template["title"]) % 20) / 10, 1),
-                        reviews_count=abs(hash(template["title"])) % 500
-                    )
-                    db.add(service)
-        
-        db.commit()
-        print("Тестовые данные успешно добавлены!")
-        
-    except Exception as e:
-        print(f"Ошибка при добавлении тестовых данных: {e}")
-        db.rollback()
-    finally:
-        db.close()
+    """Заполнение тестовыми данными при первом запуске, если включено SEED_ON_STARTUP"""
+    if settings.SEED_ON_STARTUP:
+        await seed_demo_data()
+
+
+@app.on_event("startup")
+async def start_warmup():
+    """Прогрев пула и кэшей в фоне; без WARMUP_ENABLED воркер готов сразу после старта"""
+    readiness.mark_startup(IMPORT_STARTED)
+    if settings.WARMUP_ENABLED:
+        app.state.warmup_task = asyncio.create_task(warm_up(readiness))
+    else:
+        readiness.mark_ready()
+
 
+@app.on_event("shutdown")
+async def stop_warmup():
+    task = getattr(app.state, "warmup_task", None)
+    if task is not None and not task.done():
+        task.cancel()
@@ -0,0 +1,85 @@
+from logging.config import fileConfig
+
+from sqlalchemy import engine_from_config
+from sqlalchemy import pool
+
+from alembic import context
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.db.database import Base, MIGRATIONS_VERSION_TABLE
+import app.models  # noqa: F401 - регистрация всех моделей в Base.metadata
+
+config = context.config
+
+# Адрес из настроек приложения, если вызывающий (app.commands.migrate) не передал свой
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+
+# Interpret the config file for Python logging.
+# Логгеры приложения не отключаются: миграции могут выполняться в его процессе
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+# Метаданные для автогенерации миграций
+target_metadata = Base.metadata
+
+# База общая с auth_service: своя таблица версий, и автогенерация не трогает чужие таблицы
+VERSION_TABLE = MIGRATIONS_VERSION_TABLE
+
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return name in target_metadata.tables
+    return True
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Выражение GIN-индекса поиска PostgreSQL возвращает нормализованным, и сравнение всегда видит разницу
+    return not (type_ == "index" and name == "ix_services_search")
+
+
+def run_migrations_offline() -> None:
+    """Run migrations in 'offline' mode."""
+    url = config.get_main_option("sqlalchemy.url")
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        version_table=VERSION_TABLE,
+        include_name=include_name,
+        include_object=include_object,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode."""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection, 
+            target_metadata=target_metadata,
+            version_table=VERSION_TABLE,
+            include_name=include_name,
+            include_object=include_object
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,78 @@
+"""Базовая схема: города и услуги
+
+Схема в том виде, в каком ее создавал Base.metadata.create_all при импорте
+приложения до перехода на Alembic. Такую базу (без таблицы версий)
+python -m app.commands.migrate отмечает этой ревизией и доводит до head;
+то же самое вручную:
+
+    alembic stamp 0001
+    alembic upgrade head
+
+Следующие ревизии пропускают уже существующие таблицы, колонки и индексы,
+поэтому так же доводится и база, созданная create_all более поздней версии.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 20:21:21
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Тип создается один раз явно, а таблицы только ссылаются на него
+service_type = postgresql.ENUM('WORK', 'ESTATE', 'NEWS', 'AUTO', name='servicetype', create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    service_type.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        'cities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('slug', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index(op.f('ix_cities_id'), 'cities', ['id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_cities_name'), 'cities', ['name'], unique=True, if_not_exists=True)
+    op.create_index(op.f('ix_cities_slug'), 'cities', ['slug'], unique=True, if_not_exists=True)
+
+    op.create_table(
+        'services',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('city_id', sa.Integer(), nullable=False),
+        sa.Column('service_type', service_type, nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('price', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('rating', sa.Numeric(precision=2, scale=1), nullable=True),
+        sa.Column('reviews_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['city_id'], ['cities.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index(op.f('ix_services_id'), 'services', ['id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_services_city_id'), 'services', ['city_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_services_service_type'), 'services', ['service_type'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('services')
+    op.drop_table('cities')
+    service_type.drop(op.get_bind(), checkfirst=True)
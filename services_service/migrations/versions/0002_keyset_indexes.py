@@ -0,0 +1,36 @@
+"""Индексы постраничной выдачи по курсору: (..., created_at, id)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 20:26:28
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'ix_services_city_type_created_id': ['city_id', 'service_type', 'created_at', 'id'],
+    'ix_services_city_created_id': ['city_id', 'created_at', 'id'],
+    'ix_services_type_created_id': ['service_type', 'created_at', 'id'],
+    'ix_services_created_id': ['created_at', 'id'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'services', columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in INDEXES:
+        op.drop_index(name, table_name='services', if_exists=True)
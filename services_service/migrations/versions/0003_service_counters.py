@@ -0,0 +1,46 @@
+"""Счетчики услуг по городу и типу
+
+Таблица заполняется по уже существующим услугам.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 20:28:19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+service_type = postgresql.ENUM('WORK', 'ESTATE', 'NEWS', 'AUTO', name='servicetype', create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'service_counters',
+        sa.Column('city_id', sa.Integer(), nullable=False),
+        sa.Column('service_type', service_type, nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['city_id'], ['cities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('city_id', 'service_type'),
+        if_not_exists=True
+    )
+    op.execute(
+        "INSERT INTO service_counters (city_id, service_type, count) "
+        "SELECT city_id, service_type, count(*) FROM services GROUP BY city_id, service_type "
+        "ON CONFLICT DO NOTHING"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('service_counters')
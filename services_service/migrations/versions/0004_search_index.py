@@ -0,0 +1,33 @@
+"""GIN-индекс полнотекстового поиска по названию и описанию услуги
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 20:28:50
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Выражение должно совпадать с app.models.service.search_document
+    op.create_index(
+        'ix_services_search', 'services',
+        [sa.literal_column("to_tsvector('russian', coalesce(title, '') || ' ' || coalesce(description, ''))")],
+        unique=False, postgresql_using='gin', if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_services_search', table_name='services', if_exists=True)
@@ -0,0 +1,44 @@
+"""Время последнего изменения группы в счетчиках (валидатор списков услуг)
+
+Колонка заполняется по услугам группы так же, как в reconcile_counters.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 20:38:42
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('service_counters')}
+    if 'last_modified' in columns:
+        # Колонку уже создал create_all: значения валидаторов не сдвигаются
+        return
+
+    op.add_column(
+        'service_counters',
+        sa.Column('last_modified', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False)
+    )
+    op.execute(
+        "UPDATE service_counters AS c SET last_modified = g.last_modified "
+        "FROM (SELECT city_id, service_type, max(coalesce(updated_at, created_at, now())) AS last_modified "
+        "FROM services GROUP BY city_id, service_type) AS g "
+        "WHERE c.city_id = g.city_id AND c.service_type = g.service_type"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('service_counters', 'last_modified')
@@ -0,0 +1,30 @@
+"""Координаты городов
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 20:46:47
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cities', sa.Column('latitude', sa.Float(), nullable=True), if_not_exists=True)
+    op.add_column('cities', sa.Column('longitude', sa.Float(), nullable=True), if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('cities', 'longitude')
+    op.drop_column('cities', 'latitude')
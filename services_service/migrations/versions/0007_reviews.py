@@ -0,0 +1,54 @@
+"""Отзывы и сумма оценок для отложенного пересчета рейтинга
+
+Для услуг без rating_sum сумма восстанавливается из rating * reviews_count
+при первом применении отзывов (app.services.reviews).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 20:49:34
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'services', sa.Column('rating_sum', sa.Numeric(precision=14, scale=1), nullable=True), if_not_exists=True
+    )
+
+    op.create_table(
+        'reviews',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('rating', sa.SmallInteger(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.Column('applied', sa.Boolean(), server_default='false', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.CheckConstraint('rating BETWEEN 1 AND 5', name='ck_reviews_rating'),
+        sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index('ix_reviews_service_id_id', 'reviews', ['service_id', 'id'], unique=False, if_not_exists=True)
+    op.create_index(
+        'ix_reviews_pending', 'reviews', ['id'],
+        unique=False, postgresql_where=sa.text('applied IS false'), if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reviews')
+    op.drop_column('services', 'rating_sum')
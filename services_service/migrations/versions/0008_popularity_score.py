@@ -0,0 +1,47 @@
+"""Оценка популярности услуги и индексы сортировки sort=popular
+
+Оценки новых колонок заполняет фоновый пересчет (app.services.popularity)
+по частичному индексу ix_services_popularity_pending.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 20:52:53
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'ix_services_city_type_popularity_id': ['city_id', 'service_type', 'popularity_score', 'id'],
+    'ix_services_city_popularity_id': ['city_id', 'popularity_score', 'id'],
+    'ix_services_type_popularity_id': ['service_type', 'popularity_score', 'id'],
+    'ix_services_popularity_id': ['popularity_score', 'id'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('services', sa.Column('popularity_score', sa.Float(), nullable=True), if_not_exists=True)
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'services', columns, unique=False, if_not_exists=True)
+    op.create_index(
+        'ix_services_popularity_pending', 'services', ['id'],
+        unique=False, postgresql_where=sa.text('popularity_score IS NULL'), if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_services_popularity_pending', table_name='services', if_exists=True)
+    for name in INDEXES:
+        op.drop_index(name, table_name='services', if_exists=True)
+    op.drop_column('services', 'popularity_score')
@@ -0,0 +1,203 @@
+"""
+Общие фикстуры тестов services_service
+
+Тесты работают с отдельной базой PostgreSQL (DB_NAME, по умолчанию
+evening_city_test; хост и учетные данные - из тех же переменных DB_*, что
+и приложение). База создается при необходимости, схема - миграциями Alembic.
+Если PostgreSQL недоступен, тесты, которым нужна база, пропускаются.
+
+Запуск из каталога services_service:
+    DB_HOST=127.0.0.1 python -m pytest
+"""
+import asyncio
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator, List
+
+os.environ.setdefault("DB_NAME", "evening_city_test")
+os.environ.setdefault("CACHE_REDIS_URL", "")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+
+SERVICE_ROOT = Path(__file__).resolve().parents[1]
+
+CITIES = [
+    {"name": "Москва", "slug": "moscow", "latitude": 55.7558, "longitude": 37.6173},
+    {"name": "Санкт-Петербург", "slug": "spb", "latitude": 59.9343, "longitude": 30.3351},
+    {"name": "Казань", "slug": "kazan", "latitude": 55.7963, "longitude": 49.1088},
+]
+SERVICES_PER_CITY = 10
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Выполнение корутин теста в одном цикле событий на всю сессию (пулы соединений привязаны к циклу)"""
+    with asyncio.Runner() as runner:
+        yield runner.run
+
+
+def admin_engine():
+    """Движок служебной базы postgres для создания и удаления тестовых баз"""
+    return create_engine(
+        make_url(settings.DATABASE_URL).set(database="postgres"),
+        isolation_level="AUTOCOMMIT",
+        connect_args={"connect_timeout": 3}
+    )
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Тестовая база со схемой последней миграции"""
+    url = make_url(settings.DATABASE_URL)
+    admin = admin_engine()
+    try:
+        with admin.connect() as connection:
+            exists = connection.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": url.database}
+            )
+            if not exists:
+                connection.execute(text(f'CREATE DATABASE "{url.database}"'))
+    except OperationalError as e:
+        pytest.skip(f"PostgreSQL недоступен: {e.orig}")
+    finally:
+        admin.dispose()
+
+    subprocess.run([sys.executable, "-m", "app.commands.migrate"], cwd=SERVICE_ROOT, check=True)
+    return url.database
+
+
+@pytest.fixture
+def scratch_url(database):
+    """Пустая база для одного теста, удаляется после него"""
+    url = make_url(settings.DATABASE_URL).set(database=f"{database}_scratch")
+    admin = admin_engine()
+    with admin.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{url.database}"'))
+        connection.execute(text(f'CREATE DATABASE "{url.database}"'))
+    yield url.render_as_string(hide_password=False)
+    with admin.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{url.database}" WITH (FORCE)'))
+    admin.dispose()
+
+
+@pytest.fixture(scope="session")
+def app(database):
+    import main
+
+    return main.app
+
+
+@pytest.fixture
+def client(app, run):
+    """Клиент приложения; свой на каждый тест, чтобы cookie одного теста не влияли на другие"""
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    yield client
+    run(client.aclose())
+
+
+@pytest.fixture
+def catalog(database, run):
+    """Города CITIES по SERVICES_PER_CITY услуг с чередованием типов; кэши каталога сброшены"""
+    from app.core.cache import invalidate_catalog_caches
+    from app.db.database import SessionLocal, async_engine
+    from app.models.city import City
+    from app.models.service import Service, ServiceType
+    from app.services.counters import reconcile_counters
+
+    types = list(ServiceType)
+    created = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+    with SessionLocal() as db:
+        db.execute(text("TRUNCATE reviews, services, service_counters, cities RESTART IDENTITY CASCADE"))
+        cities = [City(**city) for city in CITIES]
+        db.add_all(cities)
+        db.flush()
+
+        for i in range(SERVICES_PER_CITY * len(cities)):
+            db.add(Service(
+                city_id=cities[i % len(cities)].id,
+                service_type=types[i % len(types)],
+                title=f"Услуга {i}",
+                description="Ремонт квартир под ключ" if i % 2 else "Уборка и химчистка",
+                price=Decimal(1000 + i * 100) if i % 4 != 2 else None,
+                image_url="img/news01.webp",
+                rating=Decimal("4.5"),
+                reviews_count=i,
+                created_at=created + timedelta(minutes=i)
+            ))
+        db.commit()
+        reconcile_counters(db)
+
+    run(invalidate_catalog_caches())
+    # Соединение пула открыто заранее, чтобы в тестах считались только запросы обработчиков
+    run(_open_connection(async_engine))
+    return {"cities": CITIES, "services": SERVICES_PER_CITY * len(CITIES)}
+
+
+async def _open_connection(engine) -> None:
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+@pytest.fixture
+def sql_statements():
+    """
+    Запись SQL-выражений, выполненных обработчиками через основной движок
+
+        with sql_statements() as statements:
+            ...
+        assert len(statements) == 1
+    """
+    from app.db.database import async_engine
+
+    @contextmanager
+    def record() -> Iterator[List[str]]:
+        statements: List[str] = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(" ".join(statement.split()))
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    return record
+
+
+@pytest.fixture
+def replica(database, run, monkeypatch):
+    """
+    Реплика для чтения: отдельный движок к той же тестовой базе
+
+    replica.engine - движок реплики, replica.statements - выполненные через нее выражения.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.db import database as db_module
+    from app.db.database import async_engine
+    from app.db.replicas import ReplicaRouter
+
+    engine = create_async_engine(settings.ASYNC_DATABASE_URL, pool_size=2, max_overflow=0)
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    monkeypatch.setattr(db_module, "replica_router", ReplicaRouter([engine], retry_seconds=30, primary=async_engine))
+    yield SimpleNamespace(engine=engine, statements=statements)
+    run(engine.dispose())
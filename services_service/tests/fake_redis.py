@@ -0,0 +1,95 @@
+"""
+Сервер с протоколом Redis (RESP2) в процессе теста
+
+Поддерживает команды, которыми пользуется RedisBackend: GET, SET с PX,
+INCR / INCRBY; остальные (CLIENT SETINFO, SELECT и т.п.) отвечают OK.
+Запускается в цикле событий теста:
+
+    server = FakeRedisServer()
+    await server.start()
+    backend = RedisBackend(server.url, timeout=1)
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class FakeRedisServer:
+    """Хранилище ключей в памяти с истечением по PX и журналом полученных команд"""
+
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands: List[str] = []
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._writers = set()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    async def start(self, port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Остановка с разрывом открытых соединений, как при падении сервера"""
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _execute(self, args: List[bytes]) -> bytes:
+        command = args[0].decode().upper()
+        self.commands.append(command)
+
+        if command == "GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+        if command == "SET":
+            expires_at = None
+            options = [option.upper() for option in args[3:]]
+            if b"PX" in options:
+                expires_at = time.monotonic() + int(args[3 + options.index(b"PX") + 1]) / 1000
+            self.data[args[1]] = (args[2], expires_at)
+            return b"+OK\r\n"
+
+        if command in ("INCR", "INCRBY"):
+            value = int(self._get(args[1]) or 0) + (int(args[2]) if command == "INCRBY" else 1)
+            self.data[args[1]] = (str(value).encode(), None)
+            return b":%d\r\n" % value
+
+        if command == "HELLO":
+            return b"-ERR unknown command 'HELLO'\r\n"
+
+        return b"+OK\r\n"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self._execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -0,0 +1,45 @@
+"""Периодические фоновые задачи: ошибка прохода пишется в лог и не останавливает задачу"""
+import asyncio
+import logging
+
+import pytest
+
+from app.services.background import PeriodicJob
+
+
+class FlakyJob(PeriodicJob):
+    name = "flaky"
+
+    def __init__(self):
+        super().__init__(interval=0.01)
+        self.calls = 0
+
+    async def run_once(self) -> int:
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("сбой первого прохода")
+        return self.calls
+
+
+def test_periodic_job_requires_run_once():
+    with pytest.raises(TypeError):
+        PeriodicJob(interval=1)
+
+
+def test_failed_run_is_logged_and_job_keeps_running(caplog):
+    job = FlakyJob()
+
+    async def scenario():
+        job.start()
+        while job.calls < 3:
+            await asyncio.sleep(0.01)
+        await job.stop(final_run=True)
+
+    with caplog.at_level(logging.ERROR, logger="app.services.background"):
+        asyncio.run(scenario())
+
+    assert job.calls >= 4
+    errors = [record for record in caplog.records if record.name == "app.services.background"]
+    assert len(errors) == 1
+    assert errors[0].getMessage() == "Ошибка фоновой задачи flaky"
+    assert errors[0].exc_info[0] is RuntimeError
@@ -0,0 +1,42 @@
+"""Чтение услуг с городом: число SQL-запросов не зависит от размера страницы (нет N+1 по service.city)"""
+import pytest
+
+
+@pytest.mark.parametrize("path, params, expected_queries", [
+    # валидатор списка по счетчикам и страница
+    ("/api/v1/services/", {"limit": 20}, 2),
+    ("/api/v1/services/", {"limit": 20, "city_slug": "spb"}, 2),
+    ("/api/v1/services/by-type/work", {"limit": 20}, 2),
+    ("/api/v1/services/search", {"q": "ремонт", "limit": 20}, 1),
+    ("/api/v1/services/batch", {"ids": "1,2,3,4,5,6,7,8,9,10,11,12"}, 1),
+])
+def test_list_reads_use_fixed_number_of_queries(client, catalog, sql_statements, run, path, params, expected_queries):
+    with sql_statements() as statements:
+        response = run(client.get(path, params=params))
+
+    assert response.status_code == 200
+    data = response.json()
+    items = data["items"] if isinstance(data, dict) else data
+    assert len(items) > 1
+    assert all(item["city_name"] and item["city_slug"] for item in items)
+    assert len(statements) == expected_queries, statements
+    # Город приходит в той же строке, отдельных чтений cities нет
+    assert not any(statement.startswith("SELECT cities.") for statement in statements)
+
+
+def test_page_includes_services_of_different_cities(client, catalog, sql_statements, run):
+    with sql_statements() as statements:
+        response = run(client.get("/api/v1/services/", params={"limit": 30}))
+
+    assert {item["city_slug"] for item in response.json()} == {city["slug"] for city in catalog["cities"]}
+    assert len(statements) == 2
+
+
+def test_get_service_is_single_query(client, catalog, sql_statements, run):
+    with sql_statements() as statements:
+        response = run(client.get("/api/v1/services/7"))
+
+    assert response.status_code == 200
+    assert response.json()["city_slug"] == "moscow"
+    assert len(statements) == 1
+    assert "JOIN cities" in statements[0]
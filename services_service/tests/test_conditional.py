@@ -0,0 +1,51 @@
+"""Условные запросы списков и услуги: валидатор списка читается из счетчиков, а не агрегатом по услугам"""
+import pytest
+
+from app.core.shared_cache import shared_cache
+from app.core.single_flight import single_flight
+
+
+@pytest.fixture
+def uncached_reads(monkeypatch):
+    """Чтения мимо общего кэша и single-flight: валидатор строится на каждый запрос"""
+    monkeypatch.setattr(shared_cache, "enabled", False)
+    monkeypatch.setattr(single_flight, "enabled", False)
+
+
+@pytest.mark.parametrize("params", [{}, {"city_slug": "spb"}, {"service_type": "news"}])
+def test_list_not_modified_reads_only_counters(client, catalog, sql_statements, run, uncached_reads, params):
+    response = run(client.get("/api/v1/services/", params=params))
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+
+    with sql_statements() as statements:
+        response = run(client.get("/api/v1/services/", params=params, headers={"If-None-Match": etag}))
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert len(statements) == 1
+    assert "FROM service_counters" in statements[0]
+    assert "FROM services" not in statements[0]
+
+
+def test_list_validator_changes_after_create(client, catalog, run, uncached_reads):
+    etag = run(client.get("/api/v1/services/", params={"city_slug": "kazan"})).headers["ETag"]
+
+    created = run(client.post("/api/v1/services/", json={
+        "city_id": 3, "service_type": "work", "title": "Новая услуга", "price": "1000.00"
+    }))
+    assert created.status_code == 201
+
+    response = run(client.get("/api/v1/services/", params={"city_slug": "kazan"}, headers={"If-None-Match": etag}))
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()[0]["title"] == "Новая услуга"
+
+
+def test_service_not_modified(client, catalog, run, uncached_reads):
+    response = run(client.get("/api/v1/services/5"))
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+
+    assert run(client.get("/api/v1/services/5", headers={"If-None-Match": etag})).status_code == 304
+    assert run(client.get("/api/v1/services/5", headers={"If-Modified-Since": last_modified})).status_code == 304
+    assert run(client.get("/api/v1/services/5", headers={"If-None-Match": 'W/"other"'})).status_code == 200
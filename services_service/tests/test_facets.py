@@ -0,0 +1,117 @@
+"""Счетчики фильтров: один проход по услугам, разрез без собственного фильтра и собственный переключатель кэша"""
+from collections import Counter
+
+import pytest
+from sqlalchemy import select
+
+from app.core.cache import ResponseCache, cities_cache, facets_cache
+from app.db.database import SessionLocal
+from app.models.city import City
+from app.models.service import Service
+
+
+def test_facets_counts_and_cache(client, catalog, run):
+    first = run(client.get("/api/v1/services/facets", params={"city_slug": "moscow"}))
+    second = run(client.get("/api/v1/services/facets", params={"city_slug": "moscow"}))
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    facets = first.json()
+    assert facets["total"] == 10
+    # Разрез по городу без фильтра по городу: видны и другие города
+    assert facets["city"] == [
+        {"city_slug": "kazan", "city_name": "Казань", "count": 10},
+        {"city_slug": "moscow", "city_name": "Москва", "count": 10},
+        {"city_slug": "spb", "city_name": "Санкт-Петербург", "count": 10},
+    ]
+    assert sum(item["count"] for item in facets["service_type"]) == 10
+
+
+def test_facets_cache_switch_is_independent_of_cities_cache(client, catalog, run, monkeypatch):
+    monkeypatch.setattr(cities_cache, "enabled", False)
+
+    run(client.get("/api/v1/services/facets"))
+    assert run(client.get("/api/v1/services/facets")).headers["X-Cache"] == "HIT"
+
+    monkeypatch.setattr(facets_cache, "enabled", False)
+    assert run(client.get("/api/v1/services/facets")).headers["X-Cache"] == "MISS"
+
+
+def test_facets_cache_is_bounded_by_client_filters(client, catalog, run, monkeypatch):
+    monkeypatch.setattr(facets_cache, "max_entries", 5)
+
+    for price_min in range(1, 13):
+        response = run(client.get("/api/v1/services/facets", params={"price_min": price_min}))
+        assert response.headers["X-Cache"] == "MISS"
+        assert facets_cache.stats()["entries"] <= 5
+
+    # Последние прочитанные остаются, давно не читанные вытеснены
+    assert run(client.get("/api/v1/services/facets", params={"price_min": 12})).headers["X-Cache"] == "HIT"
+    assert run(client.get("/api/v1/services/facets", params={"price_min": 1})).headers["X-Cache"] == "MISS"
+
+
+def test_expired_entries_are_dropped_on_read():
+    cache = ResponseCache(ttl=0, max_entries=10)
+    cache.set("a", b"1")
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def catalog_rows() -> list:
+    with SessionLocal() as db:
+        return db.execute(
+            select(Service.service_type, Service.price, Service.rating, City.slug).join(City)
+        ).all()
+
+
+def expected_facets(rows: list, city_slug=None, service_type=None, price_min=None, rating_min=None) -> dict:
+    """Перебор: каждый разрез - со всеми фильтрами, кроме своего"""
+    checks = {
+        "type": lambda row: service_type is None or row.service_type.value == service_type,
+        "city": lambda row: city_slug is None or row.slug == city_slug,
+        "price": lambda row: price_min is None or (row.price is not None and row.price >= price_min),
+        "rating": lambda row: rating_min is None or row.rating >= rating_min,
+    }
+
+    def passing(exclude=None):
+        return [row for row in rows if all(check(row) for name, check in checks.items() if name != exclude)]
+
+    return {
+        "total": len(passing()),
+        "service_type": dict(Counter(row.service_type.value for row in passing("type"))),
+        "city": dict(Counter(row.slug for row in passing("city"))),
+        "without_price": sum(row.price is None for row in passing("price")),
+        "priced": sum(row.price is not None for row in passing("price")),
+        "rating": sum(row.rating is not None for row in passing("rating")),
+    }
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"service_type": "news"},
+    {"city_slug": "moscow", "service_type": "work"},
+    {"city_slug": "spb", "price_min": 2000},
+    {"service_type": "auto", "price_min": 2500, "rating_min": 4},
+    {"rating_min": 5},
+])
+def test_each_dimension_ignores_its_own_filter(client, catalog, run, params):
+    expected = expected_facets(catalog_rows(), **params)
+
+    facets = run(client.get("/api/v1/services/facets", params=params)).json()
+
+    assert facets["total"] == expected["total"]
+    assert {item["service_type"]: item["count"] for item in facets["service_type"]} == expected["service_type"]
+    assert {item["city_slug"]: item["count"] for item in facets["city"]} == expected["city"]
+    assert facets["without_price"] == expected["without_price"]
+    assert sum(item["count"] for item in facets["price"]) == expected["priced"]
+    assert sum(item["count"] for item in facets["rating"]) == expected["rating"]
+    assert all(item["count"] > 0 for key in ("service_type", "city", "price", "rating") for item in facets[key])
+
+
+def test_selected_type_keeps_other_options(client, catalog, run):
+    facets = run(client.get("/api/v1/services/facets", params={"city_slug": "kazan", "service_type": "estate"})).json()
+
+    assert {item["service_type"] for item in facets["service_type"]} == {"work", "estate", "news", "auto"}
+    assert {item["city_slug"] for item in facets["city"]} == {"moscow", "spb", "kazan"}
+    assert facets["total"] < sum(item["count"] for item in facets["service_type"])
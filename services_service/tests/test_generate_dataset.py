@@ -0,0 +1,28 @@
+"""Генератор данных: загрузка в базу --database-url вместе со счетчиками"""
+from sqlalchemy import create_engine, text
+
+from app.commands.generate_dataset import load_services, parse_args
+from app.commands.migrate import migrate
+
+
+def test_load_services_reconciles_counters_in_target_database(scratch_url, run):
+    migrate(scratch_url)
+    args = parse_args(["--database-url", scratch_url, "--cities", "3", "--services-per-city", "40", "--batch", "25"])
+
+    run(load_services(args))
+
+    engine = create_engine(scratch_url)
+    with engine.connect() as connection:
+        services = connection.scalar(text("SELECT count(*) FROM services"))
+        groups = connection.execute(text(
+            "SELECT city_id, service_type::text, count(*) FROM services GROUP BY 1, 2 ORDER BY 1, 2"
+        )).all()
+        counters = connection.execute(text(
+            "SELECT city_id, service_type::text, count FROM service_counters ORDER BY 1, 2"
+        )).all()
+        unscored = connection.scalar(text("SELECT count(*) FROM services WHERE popularity_score IS NULL"))
+    engine.dispose()
+
+    assert services == 120
+    assert counters == groups
+    assert unscored == 0
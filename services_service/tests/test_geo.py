@@ -0,0 +1,105 @@
+"""Пространственный индекс городов: результаты KD-дерева совпадают с полным перебором по формуле гаверсинусов"""
+import math
+import random
+
+import pytest
+
+from app.services.geo import EARTH_RADIUS_KM, CityIndex
+
+# Расстояния дерева (по хорде) и перебора (гаверсинус) совпадают с точностью вычислений с плавающей точкой
+TOLERANCE_KM = 1e-6
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def random_cities(rng: random.Random, count: int) -> list:
+    """Города по всему шару и скопление по обе стороны 180-го меридиана"""
+    cities = []
+    for i in range(count):
+        if i % 2:
+            lon = rng.uniform(170, 180) if i % 4 == 1 else rng.uniform(-180, -170)
+            lat = rng.uniform(50, 70)
+        else:
+            lon = rng.uniform(-180, 180)
+            lat = math.degrees(math.asin(rng.uniform(-1, 1)))
+        cities.append({"id": i + 1, "latitude": lat, "longitude": lon})
+    return cities
+
+
+def brute_force(cities: list, lat: float, lon: float) -> list:
+    return sorted(
+        ((haversine_km(lat, lon, city["latitude"], city["longitude"]), city["id"]) for city in cities)
+    )
+
+
+def random_query(rng: random.Random):
+    if rng.random() < 0.5:
+        return rng.uniform(50, 70), rng.choice([rng.uniform(179, 180), rng.uniform(-180, -179)])
+    return math.degrees(math.asin(rng.uniform(-1, 1))), rng.uniform(-180, 180)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_nearest_matches_brute_force(seed):
+    rng = random.Random(seed)
+    cities = random_cities(rng, 400)
+    index = CityIndex(cities)
+
+    for _ in range(50):
+        lat, lon = random_query(rng)
+        k = rng.choice([1, 3, 10, 400, 500])
+        expected = brute_force(cities, lat, lon)[:k]
+
+        found = index.nearest(lat, lon, k)
+
+        assert len(found) == len(expected)
+        assert [distance for _, distance in found] == pytest.approx([d for d, _ in expected], abs=TOLERANCE_KM)
+        # Равноудаленные города могут идти в любом порядке, но набор - тот же, кроме границы k
+        cutoff = expected[-1][0] - TOLERANCE_KM
+        assert {city["id"] for city, d in found if d < cutoff} == {city_id for d, city_id in expected if d < cutoff}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_within_matches_brute_force(seed):
+    rng = random.Random(seed)
+    cities = random_cities(rng, 400)
+    index = CityIndex(cities)
+
+    for _ in range(50):
+        lat, lon = random_query(rng)
+        all_distances = brute_force(cities, lat, lon)
+        # Радиус ровно до случайного города: он лежит на границе
+        edge_distance, edge_id = rng.choice(all_distances[:60])
+        for radius in (edge_distance + TOLERANCE_KM, edge_distance - TOLERANCE_KM, rng.uniform(0, 3000)):
+            expected = [(d, city_id) for d, city_id in all_distances if d <= radius]
+
+            found = index.within(lat, lon, radius)
+
+            assert [city["id"] for city, _ in found] == [city_id for _, city_id in expected]
+            assert [d for _, d in found] == pytest.approx([d for d, _ in expected], abs=TOLERANCE_KM)
+
+        assert edge_id in {city["id"] for city, _ in index.within(lat, lon, edge_distance + TOLERANCE_KM)}
+        assert edge_id not in {city["id"] for city, _ in index.within(lat, lon, edge_distance - TOLERANCE_KM)}
+
+
+def test_antimeridian_neighbours_are_close():
+    index = CityIndex([
+        {"id": 1, "latitude": 65.0, "longitude": 179.9},
+        {"id": 2, "latitude": 65.0, "longitude": -179.9},
+        {"id": 3, "latitude": 65.0, "longitude": 170.0},
+    ])
+
+    (city, distance), = index.nearest(65.0, -179.95, 1)
+    assert city["id"] == 2
+    assert [c["id"] for c, _ in index.within(65.0, 179.95, 10)] == [1, 2]
+    assert distance == pytest.approx(haversine_km(65.0, -179.95, 65.0, -179.9), abs=TOLERANCE_KM)
+
+
+def test_empty_index():
+    index = CityIndex([])
+
+    assert index.nearest(55.75, 37.62, 3) == []
+    assert index.within(55.75, 37.62, 100) == []
@@ -0,0 +1,188 @@
+"""Варианты изображений: построение, дисковый кэш с вытеснением по LRU, ошибки исходников и thumbnail_url"""
+import io
+import os
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from app.core.cache import invalidate_catalog_caches
+from app.routers import images as images_router
+from app.services import images as images_module
+from app.services.images import DiskLRU, ImageVariants
+
+
+def image_bytes(width: int, height: int, image_format: str = "PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def rendered(image_format: str = "webp") -> float:
+    return REGISTRY.get_sample_value("image_variants_total", {"format": image_format, "result": "rendered"}) or 0.0
+
+
+def cache_files(variants: ImageVariants) -> list:
+    return sorted(path.name for path in variants.cache.root.glob("*/*"))
+
+
+@pytest.fixture
+def variants(tmp_path, monkeypatch):
+    """ImageVariants с исходниками img/wide.png (400x200) и img/small.png (100x50) во временном каталоге"""
+    source_root = tmp_path / "images"
+    (source_root / "img").mkdir(parents=True)
+    (source_root / "img" / "wide.png").write_bytes(image_bytes(400, 200))
+    (source_root / "img" / "small.png").write_bytes(image_bytes(100, 50))
+
+    variants = ImageVariants(str(source_root), str(tmp_path / "cache"), max_bytes=1 << 20, workers=1)
+    monkeypatch.setattr(images_module, "image_variants", variants)
+    monkeypatch.setattr(images_router, "image_variants", variants)
+    yield variants
+    variants.close()
+
+
+def test_variant_is_rendered_once_and_served_from_disk(client, variants, run):
+    before = rendered()
+
+    response = run(client.get("/api/v1/images/160/img/wide.png", params={"format": "webp"}))
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "image/webp"
+    with Image.open(io.BytesIO(response.content)) as image:
+        assert (image.format, image.size) == ("WEBP", (160, 80))
+
+    again = run(client.get("/api/v1/images/160/img/wide.png", params={"format": "webp"}))
+    assert again.content == response.content
+    assert again.headers["ETag"] == response.headers["ETag"]
+    assert rendered() == before + 1
+    assert len(cache_files(variants)) == 1
+
+    not_modified = run(client.get(
+        "/api/v1/images/160/img/wide.png", params={"format": "webp"}, headers={"If-None-Match": response.headers["ETag"]}
+    ))
+    assert not_modified.status_code == 304
+
+
+def test_variant_format_follows_accept_and_is_not_upscaled(client, variants, run):
+    response = run(client.get("/api/v1/images/320/img/small.png", headers={"Accept": "image/avif,image/*"}))
+
+    assert response.headers["Content-Type"] == "image/avif"
+    assert "Accept" in [name.strip() for name in response.headers["Vary"].split(",")]
+    with Image.open(io.BytesIO(response.content)) as image:
+        assert image.size == (100, 50)
+
+
+@pytest.mark.parametrize("accept, content_type", [
+    ("image/avif;q=0, image/webp", "image/webp"),
+    ("image/avif;q=0", "image/webp"),
+    ("image/webp, image/avif;q=0.5", "image/webp"),
+    ("image/avif, image/webp, image/*, */*;q=0.8", "image/avif"),
+    ("*/*", "image/webp"),
+    (None, "image/webp"),
+])
+def test_variant_format_follows_accept_weights(client, variants, run, accept, content_type):
+    headers = {"Accept": accept} if accept is not None else {}
+
+    response = run(client.get("/api/v1/images/160/img/small.png", headers=headers))
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == content_type
+
+
+def test_new_source_gives_new_variant(client, variants, run):
+    first = run(client.get("/api/v1/images/160/img/wide.png", params={"format": "webp"}))
+    (variants.source_root / "img" / "wide.png").write_bytes(image_bytes(800, 200))
+
+    second = run(client.get("/api/v1/images/160/img/wide.png", params={"format": "webp"}))
+
+    assert second.headers["ETag"] != first.headers["ETag"]
+    with Image.open(io.BytesIO(second.content)) as image:
+        assert image.size == (160, 40)
+
+
+def test_cache_evicts_least_recently_used_variant(client, variants, run):
+    def get(width: int) -> tuple:
+        """Имя файла варианта в кэше и его размер"""
+        response = run(client.get(f"/api/v1/images/{width}/img/wide.png", params={"format": "webp"}))
+        digest = response.headers["ETag"].strip('"')
+        return f"{digest}.webp", len(response.content)
+
+    (name_160, size_160), (name_320, size_320) = get(160), get(320)
+    # К 160 обратились позже, чем к 320; места хватает на два варианта из трех
+    get(160)
+    variants.cache.max_bytes = size_160 + size_320 + size_320 // 2
+    before = rendered()
+
+    name_640, _ = get(640)
+
+    assert cache_files(variants) == sorted([name_160, name_640])
+    assert variants.cache.total <= variants.cache.max_bytes
+    assert rendered() == before + 1
+
+    # Вытесненный вариант строится заново, оставшийся отдается с диска
+    get(320)
+    get(320)
+    assert rendered() == before + 2
+
+
+def test_lru_restores_files_left_by_previous_run(tmp_path):
+    root = tmp_path / "cache"
+    (root / "ab").mkdir(parents=True)
+    for name, size, mtime in [("old.webp", 10, 100), ("new.webp", 20, 200)]:
+        path = root / "ab" / name
+        path.write_bytes(b"x" * size)
+        os.utime(path, (mtime, mtime))
+    (root / "ab" / "left.webp.123.tmp").write_bytes(b"x" * 5)
+
+    cache = DiskLRU(root, max_bytes=25)
+    assert cache.lookup(root / "ab" / "new.webp")
+    assert cache.total == 30
+
+    cache.add(root / "ab" / "fresh.webp", 1)
+
+    assert not (root / "ab" / "old.webp").exists()
+    assert (root / "ab" / "new.webp").exists()
+    assert cache.total == 21
+
+
+@pytest.mark.parametrize("content, status_code", [
+    (b"not an image at all", 415),
+    (image_bytes(400, 200)[:200], 422),
+])
+def test_broken_source_is_rejected_without_leftovers(client, variants, run, content, status_code):
+    (variants.source_root / "img" / "broken.png").write_bytes(content)
+
+    response = run(client.get("/api/v1/images/160/img/broken.png", params={"format": "webp"}))
+
+    assert response.status_code == status_code
+    assert list(variants.cache.root.glob("*/*")) == []
+    # Ошибка не кэшируется и не ломает пул процессов
+    assert run(client.get("/api/v1/images/160/img/broken.png", params={"format": "webp"})).status_code == status_code
+    assert run(client.get("/api/v1/images/160/img/wide.png", params={"format": "webp"})).status_code == 200
+
+
+def test_missing_or_outside_source_is_not_found(client, variants, run, tmp_path):
+    (tmp_path / "outside.png").write_bytes(image_bytes(10, 10))
+
+    assert run(client.get("/api/v1/images/160/img/missing.png")).status_code == 404
+    for path in ("img", "../outside.png", "img/../../outside.png", str(tmp_path / "outside.png")):
+        with pytest.raises(HTTPException) as error:
+            variants.source_path(path)
+        assert error.value.status_code == 404
+
+
+def test_thumbnail_url_only_when_images_root_exists(client, catalog, run, tmp_path, monkeypatch):
+    def thumbnails():
+        run(invalidate_catalog_caches())
+        return {item["thumbnail_url"] for item in run(client.get("/api/v1/services/", params={"limit": 5})).json()}
+
+    monkeypatch.setattr(images_module, "image_variants", ImageVariants("", str(tmp_path / "cache"), 1, 1))
+    assert thumbnails() == {None}
+
+    missing = ImageVariants(str(tmp_path / "missing"), str(tmp_path / "cache"), 1, 1)
+    monkeypatch.setattr(images_module, "image_variants", missing)
+    assert thumbnails() == {None}
+
+    monkeypatch.setattr(images_module, "image_variants", ImageVariants(str(tmp_path), str(tmp_path / "cache"), 1, 1))
+    assert thumbnails() == {"/api/v1/images/320/img/news01.webp"}
@@ -0,0 +1,165 @@
+"""Пакетная загрузка услуг: разбор потока NDJSON/CSV, отчет по строкам, запись пачками через COPY"""
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.services.ingest import IngestError, ServiceIngestor, iter_csv_records, iter_ndjson_records
+
+
+async def chunked(body: bytes, size: int):
+    """Тело запроса кусками по size байт: границы кусков режут строки и многобайтовые символы"""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+def test_csv_quoted_fields_span_lines_and_chunks(run):
+    body = (
+        'title,description,price\r\n'
+        '"Ремонт, отделка","Первая строка\nвторая ""в кавычках""\n\nпосле пустой",1000\r\n'
+        'Уборка,,\n'
+        '"Без закрывающей кавычки,описание\n'
+    ).encode()
+
+    for size in (1, 3, 7, len(body)):
+        assert run(collect(iter_csv_records(chunked(body, size)))) == [
+            (1, {
+                "title": "Ремонт, отделка",
+                "description": 'Первая строка\nвторая "в кавычках"\n\nпосле пустой',
+                "price": "1000"
+            }, None),
+            (2, {"title": "Уборка", "description": None, "price": None}, None),
+            (3, None, "Незакрытая кавычка в конце файла"),
+        ]
+
+
+def test_csv_unclosed_quote_stops_at_record_size_limit(run):
+    body = ('title,description\nУборка,ok\nРемонт,"без закрывающей кавычки\n' + "продолжение\n" * 100).encode()
+
+    records = iter_csv_records(chunked(body, 16), max_record_size=200)
+
+    with pytest.raises(IngestError) as error:
+        run(collect(records))
+    assert error.value.row_number == 2
+    assert str(error.value).startswith("Запись со строки 3 длиннее 200 символов")
+
+
+def test_bulk_csv_unclosed_quote_keeps_rows_before_it(client, catalog, run):
+    body = (
+        "city_slug,service_type,title,description\n"
+        "moscow,work,Электрик,ok\n"
+        'moscow,work,Сантехник,"без закрывающей кавычки\n'
+        + "moscow,work,Плотник,,\n" * (settings.BULK_MAX_RECORD_SIZE // 20)
+    )
+
+    response = run(client.post(
+        "/api/v1/services/bulk", content=body.encode(), headers={"Content-Type": "text/csv"}
+    ))
+
+    report = response.json()
+    assert report["inserted"] == 1
+    assert report["failed"] == 1
+    assert report["errors"][0]["row"] == 2
+    assert report["errors"][0]["errors"][0]["msg"].startswith("Запись со строки 3 длиннее")
+
+
+def test_csv_reports_wrong_field_count(run):
+    records = run(collect(iter_csv_records(chunked(b"title,price\na,1,extra\nb,2\n", 4))))
+
+    assert records == [
+        (1, None, "Ожидалось 2 полей, получено 3"),
+        (2, {"title": "b", "price": "2"}, None),
+    ]
+
+
+def test_ndjson_reports_malformed_lines(run):
+    body = b'{"title": "a"}\n\nnot json\n[1, 2]\n{"title": "b"}'
+
+    records = run(collect(iter_ndjson_records(chunked(body, 5))))
+
+    assert [(row, data) for row, data, _ in records] == [
+        (1, {"title": "a"}), (2, None), (3, None), (4, {"title": "b"})
+    ]
+    assert records[1][2].startswith("Некорректный JSON")
+    assert records[2][2] == "Строка должна быть JSON-объектом"
+
+
+def test_bulk_csv_reports_rows_and_updates_counters(client, catalog, run):
+    body = (
+        "city_slug,service_type,title,description,price\n"
+        'moscow,auto,Lada Vesta,"Новая,\nна гарантии",1200000\n'
+        "nowhere,auto,Kia Rio,,1600000\n"
+        "spb,boats,Яхта,,\n"
+        "spb,work,Электрик,,abc\n"
+        "kazan,work,Электрик,,900\n"
+    )
+
+    response = run(client.post(
+        "/api/v1/services/bulk", content=body.encode(), headers={"Content-Type": "text/csv"}
+    ))
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["inserted"] == 2
+    assert report["failed"] == 3
+    assert report["errors_truncated"] is False
+    assert [(error["row"], error["errors"][0]["loc"]) for error in report["errors"]] == [
+        (2, ["city_slug"]), (3, ["service_type"]), (4, ["price"])
+    ]
+
+    counts = run(client.get("/api/v1/services/count/by-city/moscow")).json()
+    assert counts["total"] == 11
+    assert counts["counts"]["auto"] == 4
+
+    service = run(client.get("/api/v1/services/search", params={"q": "гарантии"})).json()[0]
+    assert service["title"] == "Lada Vesta"
+    assert service["description"] == "Новая,\nна гарантии"
+    assert service["rating"] == "0.0"
+    assert service["reviews_count"] == 0
+    assert service["created_at"] is not None
+
+
+def test_ingest_holds_at_most_one_batch(catalog, run):
+    """Строки читаются из потока по мере записи: пачка пишется, как только набралась"""
+    total, batch_size = 2500, 100
+    consumed = []
+    flushed_at = []
+
+    async def records():
+        for row in range(1, total + 1):
+            consumed.append(row)
+            yield row, {"city_id": 1 + row % 3, "service_type": "news", "title": f"Новость {row}"}, None
+
+    class RecordingIngestor(ServiceIngestor):
+        async def flush(self):
+            assert len(self._batch) <= self.batch_size
+            flushed_at.append(len(consumed))
+            await super().flush()
+
+    async def ingest():
+        async with AsyncSessionLocal() as db:
+            return await RecordingIngestor(db, batch_size=batch_size).ingest(records())
+
+    report = run(ingest())
+
+    assert report["inserted"] == total
+    assert flushed_at[:3] == [100, 200, 300]
+    assert len(flushed_at) == total // batch_size + 1
+
+
+def test_bulk_ndjson_reports_invalid_rows(client, catalog, run):
+    lines = [json.dumps({"city_id": 1, "service_type": "work", "title": ""}) for _ in range(3)]
+    lines.append(json.dumps({"city_id": 999, "service_type": "work", "title": "Сантехник"}))
+
+    response = run(client.post("/api/v1/services/bulk", params={"format": "ndjson"}, content="\n".join(lines)))
+
+    report = response.json()
+    assert report["inserted"] == 0
+    assert report["failed"] == 4
+    assert [error["row"] for error in report["errors"]] == [1, 2, 3, 4]
+    assert report["errors"][3]["errors"] == [{"loc": ["city_id"], "msg": "Город не найден"}]
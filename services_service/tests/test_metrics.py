@@ -0,0 +1,28 @@
+"""Метрики пула соединений: выдача замеряется через Engine.connect, датчики - событиями пула"""
+from prometheus_client import REGISTRY
+
+
+def sample(name: str, engine: str = "primary") -> float:
+    return REGISTRY.get_sample_value(name, {"engine": engine}) or 0.0
+
+
+def test_pool_metrics_follow_checkout_and_checkin(client, catalog, run):
+    checkouts = sample("db_pool_checkout_wait_seconds_count")
+    queries = sample("db_queries_total")
+
+    response = run(client.get("/api/v1/services/1"))
+
+    assert response.status_code == 200
+    assert sample("db_pool_checkout_wait_seconds_count") == checkouts + 1
+    assert sample("db_queries_total") == queries + 1
+    # Соединение вернулось в пул после ответа
+    assert sample("db_pool_checked_out") == 0
+
+
+def test_metrics_endpoint_exposes_pool_metrics(client, catalog, run):
+    run(client.get("/api/v1/services/1"))
+
+    body = run(client.get("/metrics")).text
+
+    assert 'db_pool_checkout_wait_seconds_count{engine="primary"}' in body
+    assert 'db_pool_checked_out{engine="primary"}' in body
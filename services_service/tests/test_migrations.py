@@ -0,0 +1,80 @@
+"""Миграции: база без таблицы версий любой эпохи доводится до схемы моделей"""
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+import app.models  # noqa: F401 - регистрация всех моделей в Base.metadata
+from app.commands.migrate import ALEMBIC_INI, migrate
+from app.db.database import Base, MIGRATIONS_VERSION_TABLE
+
+
+def schema_diff(url: str) -> list:
+    """Расхождения схемы базы с моделями (как alembic check)"""
+    engine = create_engine(url)
+    try:
+        with engine.connect() as connection:
+            context = MigrationContext.configure(connection, opts={
+                "include_name": lambda name, type_, parents: type_ != "table" or name in Base.metadata.tables,
+                "include_object": lambda obj, name, type_, reflected, compare_to: name != "ix_services_search",
+            })
+            return compare_metadata(context, Base.metadata)
+    finally:
+        engine.dispose()
+
+
+def test_baseline_database_is_stamped_and_upgraded(scratch_url):
+    # База эпохи create_all до Alembic: базовая схема без таблицы версий
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", scratch_url)
+    command.upgrade(config, "0001")
+    engine = create_engine(scratch_url)
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE {MIGRATIONS_VERSION_TABLE}"))
+        connection.execute(text("INSERT INTO cities (name, slug) VALUES ('Москва', 'moscow')"))
+        connection.execute(text(
+            "INSERT INTO services (city_id, service_type, title) "
+            "VALUES (1, 'WORK', 'a'), (1, 'WORK', 'b'), (1, 'NEWS', 'c')"
+        ))
+
+    assert migrate(scratch_url) is True
+    assert schema_diff(scratch_url) == []
+
+    with engine.connect() as connection:
+        counters = connection.execute(text(
+            "SELECT service_type::text, count, last_modified IS NOT NULL FROM service_counters ORDER BY 1"
+        )).all()
+    engine.dispose()
+    assert counters == [("NEWS", 1, True), ("WORK", 2, True)]
+
+
+def test_current_unversioned_database_is_stamped_and_upgraded(scratch_url):
+    engine = create_engine(scratch_url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO cities (name, slug) VALUES ('Москва', 'moscow')"))
+        connection.execute(text(
+            "INSERT INTO service_counters (city_id, service_type, count, last_modified) "
+            "VALUES (1, 'WORK', 5, '2024-05-01T12:00:00Z')"
+        ))
+
+    assert migrate(scratch_url) is True
+    assert schema_diff(scratch_url) == []
+
+    # Существующие данные и валидаторы не меняются
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT count FROM service_counters")) == 5
+        assert connection.scalar(text("SELECT last_modified = '2024-05-01T12:00:00Z' FROM service_counters"))
+    engine.dispose()
+
+
+def test_fresh_database_downgrades_and_upgrades(scratch_url):
+    assert migrate(scratch_url) is False
+    assert schema_diff(scratch_url) == []
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", scratch_url)
+    command.downgrade(config, "base")
+    assert migrate(scratch_url) is False
+    assert schema_diff(scratch_url) == []
@@ -0,0 +1,110 @@
+"""Выбор формата и сжатия по Accept / Accept-Encoding и условные запросы к разным представлениям"""
+import gzip
+from datetime import datetime
+
+import brotli
+import msgpack
+import pytest
+
+from app.core.negotiation import MSGPACK_MEDIA_TYPE
+from app.core.shared_cache import shared_cache
+from app.core.single_flight import single_flight
+
+MSGPACK = {"Accept": MSGPACK_MEDIA_TYPE}
+
+
+def varies_by_accept(response) -> bool:
+    """Vary содержит Accept и Accept-Encoding (CORS добавляет к ним Origin)"""
+    return {"accept", "accept-encoding"} <= {name.strip().lower() for name in response.headers["Vary"].split(",")}
+
+
+@pytest.fixture(params=["cached", "uncached"])
+def read_path(request, monkeypatch):
+    """Обе ветки чтения списков и услуги: через cached_response и напрямую"""
+    if request.param == "uncached":
+        monkeypatch.setattr(shared_cache, "enabled", False)
+        monkeypatch.setattr(single_flight, "enabled", False)
+    return request.param
+
+
+def test_msgpack_list_has_json_structure(client, catalog, run, read_path):
+    as_json = run(client.get("/api/v1/services/", params={"limit": 30})).json()
+    response = run(client.get("/api/v1/services/", params={"limit": 30}, headers=MSGPACK))
+
+    assert response.headers["Content-Type"] == MSGPACK_MEDIA_TYPE
+    items = msgpack.unpackb(response.content, timestamp=3)
+    assert [item["id"] for item in items] == [item["id"] for item in as_json]
+    assert list(items[0]) == list(as_json[0])
+    # Десятичные значения - числами, даты - расширением timestamp
+    priced = next(i for i, item in enumerate(as_json) if item["price"] is not None)
+    assert items[priced]["price"] == float(as_json[priced]["price"])
+    assert isinstance(items[0]["created_at"], datetime)
+
+
+def test_json_preferred_unless_msgpack_weighs_more(client, catalog, run):
+    for accept, expected in [
+        ("application/json, application/msgpack;q=0.5", "application/json"),
+        ("application/msgpack;q=0", "application/json"),
+        ("application/x-msgpack, application/json;q=0.9", MSGPACK_MEDIA_TYPE),
+        ("*/*", "application/json"),
+    ]:
+        response = run(client.get("/api/v1/services/", params={"limit": 5}, headers={"Accept": accept}))
+        assert response.headers["Content-Type"] == expected, accept
+
+
+@pytest.mark.parametrize("accept_encoding, encoding, decompress", [
+    ("gzip", "gzip", gzip.decompress),
+    ("gzip, br", "br", brotli.decompress),
+    ("br;q=0, gzip", "gzip", gzip.decompress),
+])
+def test_large_list_is_compressed(client, catalog, run, accept_encoding, encoding, decompress):
+    plain = run(client.get("/api/v1/services/", params={"limit": 30}, headers={"Accept-Encoding": "identity"}))
+    assert "Content-Encoding" not in plain.headers
+
+    request = client.build_request(
+        "GET", "/api/v1/services/", params={"limit": 30}, headers={"Accept-Encoding": accept_encoding}
+    )
+    response = run(client.send(request, stream=True))
+    body = run(_raw_body(response))
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert varies_by_accept(response)
+    assert decompress(body) == plain.content
+
+
+async def _raw_body(response) -> bytes:
+    """Тело без распаковки httpx"""
+    body = b"".join([chunk async for chunk in response.aiter_raw()])
+    await response.aclose()
+    return body
+
+
+def test_small_response_is_not_compressed(client, catalog, run):
+    response = run(client.get("/api/v1/services/batch", params={"ids": "1"}, headers={"Accept-Encoding": "gzip"}))
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+# Без общего кэша услуга отдается только в JSON через response_model, и формат не выбирается
+@pytest.mark.parametrize("path, read_path", [
+    ("/api/v1/services/", "cached"),
+    ("/api/v1/services/", "uncached"),
+    ("/api/v1/services/4", "cached"),
+], indirect=["read_path"])
+def test_representations_have_distinct_validators(client, catalog, run, read_path, path):
+    as_json = run(client.get(path))
+    as_msgpack = run(client.get(path, headers=MSGPACK))
+    json_etag, msgpack_etag = as_json.headers["ETag"], as_msgpack.headers["ETag"]
+    assert json_etag != msgpack_etag
+
+    # Валидатор JSON-копии не подтверждает MessagePack и наоборот
+    assert run(client.get(path, headers={**MSGPACK, "If-None-Match": json_etag})).status_code == 200
+    assert run(client.get(path, headers={"If-None-Match": msgpack_etag})).status_code == 200
+
+    for headers, etag in [({}, json_etag), (MSGPACK, msgpack_etag)]:
+        response = run(client.get(path, headers={**headers, "If-None-Match": etag, "Accept-Encoding": "gzip"}))
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert varies_by_accept(response)
+        assert response.content == b""
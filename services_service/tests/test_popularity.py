@@ -0,0 +1,137 @@
+"""sort=popular: расчет оценки популярности, исключение услуг без оценки и курсор по (popularity_score, id)"""
+import math
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.core.pagination import encode_cursor
+from app.db.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.models.service import Service
+from app.services.popularity import REFRESH_LOCK_KEY, PopularityRefresher, refresh_pending
+
+NEXT_CURSOR = "X-Next-Cursor"
+
+
+def expected_score(rating, reviews_count, created_at) -> float:
+    reviews = reviews_count or 0
+    weight = settings.POPULARITY_PRIOR_WEIGHT
+    quality = (float(rating or 0) * reviews + settings.POPULARITY_PRIOR_RATING * weight) / (reviews + weight)
+    age_bonus = created_at.timestamp() / (86400 * settings.POPULARITY_HALF_LIFE_DAYS)
+    return math.log2(quality * math.log(reviews + 2)) + age_bonus
+
+
+def scores() -> dict:
+    with SessionLocal() as db:
+        return dict(db.execute(select(Service.id, Service.popularity_score)).all())
+
+
+def refresh(batch_size: int = 1000) -> int:
+    return PopularityRefresher(interval=1, batch_size=batch_size).run_once()
+
+
+def popular_ids(client, run, **params) -> list:
+    """Все страницы sort=popular по курсору"""
+    ids, cursor = [], None
+    while True:
+        query = {"sort": "popular", "limit": 7, **params}
+        if cursor:
+            query["cursor"] = cursor
+        response = run(client.get("/api/v1/services/", params=query))
+        assert response.status_code == 200
+        ids.extend(item["id"] for item in response.json())
+        cursor = response.headers.get(NEXT_CURSOR)
+        if not cursor:
+            return ids
+
+
+def test_refresh_computes_scores_in_batches(catalog, run):
+    assert set(scores().values()) == {None}
+
+    assert run(refresh(batch_size=7)) == catalog["services"]
+    assert run(refresh(batch_size=7)) == 0
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Service.id, Service.rating, Service.reviews_count, Service.created_at, Service.popularity_score,
+                   Service.updated_at)
+        ).all()
+    for service_id, rating, reviews_count, created_at, score, updated_at in rows:
+        assert score == pytest.approx(expected_score(rating, reviews_count, created_at), rel=1e-12), service_id
+        # Для клиента услуга не изменилась
+        assert updated_at is None
+
+
+def test_refresh_skipped_while_other_worker_holds_lock(catalog, run):
+    async def refresh_while_locked():
+        async with async_engine.connect() as other_worker:
+            await other_worker.execute(select(func.pg_advisory_lock(REFRESH_LOCK_KEY)))
+            try:
+                async with AsyncSessionLocal() as db:
+                    return await refresh_pending(db, 100)
+            finally:
+                await other_worker.execute(select(func.pg_advisory_unlock(REFRESH_LOCK_KEY)))
+
+    assert run(refresh_while_locked()) == 0
+    assert set(scores().values()) == {None}
+
+
+def test_popular_excludes_unscored_services(client, catalog, run):
+    assert run(client.get("/api/v1/services/", params={"sort": "popular"})).json() == []
+
+    run(refresh())
+    created = run(client.post("/api/v1/services/", json={"city_id": 2, "service_type": "work", "title": "Новая"}))
+    new_id = created.json()["id"]
+
+    listed = popular_ids(client, run)
+    assert len(listed) == catalog["services"]
+    assert new_id not in listed
+    assert new_id in [item["id"] for item in run(client.get("/api/v1/services/", params={"limit": 100})).json()]
+
+    etag = run(client.get("/api/v1/services/", params={"sort": "popular", "city_slug": "spb"})).headers["ETag"]
+    assert run(refresh()) == 1
+    response = run(client.get("/api/v1/services/", params={"sort": "popular", "city_slug": "spb"}))
+    assert new_id in [item["id"] for item in response.json()]
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("params", [{}, {"city_slug": "moscow"}, {"service_type": "news"}])
+def test_popular_cursor_walks_score_order_with_ties(client, catalog, run, params):
+    run(refresh())
+    # Одинаковые оценки: порядок внутри них задает id
+    with SessionLocal() as db:
+        db.execute(update(Service).where(Service.id.in_([3, 4, 5, 9, 12, 13, 21])).values(popularity_score=1e9))
+        db.commit()
+
+    with SessionLocal() as db:
+        query = select(Service.id).order_by(Service.popularity_score.desc(), Service.id.desc())
+        if "city_slug" in params:
+            query = query.where(Service.city_id == 1)
+        if "service_type" in params:
+            query = query.where(Service.service_type == "NEWS")
+        expected = db.scalars(query).all()
+
+    assert popular_ids(client, run, **params) == expected
+
+
+@pytest.mark.parametrize("cursor", [
+    encode_cursor(["abc", 5]),
+    encode_cursor(["2024-05-01T12:00:00", 5]),
+    encode_cursor([True, 5]),
+    encode_cursor([1.5, "5"]),
+    encode_cursor([1.5]),
+    "not-a-cursor",
+])
+def test_popular_rejects_malformed_cursor(client, catalog, run, cursor):
+    response = run(client.get("/api/v1/services/", params={"sort": "popular", "cursor": cursor}))
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Некорректный курсор"
+
+
+def test_popular_rejects_non_finite_cursor(client, catalog, run):
+    cursor = encode_cursor([float("nan"), 5])
+
+    response = run(client.get("/api/v1/services/", params={"sort": "popular", "cursor": cursor}))
+
+    assert response.status_code == 400
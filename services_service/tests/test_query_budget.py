@@ -0,0 +1,62 @@
+"""Бюджет SQL-запросов: маршруты укладываются в объявленный бюджет, превышение проваливает тест"""
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+
+from app.core.metrics import MetricsMiddleware
+from app.core.query_budget import assert_query_budget, query_budget
+from app.db.database import AsyncSessionLocal
+from app.models.city import City
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/api/v1/services/", {"limit": 20}),
+    ("/api/v1/services/", {"city_slug": "moscow", "sort": "popular"}),
+    ("/api/v1/services/by-type/estate", {}),
+    ("/api/v1/services/1", {}),
+    ("/api/v1/services/count/by-city/spb", {}),
+])
+def test_read_endpoints_within_budget(client, catalog, run, path, params):
+    with assert_query_budget():
+        response = run(client.get(path, params=params))
+
+    assert response.status_code == 200
+
+
+def test_create_service_within_budget(client, catalog, run):
+    with assert_query_budget():
+        response = run(client.post("/api/v1/services/", json={
+            "city_id": 1, "service_type": "auto", "title": "Lada Vesta 2022", "price": "1200000.00"
+        }))
+
+    assert response.status_code == 201
+
+    with assert_query_budget():
+        counts = run(client.get("/api/v1/services/count/by-city/moscow")).json()
+    assert counts["total"] == 11
+
+
+def test_assert_query_budget_reports_repeated_statements(app, run):
+    """Маршрут с N+1 (одинаковый запрос в цикле) проваливает проверку и попадает в отчет"""
+    budget_app = FastAPI()
+    budget_app.add_middleware(MetricsMiddleware)
+
+    @budget_app.get("/n-plus-one", dependencies=[Depends(query_budget(1))])
+    async def n_plus_one():
+        async with AsyncSessionLocal() as db:
+            for city_id in range(1, 4):
+                await db.execute(select(City.name).where(City.id == city_id))
+        return {}
+
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=budget_app), base_url="http://test") as budget_client:
+            return await budget_client.get("/n-plus-one")
+
+    with pytest.raises(AssertionError) as error:
+        with assert_query_budget():
+            assert run(request()).status_code == 200
+
+    message = str(error.value)
+    assert "GET /n-plus-one: 3 SQL-запросов при бюджете 1" in message
+    assert "x3: SELECT cities.name FROM cities WHERE cities.id =" in message
@@ -0,0 +1,83 @@
+"""Маршрутизация чтения на реплики: читающие обработчики и выгрузка идут на реплику, кроме окна после записи"""
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.shared_cache import shared_cache
+from app.db import database as db_module
+from app.db.database import async_engine
+from app.db.replicas import READ_PRIMARY_COOKIE, ReplicaRouter
+from app.services.catalog import CatalogService
+
+
+def test_export_reads_from_replica(client, catalog, replica, sql_statements, run):
+    with sql_statements() as primary:
+        response = run(client.get("/api/v1/services/export", params={"format": "csv"}))
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == catalog["services"] + 1
+    assert primary == []
+    assert any("FROM services JOIN cities" in statement for statement in replica.statements)
+
+
+def test_export_reads_own_writes_from_primary(client, catalog, replica, sql_statements, run):
+    created = run(client.post("/api/v1/services/", json={"city_id": 1, "service_type": "work", "title": "Сантехник"}))
+    assert READ_PRIMARY_COOKIE in created.cookies
+
+    with sql_statements() as primary:
+        response = run(client.get("/api/v1/services/export"))
+
+    assert len(response.text.splitlines()) == catalog["services"] + 1
+    assert any("FROM services JOIN cities" in statement for statement in primary)
+    assert replica.statements == []
+
+
+def test_coalesced_reads_share_one_replica_connection(client, catalog, replica, run, monkeypatch):
+    requests = 8
+    checkouts = []
+    event.listen(replica.engine.sync_engine, "checkout", lambda *args: checkouts.append(args))
+    monkeypatch.setattr(shared_cache, "enabled", False)
+    list_validator = CatalogService.list_validator
+
+    async def slow_list_validator(self, *args):
+        # Чтение идет, пока остальные запросы присоединяются к нему
+        await asyncio.sleep(0.2)
+        return await list_validator(self, *args)
+
+    monkeypatch.setattr(CatalogService, "list_validator", slow_list_validator)
+
+    async def concurrent():
+        return await asyncio.gather(*(
+            client.get("/api/v1/services/", params={"city_slug": "moscow"}) for _ in range(requests)
+        ))
+
+    responses = run(concurrent())
+
+    assert {response.status_code for response in responses} == {200}
+    assert sorted(response.headers["X-Cache"] for response in responses) == ["COALESCED"] * (requests - 1) + ["MISS"]
+    # Ожидающие чужого результата соединение реплики не берут (в ее пуле всего два соединения)
+    assert len(checkouts) == 1
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/api/v1/services/export", {}),
+    ("/api/v1/services/", {"limit": 100}),
+])
+def test_request_hitting_dead_replica_reads_from_primary(client, catalog, run, sql_statements, monkeypatch, path, params):
+    monkeypatch.setattr(shared_cache, "enabled", False)
+    router = ReplicaRouter(
+        [create_async_engine("postgresql+asyncpg://user@127.0.0.1:1/none")], retry_seconds=30, primary=async_engine
+    )
+    monkeypatch.setattr(db_module, "replica_router", router)
+
+    # Первый же запрос на недоступную реплику выполняется на основной базе
+    with sql_statements() as primary:
+        response = run(client.get(path, params=params))
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines() if path.endswith("export") else response.json()) == catalog["services"]
+    assert any("FROM services JOIN cities" in statement for statement in primary)
+    # Следующие запросы идут на основную базу, не пробуя реплику
+    assert router.candidates() == []
@@ -0,0 +1,133 @@
+"""Отложенный пересчет рейтинга: агрегаты сходятся за несколько сбросов, сбрасывает один воркер, сбой ничего не теряет"""
+import asyncio
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app.db.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.models.review import Review
+from app.models.service import Service
+from app.services import reviews as reviews_module
+from app.services.reviews import FLUSH_LOCK_KEY, ReviewFlusher, flush_reviews
+
+
+def add_reviews(ratings_by_service: dict) -> None:
+    with SessionLocal() as db:
+        db.add_all(
+            Review(service_id=service_id, rating=rating)
+            for service_id, ratings in ratings_by_service.items()
+            for rating in ratings
+        )
+        db.commit()
+
+
+def aggregates(service_id: int):
+    with SessionLocal() as db:
+        return db.execute(
+            select(Service.rating, Service.reviews_count, Service.rating_sum, Service.popularity_score)
+            .where(Service.id == service_id)
+        ).one()
+
+
+def pending_reviews() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Review).where(Review.applied.is_(False)))
+
+
+async def flush(batch_size: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await flush_reviews(db, batch_size)
+
+
+def expected_rating(total: Decimal, count: int) -> Decimal:
+    return (total / count).quantize(Decimal("0.1"), rounding=ROUND_HALF_UP)
+
+
+def test_aggregates_add_up_across_flushes(client, catalog, run):
+    # Услуга 1 без отзывов, у услуги 5 до учета отзывов было 4 отзыва с рейтингом 4.5 (сумма 18.0)
+    assert aggregates(1)[:2] == (Decimal("4.5"), 0)
+    assert aggregates(5)[:2] == (Decimal("4.5"), 4)
+
+    for rating in (5, 4, 1):
+        assert run(client.post("/api/v1/services/1/reviews", json={"rating": rating})).status_code == 201
+    add_reviews({5: [2, 3, 5, 5, 1]})
+
+    applied = [run(flush(batch_size=3)) for _ in range(3)]
+    assert applied == [3, 3, 2]
+    assert pending_reviews() == 0
+
+    add_reviews({1: [2], 5: [4, 4]})
+    assert run(ReviewFlusher(interval=1, batch_size=2).run_once()) == 3
+    assert run(flush(batch_size=3)) == 0
+
+    rating, count, rating_sum, score = aggregates(1)
+    assert (count, rating_sum) == (4, Decimal("12.0"))
+    assert rating == expected_rating(Decimal(12), 4)
+    assert score is not None
+
+    rating, count, rating_sum, _ = aggregates(5)
+    assert (count, rating_sum) == (4 + 7, Decimal("18.0") + 24)
+    assert rating == expected_rating(Decimal("42.0"), 11)
+
+    # Отзывы других услуг не трогают их агрегаты
+    assert aggregates(2)[:3] == (Decimal("4.5"), 1, None)
+
+
+def test_only_lock_holder_flushes(catalog, run):
+    add_reviews({3: [5, 5]})
+
+    async def flush_while_locked():
+        async with async_engine.connect() as other_worker:
+            await other_worker.execute(select(func.pg_advisory_lock(FLUSH_LOCK_KEY)))
+            try:
+                return await flush(batch_size=10)
+            finally:
+                await other_worker.execute(select(func.pg_advisory_unlock(FLUSH_LOCK_KEY)))
+
+    assert run(flush_while_locked()) == 0
+    assert pending_reviews() == 2
+    assert aggregates(3)[1] == 2
+
+    assert run(flush(batch_size=10)) == 2
+    assert aggregates(3)[1] == 4
+
+
+def test_concurrent_flushes_count_each_review_once(catalog, run):
+    add_reviews({4: [1] * 20, 6: [5] * 20})
+
+    async def concurrent():
+        return await asyncio.gather(*(flush(batch_size=100) for _ in range(4)))
+
+    assert sum(run(concurrent())) == 40
+    assert pending_reviews() == 0
+    assert aggregates(4)[1:3] == (3 + 20, Decimal("4.5") * 3 + 20)
+    assert aggregates(6)[1:3] == (5 + 20, Decimal("4.5") * 5 + 100)
+
+
+def test_failed_flush_loses_nothing(catalog, run, monkeypatch):
+    add_reviews({7: [5, 4, 3]})
+    before = aggregates(7)
+
+    class FailingCounters(reviews_module.CounterService):
+        async def touch(self, groups):
+            raise RuntimeError("сбой после обновления агрегатов")
+
+    monkeypatch.setattr(reviews_module, "CounterService", FailingCounters)
+    with pytest.raises(RuntimeError):
+        run(flush(batch_size=10))
+
+    # Транзакция откатилась целиком: отзывы не помечены учтенными, агрегаты не изменились
+    assert pending_reviews() == 3
+    assert aggregates(7) == before
+
+    monkeypatch.undo()
+    assert run(flush(batch_size=10)) == 3
+    assert run(flush(batch_size=10)) == 0
+    rating, count, rating_sum, _ = aggregates(7)
+    assert (count, rating_sum) == (6 + 3, Decimal("4.5") * 6 + 12)
+    assert rating == expected_rating(rating_sum, count)
+
+    # Блокировка была транзакционной и освобождена откатом
+    with SessionLocal() as db:
+        assert db.scalar(text("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory'")) == 0
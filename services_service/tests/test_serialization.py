@@ -0,0 +1,90 @@
+"""Контракт быстрой сериализации: dump_services дает те же байты, что и ответ через response_model"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.core.responses import dump_services
+from app.core.shared_cache import shared_cache
+from app.core.single_flight import single_flight
+from app.schemas.service import ServiceWithCity
+
+adapter = TypeAdapter(List[ServiceWithCity])
+
+
+def response_model_body(rows: List[dict]) -> bytes:
+    """Эквивалент FastAPI: валидация response_model, dump в JSON-режиме, json.dumps JSONResponse"""
+    content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def make_row(i: int, **overrides) -> dict:
+    created = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    row = {
+        "id": i,
+        "city_id": i % 15 + 1,
+        "service_type": ["work", "estate", "news", "auto"][i % 4],
+        "title": f"Услуга №{i} \"в кавычках\"",
+        "description": "Профессиональный маникюр и педикюр",
+        "price": Decimal("1500.00") + i,
+        "image_url": "img/news01.webp",
+        "rating": Decimal(f"{3 + i % 20 / 10:.1f}"),
+        "reviews_count": i * 7 % 500,
+        "created_at": created + timedelta(minutes=i, microseconds=i * 13),
+        "updated_at": created + timedelta(days=1),
+        "city_name": "Москва",
+        "city_slug": "moscow",
+        "thumbnail_url": "/api/v1/images/320/img/news01.webp",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.mark.parametrize("rows", [
+    [],
+    [make_row(i) for i in range(1, 101)],
+    [make_row(1, description=None, price=None, updated_at=None, image_url=None, thumbnail_url=None)],
+    [make_row(2, price=Decimal("0.00"), rating=Decimal("0.0"), reviews_count=0)],
+    [make_row(3, price=Decimal("9999999999.99"), rating=Decimal("5.0"))],
+    [make_row(4, created_at=datetime(2024, 1, 1, 9, 0, 0, 123456, tzinfo=timezone(timedelta(hours=3))))],
+])
+def test_dump_services_matches_response_model(rows):
+    assert dump_services(rows) == response_model_body(rows)
+
+
+def test_list_endpoint_fast_path_matches_response_model(client, catalog, run, monkeypatch):
+    monkeypatch.setattr(shared_cache, "enabled", False)
+    monkeypatch.setattr(single_flight, "enabled", False)
+    params = {"limit": 50}
+
+    monkeypatch.setattr(settings, "FAST_JSON_ENABLED", True)
+    fast = run(client.get("/api/v1/services/", params=params))
+    monkeypatch.setattr(settings, "FAST_JSON_ENABLED", False)
+    slow = run(client.get("/api/v1/services/", params=params))
+
+    assert fast.status_code == slow.status_code == 200
+    assert len(fast.json()) == catalog["services"]
+    assert fast.content == slow.content
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_export_dates_match_api(client, catalog, run, format):
+    """Даты выгрузки в том же виде, что и в JSON-ответах API"""
+    api = run(client.get("/api/v1/services/", params={"limit": 100})).json()
+    created = {item["id"]: item["created_at"] for item in api}
+
+    body = run(client.get("/api/v1/services/export", params={"format": format})).text
+    if format == "ndjson":
+        exported = {item["id"]: item["created_at"] for item in map(json.loads, body.splitlines())}
+    else:
+        rows = list(csv.DictReader(io.StringIO(body)))
+        exported = {int(row["id"]): row["created_at"] for row in rows}
+
+    assert exported == created
+    assert all(value.endswith("Z") for value in exported.values())
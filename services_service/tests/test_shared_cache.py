@@ -0,0 +1,160 @@
+"""Общий кэш чтения на сервере с протоколом Redis в процессе теста (tests/fake_redis.py)"""
+import asyncio
+import logging
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.shared_cache import MemoryBackend, RedisBackend, SharedCache, shared_cache
+from app.db.replicas import READ_PRIMARY_COOKIE
+from fake_redis import FakeRedisServer
+
+
+def make_cache(url: str, **options) -> SharedCache:
+    """Кэш одного воркера: свой клиент Redis и своя память процесса"""
+    return SharedCache(
+        ttl=options.pop("ttl", 30),
+        local=MemoryBackend(100),
+        remote=RedisBackend(url, timeout=0.5),
+        **options
+    )
+
+
+def test_entries_and_invalidation_are_shared_between_workers():
+    async def scenario():
+        server = FakeRedisServer()
+        await server.start()
+        first, second = make_cache(server.url), make_cache(server.url)
+        try:
+            version, entry = await first.get("services", {"service_id": 1, "format": "json"})
+            assert (version, entry) == (0, None)
+            await first.set("services", version, {"service_id": 1, "format": "json"}, b"body")
+
+            # Параметры нормализуются: порядок не важен, пустые значения отбрасываются
+            assert await second.get("services", {"format": "json", "service_id": 1, "city_slug": None}) == (0, b"body")
+
+            await second.invalidate("services")
+            assert await first.get("services", {"service_id": 1, "format": "json"}) == (1, None)
+
+            # Ответ, построенный до сброса, сохраняется под старой версией и не читается
+            await first.set("services", version, {"service_id": 1, "format": "json"}, b"stale")
+            assert await second.get("services", {"service_id": 1, "format": "json"}) == (1, None)
+            assert server.data[b"cache:services:version"] == (b"1", None)
+        finally:
+            await first.close()
+            await second.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_by_ttl():
+    async def scenario():
+        server = FakeRedisServer()
+        await server.start()
+        cache = make_cache(server.url, ttl=0.05)
+        try:
+            await cache.set("cities", 0, {"slug": "moscow"}, b"body")
+            assert await cache.get("cities", {"slug": "moscow"}) == (0, b"body")
+            await asyncio.sleep(0.1)
+            assert await cache.get("cities", {"slug": "moscow"}) == (0, None)
+        finally:
+            await cache.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_unavailable_redis_falls_back_to_memory_and_recovers(caplog):
+    errors = REGISTRY.get_sample_value("cache_backend_errors_total") or 0.0
+
+    async def scenario():
+        server = FakeRedisServer()
+        await server.start()
+        cache = make_cache(server.url, retry_seconds=0.2)
+        try:
+            await server.stop()
+
+            await cache.set("services", 0, {"service_id": 1}, b"local")
+            assert await cache.get("services", {"service_id": 1}) == (0, b"local")
+            assert cache.stats()["backend"] == "memory"
+
+            await server.start(server.port)
+            await asyncio.sleep(0.25)
+            assert await cache.get("services", {"service_id": 1}) == (0, None)
+            assert cache.stats()["backend"] == "redis"
+        finally:
+            await cache.close()
+            await server.stop()
+
+    with caplog.at_level(logging.WARNING, logger="app.core.shared_cache"):
+        asyncio.run(scenario())
+
+    assert REGISTRY.get_sample_value("cache_backend_errors_total") == errors + 1
+    assert [record.getMessage().split(":")[0] for record in caplog.records] == [
+        "Кэш Redis недоступен, используется память процесса"
+    ]
+
+
+@pytest.fixture
+def redis_cache(run, monkeypatch):
+    """Общий кэш приложения поверх сервера Redis в процессе теста"""
+    server = FakeRedisServer()
+    run(server.start())
+    backend = RedisBackend(server.url, timeout=0.5)
+    monkeypatch.setattr(shared_cache, "remote", backend)
+    monkeypatch.setattr(shared_cache, "enabled", True)
+    yield server
+    run(backend.close())
+    run(server.stop())
+
+
+def test_reads_go_through_shared_cache(client, catalog, run, redis_cache, sql_statements):
+    assert run(client.get("/api/v1/services/3")).headers["X-Cache"] == "MISS"
+
+    with sql_statements() as statements:
+        response = run(client.get("/api/v1/services/3"))
+    assert response.headers["X-Cache"] == "HIT"
+    assert statements == []
+
+    etag = response.headers["ETag"]
+    assert run(client.get("/api/v1/services/3", headers={"If-None-Match": etag})).status_code == 304
+    assert any(key.startswith(b"services:services:") for key in redis_cache.data)
+
+    page = run(client.get("/api/v1/services/", params={"city_slug": "spb"}))
+    assert page.headers["X-Cache"] == "MISS"
+    assert run(client.get("/api/v1/services/", params={"city_slug": "spb"})).content == page.content
+
+
+def test_write_invalidates_cached_lists(client, catalog, run, redis_cache):
+    run(client.get("/api/v1/services/", params={"city_slug": "kazan"}))
+
+    created = run(client.post("/api/v1/services/", json={"city_id": 3, "service_type": "news", "title": "Новость"}))
+    assert created.status_code == 201
+    client.cookies.clear()
+
+    response = run(client.get("/api/v1/services/", params={"city_slug": "kazan"}))
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.json()[0]["title"] == "Новость"
+
+
+def test_client_after_write_bypasses_shared_cache(client, catalog, run, redis_cache, sql_statements):
+    run(client.get("/api/v1/services/", params={"city_slug": "moscow"}))
+    assert run(client.get("/api/v1/services/", params={"city_slug": "moscow"})).headers["X-Cache"] == "HIT"
+
+    created = run(client.post("/api/v1/services/", json={"city_id": 1, "service_type": "work", "title": "Свежая"}))
+    assert READ_PRIMARY_COOKIE in created.cookies
+
+    # Писавший клиент не читает кэш и не заполняет его
+    keys = set(redis_cache.data)
+    with sql_statements() as statements:
+        response = run(client.get("/api/v1/services/", params={"city_slug": "moscow"}))
+    assert response.headers["X-Cache"] == "BYPASS"
+    assert response.json()[0]["title"] == "Свежая"
+    assert len(statements) == 2
+    assert set(redis_cache.data) - keys == set()
+
+    client.cookies.set(READ_PRIMARY_COOKIE, str(int(time.time()) - 1))
+    assert run(client.get("/api/v1/services/", params={"city_slug": "moscow"})).headers["X-Cache"] == "MISS"
+    assert shared_cache.stats()["routes"]["/api/v1/services/"]["bypassed"] >= 1
@@ -0,0 +1,26 @@
+"""Прогрев воркера: готовность после открытия пула и кэшей, недоступная реплика готовности не мешает"""
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services import warmup as warmup_module
+from app.services.warmup import Readiness, warm_up
+
+
+def test_unreachable_replica_is_logged_and_worker_becomes_ready(catalog, run, monkeypatch, caplog):
+    dead_replica = create_async_engine("postgresql+asyncpg://user@127.0.0.1:1/none")
+    monkeypatch.setattr(warmup_module, "replica_engines", [dead_replica])
+    readiness = Readiness()
+    readiness.mark_startup(time.perf_counter())
+
+    with caplog.at_level(logging.INFO, logger=warmup_module.__name__):
+        run(warm_up(readiness))
+
+    assert readiness.ready
+    assert {"primary_pool", "caches"} <= set(readiness.steps)
+    assert "replica0_pool" not in readiness.steps
+    assert [(record.levelno, record.getMessage().split(":")[0]) for record in caplog.records] == [
+        (logging.WARNING, "Реплика replica0 не прогрета"),
+        (logging.INFO, "Воркер готов"),
+    ]